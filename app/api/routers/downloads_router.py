@@ -1,13 +1,19 @@
-from fastapi import APIRouter , HTTPException , Depends
+from fastapi import APIRouter , HTTPException , Depends , Request
 from app.containers.factory import app_container
 from app.models.transcription_job import TranscriptionJob
 from app.models.transcription import Transcription
 from app.models.summary import Summary
 from app.services.model_services.astract_services import AbstractServices
 from app.api.schemas.summary_response import SummariesResponse, SummaryResponse
+from app.services.pipeline_services.manifest_service import ManifestBuilder
+from app.utils.file_serving import FileServer
+from app.services.pipeline_services.artifact_store import ArtifactStore
+from app.services.pipeline_services.subtitle_renderer import SubtitleRenderer
+from app.api.schemas.subtitle_format import SubtitleFormat
 from pathlib import Path
-from fastapi.responses import FileResponse
-from typing import List
+from fastapi.responses import Response
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional
 
 
 router = APIRouter(prefix="/downloads")
@@ -21,30 +27,60 @@ def get_transcriptions_service() :
 def get_summaries_service():
     return app_container.model_services_container.summary_services
 
+def get_manifest_builder():
+    return app_container.pipeline_services_container.manifest_builder
+
+def get_file_server():
+    return app_container.file_server
+
+def get_subtitle_renderer():
+    return app_container.pipeline_services_container.subtitle_renderer
+
+def get_artifact_store():
+    return app_container.pipeline_services_container.artifact_store
+
 
 import logging
 logger = logging.getLogger(__name__)
 
-@router.get("/download_video/{job_id}") 
-async def download_video(job_id: str, jobs_services: AbstractServices[TranscriptionJob] = Depends(get_jobs_service)):
+@router.api_route("/download_video/{job_id}", methods=["GET", "HEAD"]) 
+async def download_video(
+    job_id: str,
+    request: Request,
+    jobs_services: AbstractServices[TranscriptionJob] = Depends(get_jobs_service),
+    file_server: FileServer = Depends(get_file_server),
+    artifact_store: ArtifactStore = Depends(get_artifact_store)
+):
+
+    job: TranscriptionJob = await jobs_services.find_one_by_field_async(field_name="job_id", value=job_id)
 
-    job: TranscriptionJob = jobs_services.find_one_by_field(field_name="job_id", value=job_id)
 
+    if job and job.audio_only:
+        raise HTTPException(status_code=404, detail="Job was an audio-only upload, it has subtitles and summaries but no video.")
+
+    if job and job.delivery_mode == "sidecar" and not job.processed_video_path:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Job is delivered as sidecars: use /api/downloads/manifest/{job_id}, or POST /api/pipeline/jobs/{job_id}/remux for an MKV."
+        )
 
     if not job or not job.processed_video_path:
         logger.warning(f"Job not found or processed_video_path missing for job_id: {job_id}")
         raise HTTPException(status_code=404, detail="Processed video was not found.")
 
-    video_path = Path(job.processed_video_path)
+    # the record holds the store key, the file is named after the job
+    video_path = Path(artifact_store.local_path(job.processed_video_path))
 
-    if not video_path.exists():
+    if not video_path.is_file():
         logger.warning(f"Video file does not exist at path: {video_path}")
         raise HTTPException(status_code=404, detail="Video file was not found on the server.")
 
-    return FileResponse(
+    # ranges/revalidation for seeking players, or handed to the front proxy
+    return file_server.serve(
+        request=request,
         path=str(video_path),
-        media_type="video/mkv",
-        filename=video_path.name
+        media_type="video/x-matroska",
+        filename=f"video_subtitled_{job.id}.mkv"
     )
 
 
@@ -53,56 +89,94 @@ async def download_video(job_id: str, jobs_services: AbstractServices[Transcript
 async def download_subtitle(
     job_id: str,
     language: str,
-    transcriptions_services: AbstractServices[Transcription] = Depends(get_transcriptions_service)
+    request: Request,
+    version: Optional[int] = None,
+    format: SubtitleFormat = SubtitleFormat.VTT,
+    transcriptions_services: AbstractServices[Transcription] = Depends(get_transcriptions_service),
+    jobs_services: AbstractServices[TranscriptionJob] = Depends(get_jobs_service),
+    subtitle_renderer: SubtitleRenderer = Depends(get_subtitle_renderer)
 ):
-    transcriptions: List[Transcription] = transcriptions_services.find_by_field(field_name="job_id", value=job_id)
-    vtt_filepath: str = None
-
-    if not transcriptions:
-        logger.warning("No transcriptions found in the database.")
-        raise HTTPException(status_code=404, detail="No transcriptions are found")
-
-    for t in transcriptions:
-        if t.target_language == language:
-            subtitle_filepath = t.filepath
-            break
-
-    if not subtitle_filepath:
-        logger.warning(f"No transcription found for language: {language}")
-        raise HTTPException(status_code=404, detail="Subtitle for requested language not found.")
-
-    filepath = Path(subtitle_filepath)
-    if not filepath.exists():
-        logger.warning("The filepath does not exist on the server's file system")
-        raise HTTPException(status_code=404, detail="Subtitle filepath was not found on the server.")
-
-    response =  FileResponse(
-        path=str(filepath),
-        media_type="text/vtt",
-        filename=filepath.name
-    )
-
-    response.headers["Access-Control-Allow-Origin"] = "http://localhost:5174"
-
-    return response
+    fmt = format.value
+    # before reading the records: a body rendered from them after an invalidation is not cached
+    generation = subtitle_renderer.generation()
+
+    # latest results unless an older version is requested explicitly. Resolved from the record before
+    # the cache is checked: another worker may have reprocessed the job without clearing this one's cache
+    job: TranscriptionJob = await jobs_services.find_one_by_field_async(field_name="job_id", value=job_id)
+    if job is None:
+        logger.warning(f"Job not found for job_id: {job_id}")
+        raise HTTPException(status_code=404, detail="Job not found")
+    resolved_version = version if version is not None else job.version
+
+    rendered = subtitle_renderer.cached(job_id, language, resolved_version, fmt)
+
+    if rendered is None:
+        # pick the record from its metadata, only the chosen transcription is loaded in full
+        rows = await transcriptions_services.project_by_field_async(
+            field_name="job_id", value=job_id, fields=["transcription_id", "target_language", "version"]
+        )
+
+        if not rows:
+            logger.warning("No transcriptions found in the database.")
+            raise HTTPException(status_code=404, detail="No transcriptions are found")
+
+        transcription: Transcription = None
+        for row in rows:
+            if row["target_language"] == language and (row["version"] or 1) == resolved_version:
+                transcription = await transcriptions_services.find_one_by_field_async(
+                    field_name="transcription_id", value=row["transcription_id"]
+                )
+                break
+
+        if transcription is None:
+            logger.warning(f"No transcription found for language: {language}")
+            raise HTTPException(status_code=404, detail="Subtitle for requested language not found.")
+
+        # rendered from the stored chunks (read from the chunk store), cached under the resolved version
+        rendered = await run_in_threadpool(subtitle_renderer.render_cached, transcription, fmt, generation=generation)
+
+    use_gzip = rendered.gzip_body is not None and "gzip" in request.headers.get("accept-encoding", "").lower()
+    etag = rendered.gzip_etag if use_gzip else rendered.etag
+
+    headers = {
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+        # the current version can change (reprocess), a pinned one cannot
+        "Cache-Control": "public, max-age=86400" if version is not None else "no-cache",
+        "Content-Disposition": f'attachment; filename="{job_id}_{language}.{fmt}"',
+        "Access-Control-Allow-Origin": "http://localhost:5174",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=rendered.gzip_body, media_type=rendered.media_type, headers=headers)
+
+    return Response(content=rendered.body, media_type=rendered.media_type, headers=headers)
 
 
 @router.get("/summaries/{job_id}", response_model=SummariesResponse)
 async def get_summaries(
     job_id: str,
+    version: Optional[int] = None,
     summaries_service: AbstractServices[Summary] = Depends(get_summaries_service),
     jobs_service: AbstractServices[TranscriptionJob] = Depends(get_jobs_service)
 ):
     """Get all summaries for a specific job"""
     try:
         # First verify the job exists
-        job = jobs_service.find_one_by_field(field_name="job_id", value=job_id)
+        job = await jobs_service.find_one_by_field_async(field_name="job_id", value=job_id)
         if not job:
             logger.warning(f"Job not found for job_id: {job_id}")
             raise HTTPException(status_code=404, detail="Job not found")
 
         # Get summaries for this job
-        summaries: List[Summary] = summaries_service.find_by_field(field_name="job_id", value=job_id)
+        summaries: List[Summary] = await summaries_service.find_by_field_async(field_name="job_id", value=job_id)
+        version = version if version is not None else job.version
+        summaries = [summary for summary in summaries if summary.version == version]
         
         if not summaries:
             logger.info(f"No summaries found for job_id: {job_id}")
@@ -114,7 +188,8 @@ async def get_summaries(
                 summary_id=summary.summary_id,
                 job_id=summary.job_id,
                 text_content=summary.text_content,
-                language=summary.language
+                language=summary.language,
+                version=summary.version
             )
             for summary in summaries
         ]
@@ -128,3 +203,79 @@ async def get_summaries(
         raise HTTPException(status_code=500, detail="Failed to retrieve summaries")
 
 
+async def _sidecar_job(job_id: str, jobs_services: AbstractServices[TranscriptionJob]) -> TranscriptionJob:
+    job: TranscriptionJob = await jobs_services.find_one_by_field_async(field_name="job_id", value=job_id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.audio_only:
+        raise HTTPException(status_code=404, detail="Job was an audio-only upload, there is no video to play.")
+    if not job.processed:
+        raise HTTPException(status_code=409, detail="Job is still being processed.")
+    return job
+
+
+async def _subtitle_tracks(job: TranscriptionJob, transcriptions_services: AbstractServices[Transcription]) -> List[str]:
+    # one track language per language of the job's current version, texts and chunks are never read
+    languages = []
+    rows = await transcriptions_services.project_by_field_async(
+        field_name="job_id", value=job.id, fields=["target_language", "version", "filepath"]
+    )
+    for row in rows:
+        if (row["version"] or 1) == job.version and row["target_language"] and row["filepath"] \
+                and row["target_language"] not in languages:
+            languages.append(row["target_language"])
+    return languages
+
+
+def _subtitle_url(request: Request, job: TranscriptionJob, language: str) -> str:
+    # pinned to the version so a later reprocess never mixes into a cached manifest
+    return f"{request.url_for('download_subtitle', job_id=job.id, language=language)}?version={job.version}"
+
+
+@router.api_route("/source_video/{job_id}", methods=["GET", "HEAD"])
+async def download_source_video(
+    job_id: str,
+    request: Request,
+    jobs_services: AbstractServices[TranscriptionJob] = Depends(get_jobs_service),
+    manifest_builder: ManifestBuilder = Depends(get_manifest_builder),
+    file_server: FileServer = Depends(get_file_server),
+    artifact_store: ArtifactStore = Depends(get_artifact_store)
+):
+    """The original upload, untouched, for sidecar delivery"""
+    job = await _sidecar_job(job_id, jobs_services)
+
+    video_path = Path(artifact_store.local_path(job.video_storage_path) or "")
+    if not job.video_storage_path or not video_path.is_file():
+        # the upload may have been deleted by retention
+        logger.warning(f"Uploaded video does not exist at path: {video_path}")
+        raise HTTPException(status_code=404, detail="Video file was not found on the server.")
+
+    return file_server.serve(
+        request=request,
+        path=str(video_path),
+        media_type=manifest_builder.source_media_type(job),
+        filename=manifest_builder.source_filename(job)
+    )
+
+
+@router.get("/manifest/{job_id}")
+async def get_manifest(
+    job_id: str,
+    request: Request,
+    jobs_services: AbstractServices[TranscriptionJob] = Depends(get_jobs_service),
+    transcriptions_services: AbstractServices[Transcription] = Depends(get_transcriptions_service),
+    manifest_builder: ManifestBuilder = Depends(get_manifest_builder)
+):
+    """Source video and per-language subtitle tracks of a job, for web players (<video> + <track>)"""
+    job = await _sidecar_job(job_id, jobs_services)
+    languages = await _subtitle_tracks(job, transcriptions_services)
+
+    urls = {
+        "video": str(request.url_for("download_source_video", job_id=job.id)),
+    }
+    for language in languages:
+        urls[f"subtitles:{language}"] = _subtitle_url(request, job, language)
+
+    return manifest_builder.build_manifest(job, languages, urls)
+
@@ -1,13 +1,25 @@
+import base64
+import json
 import logging
-from fastapi import APIRouter, HTTPException , UploadFile, File , Form , Depends
+from fastapi import APIRouter, HTTPException , Depends , Query , Request
+from fastapi.concurrency import run_in_threadpool
 from app.api.schemas.job_response import JobResponse
-from app.api.schemas.transcription_request import ModelSize
+from app.api.schemas.job_status_response import JobStatusResponse, MediaInfoResponse, MediaStreamResponse
+from app.api.schemas.job_list_response import JobListResponse, JobSummaryResponse
+from app.api.schemas.transcription_request import ModelSize, DeliveryMode
+from app.api.schemas.add_languages_request import AddLanguagesRequest
+from app.api.schemas.reprocess_request import ReprocessRequest
 from app.models.transcription_job import TranscriptionJob
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 from app.containers.factory import app_container
 from app.services.pipeline_services.integration_service import IntegrationService
+from app.services.pipeline_services.media_inspection_service import UnusableMediaError
+from app.services.pipeline_services.job_cancellation import JobCancelledError
 from app.config.app_config import AppConfig
-from app.utils.video_saver import save_video
+from app.containers.pipeline_services_container import PipelineServicesContainer
+from app.services.model_services.astract_services import AbstractServices
+from app.utils.upload_ingestion import IngestedUpload, UploadRejectedError, ingest_upload
+from app.services.pipeline_services.artifact_store import ArtifactStore, discard_job_artifact
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -23,43 +35,382 @@ def get_integration_service() :
 def get_app_config() : 
     return app_container.app_config
 
+def get_jobs_service() : 
+    return app_container.model_services_container.jobs_services
 
-@router.post("/process", response_model=JobResponse)
+def get_pipeline_services_container() : 
+    return app_container.pipeline_services_container
+
+def get_artifact_store() : 
+    return app_container.pipeline_services_container.artifact_store
+
+
+def _job_response(job: TranscriptionJob) -> JobResponse:
+    return JobResponse(
+        job_id=job.id,
+        processed_video_url=job.processed_video_path,
+        processed=job.processed , 
+        target_languages=job.target_languages , 
+        input_language=job.input_language , 
+        version=job.version , 
+        asr_model_size=job.asr_model_size , 
+        audio_only=job.audio_only , 
+        delivery_mode=job.delivery_mode , 
+        stage=job.stage
+    )
+
+
+# the form /process reads from the request stream itself, documented here for the OpenAPI schema
+PROCESS_FORM_SCHEMA = {
+    "type": "object",
+    "required": ["video", "input_language", "target_languages"],
+    "properties": {
+        "video": {"type": "string", "format": "binary"},
+        "input_language": {
+            "type": "string",
+            "description": "Spoken language of the media (e.g. 'english'), or 'auto' to let Whisper identify it from the audio."
+        },
+        "target_languages": {"type": "array", "items": {"type": "string"}},
+        "asr_model_size": {
+            "type": "string",
+            "enum": [size.value for size in ModelSize],
+            "default": ModelSize.SMALL.value,
+            "description": "Whisper model size: tiny, base, small, medium, or large. Larger models are more accurate but slower."
+        },
+        "delivery_mode": {
+            "type": "string",
+            "enum": [mode.value for mode in DeliveryMode],
+            "description": "'mux' writes a subtitled MKV, 'sidecar' keeps the upload untouched and serves VTT sidecars with a JSON manifest. Defaults to the server's DELIVERY_MODE."
+        },
+    },
+}
+
+
+def _process_form(upload: IngestedUpload) -> Tuple[str, List[str], ModelSize, Optional[DeliveryMode]]:
+    """input_language, target_languages, asr_model_size and delivery_mode of a /process upload, 422 when invalid"""
+    input_language = upload.field("input_language")
+    target_languages = [language for language in upload.field_list("target_languages") if language]
+    if not input_language or not target_languages:
+        raise HTTPException(status_code=422, detail="input_language and target_languages are required")
+    try:
+        asr_model_size = ModelSize(upload.field("asr_model_size") or ModelSize.SMALL.value)
+        delivery_mode = DeliveryMode(upload.field("delivery_mode")) if upload.field("delivery_mode") else None
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return input_language, target_languages, asr_model_size, delivery_mode
+
+
+@router.post(
+    "/process",
+    response_model=JobResponse,
+    status_code=202,
+    openapi_extra={"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": PROCESS_FORM_SCHEMA}}}}
+)
 async def process(
-    video: UploadFile = File(...),
-    input_language: str = Form(...),
-    target_languages: List[str] = Form(...),
-    asr_model_size: ModelSize = Form(
-        default=ModelSize.SMALL,
-        description="Whisper model size: tiny, base, small, medium, or large. Larger models are more accurate but slower."
-    ),
+    request: Request,
     integration_service : IntegrationService = Depends(get_integration_service) , 
     app_config : AppConfig = Depends(get_app_config) , 
+    artifact_store : ArtifactStore = Depends(get_artifact_store) , 
+    jobs_services : AbstractServices[TranscriptionJob] = Depends(get_jobs_service) , 
+    pipeline_services : PipelineServicesContainer = Depends(get_pipeline_services_container) , 
 ):
+    """
+    Upload media and queue it for processing. The body is streamed straight into the artifact store,
+    hashed on the way: 413 past MAX_UPLOAD_MB and 415 for an unknown container, both before the upload
+    completes. The upload is inspected (422 for unusable media) and the queued job is returned at once
+    with 202: follow it on /pipeline/jobs/{job_id}.
+    """
     try:
-        
-        stored_path = save_video(video=video , uploads_dir=app_config.UPLOAD_DIR)
-
-        # Create and process the job
-        job = TranscriptionJob(
-            video_storage_path=str(stored_path),
-            input_language=input_language,
-            target_languages=target_languages,
-            processed=False
+        upload = await ingest_upload(
+            request, store=artifact_store, file_field="video", max_bytes=app_config.MAX_UPLOAD_MB * 1024 * 1024
         )
+    except UploadRejectedError as e:
+        logger.error(f"Rejected upload: {e}")
+        raise HTTPException(status_code=e.status_code, detail=str(e))
 
-        processed_job = integration_service.process(job=job , asr_model_size=asr_model_size.value)
+    try:
+        try:
+            input_language, target_languages, asr_model_size, delivery_mode = _process_form(upload)
 
-        return JobResponse(
-            job_id=processed_job.id,
-            processed_video_url=processed_job.processed_video_path,
-            processed=processed_job.processed , 
-            target_languages=processed_job.target_languages , 
-            input_language=processed_job.input_language
-        )
+            # Create and process the job
+            job = TranscriptionJob(
+                video_storage_path=upload.key,
+                input_language=input_language,
+                target_languages=target_languages,
+                processed=False,
+                delivery_mode=delivery_mode.value if delivery_mode else app_config.DELIVERY_MODE
+            )
+
+            # inspection and the queued record, off the event loop; the pipeline runs on the scheduler's workers
+            job = await run_in_threadpool(integration_service.submit, job=job , asr_model_size=asr_model_size.value)
+        finally:
+            # ingestion pinned the upload until a job record points at it (or none will)
+            artifact_store.unpin(upload.key)
+        pipeline_services.job_scheduler.submit(job)
 
+        return _job_response(job)
+
+    except (HTTPException, UnusableMediaError) as e:
+        # invalid form fields, or unusable media rejected at inspection time: nothing was stored for it,
+        # the upload goes unless an earlier job uploaded the same bytes
+        logger.error(f"Rejected upload {upload.filename}: {e.detail if isinstance(e, HTTPException) else e}")
+        await run_in_threadpool(discard_job_artifact, artifact_store, jobs_services, "original_video_path", upload.key, None)
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing job: {e}")
         raise HTTPException(status_code=500, detail=str(e))
     
 
+
+@router.post("/jobs/{job_id}/languages", response_model=JobResponse)
+async def add_languages(
+    job_id: str,
+    request: AddLanguagesRequest,
+    integration_service : IntegrationService = Depends(get_integration_service) , 
+    jobs_services : AbstractServices[TranscriptionJob] = Depends(get_jobs_service) , 
+):
+    """Translate an existing job into extra languages, reusing its stored transcription"""
+    job = await jobs_services.find_one_by_field_async(field_name="job_id", value=job_id)
+    if not job:
+        logger.warning(f"Job not found for job_id: {job_id}")
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    try:
+        processed_job = await run_in_threadpool(
+            integration_service.add_languages, job_id=job_id, target_languages=request.target_languages
+        )
+
+        return _job_response(processed_job)
+
+    except ValueError as e:
+        logger.error(f"Cannot add languages to job {job_id}: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except JobCancelledError as e:
+        logger.info(f"Job cancelled: {e}")
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error adding languages to job {job_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/jobs/{job_id}/reprocess", response_model=JobResponse)
+async def reprocess(
+    job_id: str,
+    request: ReprocessRequest,
+    integration_service : IntegrationService = Depends(get_integration_service) , 
+    jobs_services : AbstractServices[TranscriptionJob] = Depends(get_jobs_service) , 
+):
+    """Re-run ASR with another model size on the job's stored audio, as a new result version"""
+    job = await jobs_services.find_one_by_field_async(field_name="job_id", value=job_id)
+    if not job:
+        logger.warning(f"Job not found for job_id: {job_id}")
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    try:
+        processed_job = await run_in_threadpool(
+            integration_service.reprocess, job_id=job_id, asr_model_size=request.asr_model_size.value
+        )
+
+        return _job_response(processed_job)
+
+    except ValueError as e:
+        logger.error(f"Cannot reprocess job {job_id}: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except JobCancelledError as e:
+        logger.info(f"Job cancelled: {e}")
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error reprocessing job {job_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/jobs/{job_id}/remux", response_model=JobResponse)
+async def remux(
+    job_id: str,
+    integration_service : IntegrationService = Depends(get_integration_service) , 
+    jobs_services : AbstractServices[TranscriptionJob] = Depends(get_jobs_service) , 
+):
+    """Mux the current subtitle tracks into an MKV, e.g. for a job delivered as sidecars"""
+    job = await jobs_services.find_one_by_field_async(field_name="job_id", value=job_id)
+    if not job:
+        logger.warning(f"Job not found for job_id: {job_id}")
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    try:
+        processed_job = await run_in_threadpool(integration_service.remux, job_id=job_id)
+
+        return _job_response(processed_job)
+
+    except ValueError as e:
+        logger.error(f"Cannot remux job {job_id}: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except JobCancelledError as e:
+        logger.info(f"Job cancelled: {e}")
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error remuxing job {job_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# stored job fields a listing reads, nothing else of the record is touched
+JOB_SUMMARY_FIELDS = (
+    "job_id", "upload_date", "processed", "stage", "progress", "input_language",
+    "target_languages", "version", "audio_only", "delivery_mode"
+)
+
+
+def _encode_cursor(key: Tuple[Any, int]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[Any, int]:
+    try:
+        value, doc_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(value, str) or not isinstance(doc_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, doc_id
+
+
+def _job_summary(row: Dict[str, Any]) -> JobSummaryResponse:
+    # same defaults as TranscriptionJobRepository.from_dict for records written before these fields
+    return JobSummaryResponse(
+        job_id=row["job_id"],
+        upload_date=row["upload_date"],
+        processed=row["processed"],
+        stage=row["stage"] or ("done" if row["processed"] else "queued"),
+        progress=row["progress"] if row["progress"] is not None else (1.0 if row["processed"] else 0.0),
+        input_language=row["input_language"],
+        target_languages=row["target_languages"],
+        version=row["version"] or 1,
+        audio_only=bool(row["audio_only"]),
+        delivery_mode=row["delivery_mode"] or "mux"
+    )
+
+
+@router.get("/jobs", response_model=JobListResponse)
+async def list_jobs(
+    limit: int = Query(default=20, ge=1, le=200),
+    cursor: Optional[str] = Query(default=None, description="next_cursor of the previous page"),
+    processed: Optional[bool] = None,
+    input_language: Optional[str] = None,
+    jobs_services : AbstractServices[TranscriptionJob] = Depends(get_jobs_service)
+):
+    """Most recent jobs first, by upload date, one page at a time, from the jobs' indexes"""
+    filters = {}
+    if processed is not None:
+        filters["processed"] = processed
+    if input_language is not None:
+        filters["input_language"] = input_language
+
+    rows, next_key = await jobs_services.page_async(
+        order_by="upload_date",
+        limit=limit,
+        after=_decode_cursor(cursor) if cursor else None,
+        filters=filters,
+        fields=JOB_SUMMARY_FIELDS
+    )
+
+    return JobListResponse(
+        jobs=[_job_summary(row) for row in rows],
+        next_cursor=_encode_cursor(next_key) if next_key is not None else None
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def job_status(
+    job_id: str,
+    jobs_services : AbstractServices[TranscriptionJob] = Depends(get_jobs_service),
+    pipeline_services : PipelineServicesContainer = Depends(get_pipeline_services_container)
+):
+    """Stage, progress and ETA of a job, with the media metadata found at inspection"""
+    job: TranscriptionJob = await jobs_services.find_one_by_field_async(field_name="job_id", value=job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job with ID {job_id} not found")
+
+    eta_seconds = None
+    if job.estimated_seconds is not None:
+        eta_seconds = round(job.estimated_seconds * (1.0 - job.progress), 1)
+
+    ffmpeg_progress = pipeline_services.ffmpeg.progress.latest.get(job_id)
+
+    media_info = None
+    if job.media_info is not None:
+        media_info = MediaInfoResponse(
+            format_name=job.media_info.format_name,
+            duration=job.media_info.duration,
+            size_bytes=job.media_info.size_bytes,
+            bit_rate=job.media_info.bit_rate,
+            streams=[MediaStreamResponse(**stream) for stream in job.media_info.streams]
+        )
+
+    return JobStatusResponse(
+        job_id=job.id,
+        processed=job.processed,
+        stage=job.stage,
+        progress=job.progress,
+        estimated_seconds=job.estimated_seconds,
+        eta_seconds=eta_seconds,
+        audio_only=job.audio_only,
+        media_info=media_info,
+        ffmpeg_progress=ffmpeg_progress.to_dict() if ffmpeg_progress and job.stage not in ("done", "failed", "cancelled") else None,
+        queue_position=pipeline_services.job_scheduler.queue_position(job_id) if job.stage == "queued" else None
+    )
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(
+    job_id: str,
+    jobs_services : AbstractServices[TranscriptionJob] = Depends(get_jobs_service),
+    integration_service : IntegrationService = Depends(get_integration_service)
+):
+    """Cancel a running job: its ffmpeg process is killed, in-process stages stop at the next stage boundary"""
+    job: TranscriptionJob = await jobs_services.find_one_by_field_async(field_name="job_id", value=job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job with ID {job_id} not found")
+
+    if not integration_service.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is not running (stage: {job.stage})")
+
+    return {"job_id": job_id, "cancelled": True}
+
+
+@router.get("/stats")
+async def stats(pipeline_services : PipelineServicesContainer = Depends(get_pipeline_services_container)):
+    """Job scheduler, ASR cache, batching, rendered subtitle cache and entity cache counters"""
+    model_services = app_container.model_services_container
+    return {
+        "job_scheduler" : pipeline_services.job_scheduler.stats() , 
+        "asr_cache" : pipeline_services.transcription_cache.stats() , 
+        "asr_batching" : pipeline_services.asr_batching_server.stats() , 
+        "subtitle_cache" : pipeline_services.subtitle_renderer.stats() , 
+        "entity_cache" : {
+            "jobs" : model_services.jobs_services.cache_stats() ,
+            "transcriptions" : model_services.transcription_services.cache_stats() ,
+            "summaries" : model_services.summary_services.cache_stats() ,
+        } ,
+    }
+
+
+@router.get("/retention")
+async def retention(pipeline_services : PipelineServicesContainer = Depends(get_pipeline_services_container)):
+    """Disk usage per artifact directory, the last retention run, and what a run would delete now"""
+    retention_service = pipeline_services.retention_service
+    plan = await run_in_threadpool(retention_service.run, dry_run=True)
+    return {
+        "last_run" : retention_service.last_report ,
+        "plan" : plan ,
+    }
+
+
+@router.post("/retention/run")
+async def run_retention(
+    dry_run: Optional[bool] = Query(default=None, description="Only report what would be deleted. Defaults to the server's RETENTION_DRY_RUN."),
+    pipeline_services : PipelineServicesContainer = Depends(get_pipeline_services_container)
+):
+    """Bring the artifact directories back under their quotas now"""
+    return await run_in_threadpool(pipeline_services.retention_service.run, dry_run=dry_run)
@@ -0,0 +1,12 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class AddLanguagesRequest(BaseModel):
+    """Request model for adding subtitle languages to an existing job"""
+
+    target_languages: List[str] = Field(
+        ...,
+        min_length=1,
+        description="Languages to add to the job (languages the job already has are ignored)"
+    )
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+
+
+class JobSummaryResponse(BaseModel):
+    job_id: str
+    upload_date: datetime
+    processed: bool
+    stage: str
+    progress: float  # 0..1
+    input_language: str
+    target_languages: List[str]
+    version: int = 1
+    audio_only: bool = False
+    delivery_mode: str = "mux"
+
+
+class JobListResponse(BaseModel):
+    jobs: List[JobSummaryResponse]
+    next_cursor: Optional[str] = None  # pass as `cursor` for the next page, None on the last one
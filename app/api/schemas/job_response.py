@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 class JobResponse(BaseModel) : 
 
@@ -8,6 +8,11 @@ class JobResponse(BaseModel) :
     processed : bool 
     target_languages : List[str] 
     input_language : str 
+    version : int = 1 
+    asr_model_size : Optional[str] = None 
+    audio_only : bool = False  # no video stream, processed_video_url stays empty
+    delivery_mode : str = "mux"  # "sidecar": processed_video_url stays empty until an explicit remux
+    stage : Optional[str] = None  # "queued" right after /process, follow it on /pipeline/jobs/{job_id}
 
 
     class Config : 
@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+
+class MediaStreamResponse(BaseModel):
+    index: Optional[int] = None
+    codec_type: Optional[str] = None
+    codec_name: Optional[str] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+class MediaInfoResponse(BaseModel):
+    format_name: str
+    duration: float  # seconds
+    size_bytes: int
+    bit_rate: Optional[int] = None
+    streams: List[MediaStreamResponse]
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    processed: bool
+    stage: str
+    progress: float  # 0..1
+    estimated_seconds: Optional[float] = None  # expected total processing time
+    eta_seconds: Optional[float] = None  # expected remaining time
+    audio_only: bool = False
+    media_info: Optional[MediaInfoResponse] = None
+    ffmpeg_progress: Optional[Dict] = None  # percent/eta of the ffmpeg run in progress, if any
+    queue_position: Optional[int] = None  # jobs starting before this one, while it is queued
@@ -0,0 +1,11 @@
+from pydantic import BaseModel, Field
+from app.api.schemas.transcription_request import ModelSize
+
+
+class ReprocessRequest(BaseModel):
+    """Request model for re-running ASR on an existing job"""
+
+    asr_model_size: ModelSize = Field(
+        ...,
+        description="Whisper model size to re-run speech recognition with"
+    )
@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class SubtitleFormat(str, Enum):
+    """Formats the subtitle endpoint renders from the stored cues"""
+    VTT = "vtt"
+    SRT = "srt"
+    TTML = "ttml"
+    JSON = "json"
@@ -7,6 +7,7 @@ class SummaryResponse(BaseModel):
     job_id: str
     text_content: str
     language: str
+    version: int = 1
 
 
 class SummariesResponse(BaseModel):
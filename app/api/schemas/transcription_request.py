@@ -10,6 +10,11 @@ class ModelSize(str, Enum):
     MEDIUM = "medium"
     LARGE = "large"
 
+class DeliveryMode(str, Enum):
+    """How the subtitles are delivered with the video"""
+    MUX = "mux"          # subtitle tracks muxed into a new MKV
+    SIDECAR = "sidecar"  # original upload untouched, VTT sidecars + JSON manifest
+
 class TranscriptionRequest(BaseModel):
     """Request model for transcription processing"""
     
@@ -16,6 +16,95 @@ class AppConfig:
         self.TRANSCRIPTIONS_DIR = self._resolve_path(self._get_env("TRANSCRIPTIONS_DIR"))
         self.UPLOAD_DIR = self._resolve_path(self._get_env("UPLOAD_DIR"))
 
+        # TinyDB storage: "json" rewrites the whole file on every change, "wal" keeps the database in memory,
+        # appends each change to DB_PATH.wal (fsync "always", "interval" or "never") and compacts into DB_PATH
+        self.DB_STORAGE = os.getenv("DB_STORAGE", "json").strip().lower()
+        if self.DB_STORAGE not in ("json", "wal"):
+            raise ValueError(f"DB_STORAGE must be 'json' or 'wal', got: {self.DB_STORAGE}")
+        self.DB_WAL_FSYNC = os.getenv("DB_WAL_FSYNC", "interval").strip().lower()
+        self.DB_WAL_FSYNC_INTERVAL_MS = self._get_int_env("DB_WAL_FSYNC_INTERVAL_MS", default=1000)
+        self.DB_WAL_COMPACT_MB = self._get_int_env("DB_WAL_COMPACT_MB", default=16)
+
+        # Transcription chunk lists are stored once per (job, version, language) as compact .npz files
+        # under CHUNKS_DIR and loaded lazily; an empty CHUNKS_DIR keeps them inline in the database
+        chunks_dir = os.getenv("CHUNKS_DIR", os.path.join(os.path.dirname(self.DB_PATH), "chunks"))
+        self.CHUNKS_DIR = self._resolve_path(chunks_dir) if chunks_dir else None
+
+        # Threads running the repository calls of async endpoints, apart from Starlette's threadpool
+        self.DB_IO_THREADS = self._get_int_env("DB_IO_THREADS", default=8)
+
+        # Read-through cache of job/transcription/summary lookups in the services layer (0 entries disables it).
+        # Writes through the services invalidate it, the TTL bounds staleness for writes from other workers.
+        self.ENTITY_CACHE_MAX_ENTRIES = self._get_int_env("ENTITY_CACHE_MAX_ENTRIES", default=1024)
+        self.ENTITY_CACHE_TTL_SECONDS = self._get_int_env("ENTITY_CACHE_TTL_SECONDS", default=5)
+
+        # Cross-job ASR micro-batching (optional)
+        self.ASR_BATCHING_ENABLED = self._get_bool_env("ASR_BATCHING_ENABLED", default=False)
+        self.ASR_BATCH_SIZE = self._get_int_env("ASR_BATCH_SIZE", default=8)
+        self.ASR_BATCH_MAX_WAIT_MS = self._get_int_env("ASR_BATCH_MAX_WAIT_MS", default=50)
+        # Seconds shared by consecutive 30 s windows, so words at a window edge are decoded whole
+        self.ASR_BATCH_OVERLAP_SECONDS = self._get_int_env("ASR_BATCH_OVERLAP_SECONDS", default=5)
+
+        # Number of 30 s windows (picked by energy) used for input_language="auto"
+        self.LANGUAGE_DETECTION_WINDOWS = self._get_int_env("LANGUAGE_DETECTION_WINDOWS", default=1)
+
+        # ASR result cache keyed by PCM fingerprint / model size / language / task (0 entries disables it)
+        self.ASR_CACHE_MAX_ENTRIES = self._get_int_env("ASR_CACHE_MAX_ENTRIES", default=64)
+        self.ASR_CACHE_MAX_MB = self._get_int_env("ASR_CACHE_MAX_MB", default=256)
+
+        # Parallel time-sharded ASR for long media (0/1 workers disables it)
+        self.ASR_SHARD_WORKERS = self._get_int_env("ASR_SHARD_WORKERS", default=0)
+        self.ASR_SHARD_MIN_SECONDS = self._get_int_env("ASR_SHARD_MIN_SECONDS", default=300)
+        self.ASR_SHARD_OVERLAP_SECONDS = self._get_int_env("ASR_SHARD_OVERLAP_SECONDS", default=5)
+
+        # Upper bound for a single ffmpeg run (extraction, decoding of audio-only uploads, muxing), the process is killed after it (0 = no limit)
+        self.FFMPEG_TIMEOUT_SECONDS = self._get_int_env("FFMPEG_TIMEOUT_SECONDS", default=3600)
+
+        # How subtitles reach the viewer: "mux" writes a subtitled MKV, "sidecar" serves the untouched
+        # upload with VTT sidecars and a JSON manifest (remux only on request)
+        self.DELIVERY_MODE = os.getenv("DELIVERY_MODE", "mux").strip().lower()
+        if self.DELIVERY_MODE not in ("mux", "sidecar"):
+            raise ValueError(f"DELIVERY_MODE must be 'mux' or 'sidecar', got: {self.DELIVERY_MODE}")
+
+        # Rendered subtitle bodies (VTT/SRT/TTML/JSON + gzip) kept in memory for polling players
+        self.SUBTITLE_CACHE_MAX_ENTRIES = self._get_int_env("SUBTITLE_CACHE_MAX_ENTRIES", default=256)
+        self.SUBTITLE_CACHE_MAX_MB = self._get_int_env("SUBTITLE_CACHE_MAX_MB", default=32)
+
+        # Subtitle files written per transcription, "vtt" first (e.g. "vtt,srt" also writes an .srt next to each .vtt)
+        self.SUBTITLE_FILE_FORMATS = tuple(
+            fmt.strip().lower() for fmt in os.getenv("SUBTITLE_FILE_FORMATS", "vtt").split(",") if fmt.strip()
+        )
+
+        # Large file delivery: "app" streams from the worker (ranges, ETags), "x-accel"/"x-sendfile"
+        # hand the transfer to nginx/Apache. X_ACCEL_ROOT is the directory served under X_ACCEL_PREFIX.
+        self.FILE_SERVING_MODE = os.getenv("FILE_SERVING_MODE", "app").strip().lower()
+        self.X_ACCEL_PREFIX = os.getenv("X_ACCEL_PREFIX", "/protected")
+        self.X_ACCEL_ROOT = self._resolve_path(os.getenv("X_ACCEL_ROOT") or self.BASE_DIR)
+
+        # Uploads longer than this are rejected at inspection time (0 = no limit)
+        self.MAX_MEDIA_DURATION_SECONDS = self._get_int_env("MAX_MEDIA_DURATION_SECONDS", default=0)
+
+        # Uploads larger than this are rejected with 413 while they stream in (0 = no limit)
+        self.MAX_UPLOAD_MB = self._get_int_env("MAX_UPLOAD_MB", default=2048)
+
+        # Uploaded jobs run on this many worker threads, queued jobs shortest estimated processing time first
+        self.PIPELINE_WORKERS = self._get_int_env("PIPELINE_WORKERS", default=2)
+
+        # Retention: the audio extracted for ASR is deleted once ASR is done (reprocessing extracts it again),
+        # and every RETENTION_INTERVAL_SECONDS directories over their quota (MB, 0 = none) are brought back
+        # under it: unreferenced files first, then least recently used finished jobs. Files younger than
+        # RETENTION_MIN_AGE_MINUTES are kept. RETENTION_DRY_RUN only reports what would be deleted.
+        self.RETENTION_DELETE_AUDIO_AFTER_ASR = self._get_bool_env("RETENTION_DELETE_AUDIO_AFTER_ASR", default=True)
+        self.RETENTION_UPLOAD_DIR_MB = self._get_int_env("RETENTION_UPLOAD_DIR_MB", default=0)
+        self.RETENTION_AUDIOS_DIR_MB = self._get_int_env("RETENTION_AUDIOS_DIR_MB", default=0)
+        self.RETENTION_PROCESSED_VID_DIR_MB = self._get_int_env("RETENTION_PROCESSED_VID_DIR_MB", default=0)
+        self.RETENTION_TRANSCRIPTIONS_DIR_MB = self._get_int_env("RETENTION_TRANSCRIPTIONS_DIR_MB", default=0)
+        # CHUNKS_DIR: only chunk lists no transcription points at are deleted
+        self.RETENTION_CHUNKS_DIR_MB = self._get_int_env("RETENTION_CHUNKS_DIR_MB", default=0)
+        self.RETENTION_INTERVAL_SECONDS = self._get_int_env("RETENTION_INTERVAL_SECONDS", default=3600)
+        self.RETENTION_MIN_AGE_MINUTES = self._get_int_env("RETENTION_MIN_AGE_MINUTES", default=60)
+        self.RETENTION_DRY_RUN = self._get_bool_env("RETENTION_DRY_RUN", default=False)
+
         # Create directories if they do not exist
         for directory in [
             os.path.dirname(self.DB_PATH),
@@ -33,6 +122,21 @@ class AppConfig:
             raise ValueError(f"Missing required environment variable: {name}")
         return value
 
+    def _get_int_env(self, name: str, default: int) -> int:
+        value = os.getenv(name)
+        if not value:
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError(f"Environment variable {name} must be an integer, got: {value}")
+
+    def _get_bool_env(self, name: str, default: bool) -> bool:
+        value = os.getenv(name)
+        if not value:
+            return default
+        return value.strip().lower() in ("1", "true", "yes", "on")
+
     def _resolve_path(self, path: str) -> str:
         # If path is absolute, return as is; else, join with BASE_DIR
         if os.path.isabs(path):
@@ -2,6 +2,9 @@ from app.config.app_config import AppConfig
 from app.containers.repositories_container import RepositoriesContainer
 from app.containers.model_services_container import ModelServicesContainer
 from app.containers.pipeline_services_container import PipelineServicesContainer
+from app.utils.file_serving import FileServer
+from app.repositories.wal_storage import WALOptions
+from typing import Optional
 
 
 
@@ -11,15 +14,34 @@ class ApplicationContainer :
         
         self.app_config = AppConfig() 
 
-        self._repositories_container : RepositoriesContainer = RepositoriesContainer(db_path=self.app_config.DB_PATH) 
+        self._repositories_container : RepositoriesContainer = RepositoriesContainer(
+            db_path=self.app_config.DB_PATH,
+            wal_options=self._wal_options(),
+            chunks_dir=self.app_config.CHUNKS_DIR,
+            io_threads=self.app_config.DB_IO_THREADS
+        )
         self._model_services_container : ModelServicesContainer = None 
         self._pipeline_services_container : PipelineServicesContainer = None
+        self._file_server : FileServer = None
+
+    def _wal_options(self) -> Optional[WALOptions]:
+        if self.app_config.DB_STORAGE != "wal":
+            return None
+        return WALOptions(
+            fsync=self.app_config.DB_WAL_FSYNC,
+            fsync_interval=self.app_config.DB_WAL_FSYNC_INTERVAL_MS / 1000,
+            compact_bytes=self.app_config.DB_WAL_COMPACT_MB * 1024 * 1024
+        )
 
     @property
     def model_services_container(self) -> ModelServicesContainer : 
 
         if self._model_services_container is None : 
-            self._model_services_container = ModelServicesContainer(repositories_container=self._repositories_container)
+            self._model_services_container = ModelServicesContainer(
+                repositories_container=self._repositories_container,
+                cache_max_entries=self.app_config.ENTITY_CACHE_MAX_ENTRIES,
+                cache_ttl_seconds=self.app_config.ENTITY_CACHE_TTL_SECONDS
+            )
         
         return self._model_services_container
     
@@ -34,5 +56,14 @@ class ApplicationContainer :
         
         return self._pipeline_services_container
 
+    @property
+    def file_server(self) -> FileServer : 
 
-
+        if self._file_server is None : 
+            self._file_server = FileServer(
+                mode=self.app_config.FILE_SERVING_MODE , 
+                accel_prefix=self.app_config.X_ACCEL_PREFIX , 
+                accel_root=self.app_config.X_ACCEL_ROOT
+            )
+        
+        return self._file_server
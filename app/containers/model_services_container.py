@@ -6,10 +6,16 @@ from app.models.transcription import Transcription
 from app.models.transcription_job import TranscriptionJob
 from app.models.summary import Summary
 from app.containers.repositories_container import RepositoriesContainer
+from app.services.model_services.entity_cache import EntityCache
+from typing import Optional
 
 class ModelServicesContainer:
-    def __init__(self, repositories_container: RepositoriesContainer):
+    def __init__(self, repositories_container: RepositoriesContainer, cache_max_entries: int = 0,
+                 cache_ttl_seconds: float = 5.0):
         self.repositories_container = repositories_container
+        # one read-through cache per entity type, 0 entries disables them
+        self.cache_max_entries = cache_max_entries
+        self.cache_ttl_seconds = cache_ttl_seconds
         self._transcription_service: AbstractServices[Transcription] = None
         self._job_service: AbstractServices[TranscriptionJob] = None
         self._summary_service: AbstractServices[Summary] = None
@@ -18,7 +24,8 @@ class ModelServicesContainer:
     def transcription_services(self) -> AbstractServices[Transcription]:
         if self._transcription_service is None:
             self._transcription_service = TranscriptionServices(
-                repository=self.repositories_container.transcriptions_repository
+                repository=self.repositories_container.transcriptions_repository,
+                cache=self._entity_cache()
             )
         return self._transcription_service
 
@@ -26,7 +33,8 @@ class ModelServicesContainer:
     def jobs_services(self) -> AbstractServices[TranscriptionJob]:
         if self._job_service is None:
             self._job_service = TranscriptionJobServices(
-                repository=self.repositories_container.jobs_repository
+                repository=self.repositories_container.jobs_repository,
+                cache=self._entity_cache()
             )
         return self._job_service
 
@@ -34,12 +42,12 @@ class ModelServicesContainer:
     def summary_services(self) -> AbstractServices[Summary]:
         if self._summary_service is None:
             self._summary_service = SummaryServices(
-                repository=self.repositories_container.summaries_repository
+                repository=self.repositories_container.summaries_repository,
+                cache=self._entity_cache()
             )
         return self._summary_service
 
-    
-    
-    
-    
-        
\ No newline at end of file
+    def _entity_cache(self) -> Optional[EntityCache]:
+        if self.cache_max_entries <= 0:
+            return None
+        return EntityCache(max_entries=self.cache_max_entries, ttl_seconds=self.cache_ttl_seconds)
@@ -1,10 +1,21 @@
 from app.services.pipeline_services.ffmpeg_service import FfmpegUtils
+from app.services.pipeline_services.ffmpeg_runner import FfmpegRunner
+from app.services.pipeline_services.job_cancellation import CancellationRegistry
 from app.services.pipeline_services.audio_service import AudioUtils
+from app.services.pipeline_services.media_inspection_service import MediaInspector
 from app.services.pipeline_services.summarization_service import SummarizationModel
 from app.services.pipeline_services.transcription_service import ASRModel
+from app.services.pipeline_services.asr_batching_service import ASRBatchingServer
+from app.services.pipeline_services.transcription_cache import TranscriptionCache
+from app.services.pipeline_services.sharding_service import ShardedTranscriber
 from app.services.pipeline_services.translation_service import TranslationModel
 from app.services.pipeline_services.subtitle_formatter_service import SubtitleWriter
 from app.services.pipeline_services.integration_service import IntegrationService
+from app.services.pipeline_services.job_scheduler import JobScheduler
+from app.services.pipeline_services.manifest_service import ManifestBuilder
+from app.services.pipeline_services.subtitle_renderer import SubtitleRenderer
+from app.services.pipeline_services.retention_service import ArtifactDirectory, RetentionService
+from app.services.pipeline_services.artifact_store import ArtifactStore, LocalFileBackend
 from app.containers.model_services_container import ModelServicesContainer
 from app.config.app_config import AppConfig
 
@@ -12,37 +23,122 @@ class PipelineServicesContainer:
     def __init__(self, model_services_container: ModelServicesContainer , app_config : AppConfig ):
         self.model_services_container = model_services_container
         self._ffmpeg = None
+        self._ffmpeg_runner = None
+        self._cancellation = None
         self._audio_utils = None
+        self._media_inspector = None
         self._asr_model = None
+        self._transcription_cache = None
+        self._asr_batching_server = None
+        self._sharded_transcriber = None
         self._translator = None
         self._subtitle_writer = None
         self._summarization_model = None
         self._integration_service = None
+        self._job_scheduler = None
+        self._manifest_builder = None
+        self._subtitle_renderer = None
+        self._retention_service = None
+        self._artifact_store = None
         self.app_config = app_config
         
 
+    @property
+    def cancellation(self):
+        if self._cancellation is None:
+            self._cancellation = CancellationRegistry()
+        return self._cancellation
+
+    @property
+    def artifact_store(self):
+        if self._artifact_store is None:
+            roots = {
+                "uploads": self.app_config.UPLOAD_DIR,
+                "audios": self.app_config.AUDIOS_DIR,
+                "processed_videos": self.app_config.PROCESSED_VID_DIR,
+                "transcriptions": self.app_config.TRANSCRIPTIONS_DIR,
+            }
+            self._artifact_store = ArtifactStore(
+                backend=LocalFileBackend(roots),
+                # paths stored before the store, possibly by another checkout, are looked up there by name
+                legacy_dirs=list(roots.values())
+            )
+        return self._artifact_store
+
+    @property
+    def ffmpeg_runner(self):
+        if self._ffmpeg_runner is None:
+            self._ffmpeg_runner = FfmpegRunner(
+                timeout_seconds=self.app_config.FFMPEG_TIMEOUT_SECONDS or None
+            )
+        return self._ffmpeg_runner
+
     @property
     def ffmpeg(self):
         if self._ffmpeg is None:
             self._ffmpeg = FfmpegUtils(
-                job_service=self.model_services_container.jobs_services
+                job_service=self.model_services_container.jobs_services,
+                runner=self.ffmpeg_runner,
+                cancellation=self.cancellation,
+                store=self.artifact_store
             )
         return self._ffmpeg
 
+    @property
+    def media_inspector(self):
+        if self._media_inspector is None:
+            self._media_inspector = MediaInspector(
+                max_duration_seconds=self.app_config.MAX_MEDIA_DURATION_SECONDS
+            )
+        return self._media_inspector
+
     @property
     def audio_utils(self):
         if self._audio_utils is None:
             self._audio_utils = AudioUtils
         return self._audio_utils
 
+    @property
+    def transcription_cache(self):
+        if self._transcription_cache is None:
+            self._transcription_cache = TranscriptionCache(
+                max_entries=self.app_config.ASR_CACHE_MAX_ENTRIES,
+                max_bytes=self.app_config.ASR_CACHE_MAX_MB * 1024 * 1024
+            )
+        return self._transcription_cache
+
     @property
     def asr_model(self):
         if self._asr_model is None:
-            self._asr_model = ASRModel()
+            self._asr_model = ASRModel(
+                language_detection_windows=self.app_config.LANGUAGE_DETECTION_WINDOWS,
+                cache=self.transcription_cache
+            )
         return self._asr_model
 
     @property
-    
+    def asr_batching_server(self):
+        if self._asr_batching_server is None:
+            self._asr_batching_server = ASRBatchingServer(
+                asr_model=self.asr_model,
+                max_batch_size=self.app_config.ASR_BATCH_SIZE,
+                max_wait_ms=self.app_config.ASR_BATCH_MAX_WAIT_MS,
+                overlap_seconds=self.app_config.ASR_BATCH_OVERLAP_SECONDS
+            )
+        return self._asr_batching_server
+
+    @property
+    def sharded_transcriber(self):
+        if self._sharded_transcriber is None:
+            self._sharded_transcriber = ShardedTranscriber(
+                max_workers=self.app_config.ASR_SHARD_WORKERS,
+                min_shard_seconds=self.app_config.ASR_SHARD_MIN_SECONDS,
+                overlap_seconds=self.app_config.ASR_SHARD_OVERLAP_SECONDS,
+                language_detection_windows=self.app_config.LANGUAGE_DETECTION_WINDOWS
+            )
+        return self._sharded_transcriber
+
+    @property
     def translator(self):
         if self._translator is None:
             self._translator = TranslationModel(
@@ -55,7 +151,9 @@ class PipelineServicesContainer:
     def subtitle_writer(self):
         if self._subtitle_writer is None:
             self._subtitle_writer = SubtitleWriter(
-                transcription_service=self.model_services_container.transcription_services
+                transcription_service=self.model_services_container.transcription_services,
+                formats=self.app_config.SUBTITLE_FILE_FORMATS,
+                store=self.artifact_store
             )
         return self._subtitle_writer
     
@@ -70,16 +168,71 @@ class PipelineServicesContainer:
             )
         return self._summarization_model
 
+    @property
+    def manifest_builder(self):
+        if self._manifest_builder is None:
+            self._manifest_builder = ManifestBuilder()
+        return self._manifest_builder
+
+    @property
+    def subtitle_renderer(self):
+        if self._subtitle_renderer is None:
+            self._subtitle_renderer = SubtitleRenderer(
+                max_entries=self.app_config.SUBTITLE_CACHE_MAX_ENTRIES,
+                max_bytes=self.app_config.SUBTITLE_CACHE_MAX_MB * 1024 * 1024
+            )
+        return self._subtitle_renderer
+
+    @property
+    def retention_service(self):
+        if self._retention_service is None:
+            config = self.app_config
+            self._retention_service = RetentionService(
+                job_services=self.model_services_container.jobs_services,
+                transcription_services=self.model_services_container.transcription_services,
+                directories=[
+                    ArtifactDirectory("uploads", config.UPLOAD_DIR, config.RETENTION_UPLOAD_DIR_MB * 1024 * 1024),
+                    ArtifactDirectory("audios", config.AUDIOS_DIR, config.RETENTION_AUDIOS_DIR_MB * 1024 * 1024),
+                    ArtifactDirectory("processed_videos", config.PROCESSED_VID_DIR, config.RETENTION_PROCESSED_VID_DIR_MB * 1024 * 1024),
+                    ArtifactDirectory("transcriptions", config.TRANSCRIPTIONS_DIR, config.RETENTION_TRANSCRIPTIONS_DIR_MB * 1024 * 1024),
+                ] + ([ArtifactDirectory("chunks", config.CHUNKS_DIR, config.RETENTION_CHUNKS_DIR_MB * 1024 * 1024)]
+                     if config.CHUNKS_DIR else []),
+                delete_audio_after_asr=config.RETENTION_DELETE_AUDIO_AFTER_ASR,
+                min_age_seconds=config.RETENTION_MIN_AGE_MINUTES * 60,
+                interval_seconds=config.RETENTION_INTERVAL_SECONDS,
+                dry_run=config.RETENTION_DRY_RUN,
+                store=self.artifact_store,
+                chunk_store=self.model_services_container.repositories_container.chunk_store
+            )
+        return self._retention_service
+
     @property
     def integration_service(self):
         if self._integration_service is None:
             self._integration_service = IntegrationService(
                 ffmpeg=self.ffmpeg, 
+                media_inspector=self.media_inspector, 
                 audio_utils=self.audio_utils, 
-                asr_model=self.asr_model, 
+                asr_model=self.asr_batching_server if self.app_config.ASR_BATCHING_ENABLED else self.asr_model, 
+                sharded_transcriber=self.sharded_transcriber, 
                 translator=self.translator, 
                 writer=self.subtitle_writer,
                 summarization_model=self.summarization_model,
-                app_config=self.app_config
+                job_services=self.model_services_container.jobs_services,
+                transcription_services=self.model_services_container.transcription_services,
+                app_config=self.app_config,
+                cancellation=self.cancellation,
+                subtitle_renderer=self.subtitle_renderer,
+                retention=self.retention_service,
+                store=self.artifact_store
             )
         return self._integration_service
+
+    @property
+    def job_scheduler(self):
+        if self._job_scheduler is None:
+            self._job_scheduler = JobScheduler(
+                run=self.integration_service.execute,
+                max_workers=self.app_config.PIPELINE_WORKERS
+            )
+        return self._job_scheduler
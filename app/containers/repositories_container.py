@@ -5,11 +5,21 @@ from app.repositories.abstract_repository import AbstractRepository
 from app.models.transcription import Transcription
 from app.models.transcription_job import TranscriptionJob
 from app.models.summary import Summary
+from app.repositories.wal_storage import WALOptions
+from app.repositories.chunk_store import ChunkStore
+from app.repositories.io_executor import DEFAULT_IO_THREADS, create_io_executor
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
 
 class RepositoriesContainer:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, wal_options: Optional[WALOptions] = None, chunks_dir: Optional[str] = None,
+                 io_threads: int = DEFAULT_IO_THREADS):
         self.db_path = db_path
+        self.wal_options = wal_options
+        self.chunk_store: Optional[ChunkStore] = ChunkStore(chunks_dir) if chunks_dir else None
+        # the async repository methods of all three repositories share this pool
+        self.io_executor: ThreadPoolExecutor = create_io_executor(io_threads)
         self._transcription_repo: AbstractRepository[Transcription] = None
         self._job_repo: AbstractRepository[TranscriptionJob] = None
         self._summary_repo: AbstractRepository[Summary] = None
@@ -17,17 +27,26 @@ class RepositoriesContainer:
     @property
     def jobs_repository(self) -> AbstractRepository[TranscriptionJob]:
         if self._job_repo is None:
-            self._job_repo = TranscriptionJobRepository(db_path=self.db_path)
+            self._job_repo = TranscriptionJobRepository(
+                db_path=self.db_path, wal_options=self.wal_options, io_executor=self.io_executor
+            )
         return self._job_repo
 
     @property
     def transcriptions_repository(self) -> AbstractRepository[Transcription]:
         if self._transcription_repo is None:
-            self._transcription_repo = TranscriptionRepository(db_path=self.db_path)
+            self._transcription_repo = TranscriptionRepository(
+                db_path=self.db_path,
+                wal_options=self.wal_options,
+                chunk_store=self.chunk_store,
+                io_executor=self.io_executor
+            )
         return self._transcription_repo
 
     @property
     def summaries_repository(self) -> AbstractRepository[Summary]:
         if self._summary_repo is None:
-            self._summary_repo = SummaryRepository(db_path=self.db_path)
+            self._summary_repo = SummaryRepository(
+                db_path=self.db_path, wal_options=self.wal_options, io_executor=self.io_executor
+            )
         return self._summary_repo
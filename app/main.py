@@ -1,9 +1,30 @@
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.api.routers.pipeline_router import router as pipeline_router
 from app.api.routers.downloads_router import router as downloads_router
-
-app = FastAPI() 
+from app.containers.factory import app_container
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # background retention runs (a no-op without RETENTION_* quotas)
+    retention_service = app_container.pipeline_services_container.retention_service
+    retention_service.start()
+    # pipeline workers start with the first upload
+    job_scheduler = app_container.pipeline_services_container.job_scheduler
+    job_scheduler.start()
+    # jobs a previous run left queued are queued again, the ones it was running are marked failed
+    for job in app_container.pipeline_services_container.integration_service.recover_jobs():
+        job_scheduler.submit(job)
+    yield
+    retention_service.stop(timeout=5)
+    # running pipeline jobs finish, queued ones stay "queued" until the next startup
+    job_scheduler.stop(timeout=5)
+    app_container.pipeline_services_container.sharded_transcriber.shutdown()
+
+
+app = FastAPI(lifespan=lifespan) 
 
 from fastapi.middleware.cors import CORSMiddleware
 
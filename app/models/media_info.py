@@ -0,0 +1,90 @@
+from typing import Dict, List, Optional
+
+
+class MediaInfo:
+    """What ffprobe reported about an upload: container, duration and the stream layout."""
+
+    # stream fields kept from the ffprobe output, the rest is noise for the pipeline
+    STREAM_FIELDS = ("index", "codec_type", "codec_name", "sample_rate", "channels", "width", "height")
+
+    def __init__(self,
+                 format_name: str = "",
+                 duration: float = 0.0,
+                 size_bytes: int = 0,
+                 bit_rate: Optional[int] = None,
+                 streams: Optional[List[Dict]] = None):
+
+        self.format_name = format_name
+        self.duration = duration
+        self.size_bytes = size_bytes
+        self.bit_rate = bit_rate
+        self.streams = streams or []
+
+    @classmethod
+    def from_probe(cls, probe: Dict) -> "MediaInfo":
+        fmt = probe.get("format", {})
+
+        streams = []
+        for stream in probe.get("streams", []):
+            info = {field: stream[field] for field in cls.STREAM_FIELDS if field in stream}
+            for field in ("sample_rate", "channels", "width", "height"):
+                if field in info:
+                    info[field] = int(info[field])
+            # cover art in audio files shows up as a single-frame video stream
+            info["attached_pic"] = bool(stream.get("disposition", {}).get("attached_pic"))
+            streams.append(info)
+
+        # some containers only report the duration on the streams
+        duration = _to_float(fmt.get("duration"))
+        if not duration:
+            duration = max((_to_float(s.get("duration")) for s in probe.get("streams", [])), default=0.0)
+
+        return cls(
+            format_name=fmt.get("format_name", ""),
+            duration=duration,
+            size_bytes=int(_to_float(fmt.get("size"))),
+            bit_rate=int(_to_float(fmt.get("bit_rate"))) or None,
+            streams=streams
+        )
+
+    @property
+    def audio_streams(self) -> List[Dict]:
+        return [s for s in self.streams if s.get("codec_type") == "audio"]
+
+    @property
+    def video_streams(self) -> List[Dict]:
+        return [s for s in self.streams if s.get("codec_type") == "video" and not s.get("attached_pic")]
+
+    @property
+    def has_audio(self) -> bool:
+        return len(self.audio_streams) > 0
+
+    @property
+    def has_video(self) -> bool:
+        return len(self.video_streams) > 0
+
+    @property
+    def audio_codec(self) -> Optional[str]:
+        return self.audio_streams[0].get("codec_name") if self.has_audio else None
+
+    @property
+    def video_codec(self) -> Optional[str]:
+        return self.video_streams[0].get("codec_name") if self.has_video else None
+
+    def is_pcm_wav(self, sampling_rate: int = 16000, channels: int = 1) -> bool:
+        """True when the media is a WAV whose first audio stream is already PCM at the given rate/layout"""
+        if not self.has_audio or "wav" not in self.format_name:
+            return False
+        stream = self.audio_streams[0]
+        return (
+            stream.get("codec_name", "").startswith("pcm_")
+            and stream.get("sample_rate") == sampling_rate
+            and stream.get("channels") == channels
+        )
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
@@ -10,9 +10,11 @@ class Summary :
                  text_content : str , 
                  language : str , 
                  id : Optional[str] = None , 
+                 version : int = 1 , 
 ):
         
         self.summary_id = id or  f"summary{uuid.uuid4().hex[:]}_{job_id}"
         self.job_id = job_id
         self.text_content = text_content
-        self.language = language
\ No newline at end of file
+        self.language = language
+        self.version = version
\ No newline at end of file
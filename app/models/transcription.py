@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 
 
 class Transcription:
@@ -14,7 +14,8 @@ class Transcription:
                  target_language: Optional[str] = None,
                  filepath: Optional[str] = None,
                  creation_datetime: Optional[datetime] = None,
-                 transcription_id: Optional[str] = None):
+                 transcription_id: Optional[str] = None,
+                 version: int = 1):
         
         self.id = transcription_id or f"transcription_{uuid.uuid4().hex[:]}_{job_id}"
         self.job_id = job_id
@@ -26,5 +27,32 @@ class Transcription:
         self.target_language = target_language
         self.filepath = filepath
         self.creation_datetime: datetime = creation_datetime or datetime.now()
+        self.version = version
 
-   
\ No newline at end of file
+    # Chunk lists may be handed over as a zero-argument callable (a stored, not yet loaded list):
+    # it is called on first access and replaced by its result.
+
+    @property
+    def original_chunks(self):
+        if callable(self._original_chunks):
+            self._original_chunks = self._original_chunks()
+        return self._original_chunks
+
+    @original_chunks.setter
+    def original_chunks(self, value):
+        self._original_chunks = value
+
+    @property
+    def translated_chunks(self):
+        if callable(self._translated_chunks):
+            self._translated_chunks = self._translated_chunks()
+        return self._translated_chunks
+
+    @translated_chunks.setter
+    def translated_chunks(self, value):
+        self._translated_chunks = value
+
+    def unloaded_chunks(self, name: str) -> Optional[Any]:
+        """The loader of `original_chunks`/`translated_chunks` if that list was never accessed, else None."""
+        value = getattr(self, f"_{name}")
+        return value if callable(value) else None
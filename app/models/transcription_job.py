@@ -1,6 +1,7 @@
 import uuid
 from datetime import datetime
 from typing import List, Optional
+from app.models.media_info import MediaInfo
 
 class TranscriptionJob:
     def __init__(self,
@@ -10,7 +11,17 @@ class TranscriptionJob:
                  processed: bool = False,
                  job_id: Optional[str] = None,
                  processed_video_path: Optional[str] = "",
-                 upload_date: Optional[datetime] = None):
+                 upload_date: Optional[datetime] = None,
+                 audio_path: Optional[str] = "",
+                 asr_model_size: Optional[str] = None,
+                 version: int = 1,
+                 audio_only: bool = False,
+                 media_info: Optional[MediaInfo] = None,
+                 stage: str = "queued",
+                 progress: float = 0.0,
+                 estimated_seconds: Optional[float] = None,
+                 delivery_mode: str = "mux",
+                 worker: Optional[str] = None):
         
         self.id = job_id or f"job_{uuid.uuid4().hex[:]}"
         self.video_storage_path = video_storage_path
@@ -21,6 +32,16 @@ class TranscriptionJob:
         self.processed = processed
         self.video_storage_path = video_storage_path
         self.summary = ""
+        self.audio_path = audio_path or ""          # extracted audio, reused when reprocessing
+        self.asr_model_size = asr_model_size
+        self.version = version                      # bumped on every reprocess, older results are kept
+        self.audio_only = audio_only                # no video stream: subtitles/summaries only, no muxing
+        self.media_info = media_info                # ffprobe result: duration, container, streams/codecs
+        self.stage = stage                          # pipeline step currently running, see IntegrationService.STAGES
+        self.progress = progress                    # 0..1, from the stage weights
+        self.estimated_seconds = estimated_seconds  # expected total processing time from the media duration
+        self.delivery_mode = delivery_mode          # "mux": subtitled MKV, "sidecar": upload untouched, VTTs + manifest
+        self.worker = worker                        # "<host>:<pid>" of the process that queued or runs it
 
 
 
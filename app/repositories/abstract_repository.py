@@ -1,25 +1,103 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, TypeVar, Generic
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, TypeVar, Generic
+import os
+import threading
+from contextlib import contextmanager
 from tinydb import TinyDB, Query
-from tinydb.table import Document
+from tinydb.table import Document, Table
 from pathlib import Path
 from typing import List
 from  tinydb.storages import JSONStorage
+import hashlib
+import json
+from app.repositories.wal_storage import WALOptions, open_database, release_database
+from app.repositories.locking import RepositoryLock, repository_lock
+from app.repositories.io_executor import run_io
+from concurrent.futures import Executor
 
 # Generic type for entity models
 T = TypeVar('T')
 
+
+class SharedFileTable(Table):
+    """
+    Table of a JSON file other repositories and processes write too: the next document id is
+    worked out from the file on every insert, not remembered from this table's last one.
+    """
+
+    def insert(self, document):
+        self._next_id = None
+        return super().insert(document)
+
+    def insert_multiple(self, documents):
+        self._next_id = None
+        return super().insert_multiple(documents)
+
+
+class SharedFileStorage(JSONStorage):
+    """
+    JSONStorage keeping the database it last read or wrote, so a repository can tell whether its
+    own table changed when another table of the file was written.
+    """
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(path, **kwargs)
+        self._last: Dict[str, Any] = {}
+
+    def read(self):
+        data = super().read()
+        self._last = data or {}
+        return data
+
+    def write(self, data):
+        super().write(data)
+        self._last = data
+
+    def table_digest(self, table: str) -> str:
+        """Digest of the table as last read or written"""
+        raw = json.dumps(self._last.get(table, {}), ensure_ascii=False).encode("utf-8")
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+class SharedFileTinyDB(TinyDB):
+    table_class = SharedFileTable
+
+
 class AbstractRepository(ABC, Generic[T]):
     """
     Abstract base repository defining common database operations.
     This class provides the contract that all concrete repositories must implement.
+    Every operation runs under the database file's RepositoryLock: shared for reads, exclusive
+    for writes, across threads and (for the JSON file) across processes.
     """
+
+    # fields looked up through in-memory hash indexes (field -> value -> doc ids) instead of a table scan
+    INDEXED_FIELDS: Tuple[str, ...] = ()
+    # fields records are listed in order of (see page), through sorted (value, doc id) lists kept with the indexes
+    ORDERED_FIELDS: Tuple[str, ...] = ()
     
-    def __init__(self, db_path: str, table_name: str):
+    def __init__(self, db_path: str, table_name: str, wal_options: Optional[WALOptions] = None,
+                 io_executor: Optional[Executor] = None):
         self.db_path = db_path
         self.table_name = table_name
+        # None: plain JSON file rewritten on every mutation, else the shared in-memory WAL database
+        self.wal_options = wal_options
+        # the WAL database is private to this process (WALStorage refuses a second one), threads suffice
+        self.lock: RepositoryLock = repository_lock(db_path, interprocess=wal_options is None)
+        # where the *_async methods run the blocking ones (None: the shared repository I/O pool)
+        self.io_executor = io_executor
+        # one TinyDB file handle per repository: concurrent reads would interleave its seeks
+        self._read_mutex = threading.Lock()
         self._db: Optional[TinyDB] = None
         self._table = None
+        self._indexes: Optional[Dict[str, Dict[Any, Set[int]]]] = None
+        self._ordered: Dict[str, List[Tuple[Any, int]]] = {}
+        self._indexed_values: Dict[int, Dict[str, Any]] = {}
+        self._index_version = None
+        # JSON file: the file version the table digest was last taken at, and that digest
+        self._file_version = None
+        self._table_digest = None
     
     @property
     def db(self) -> TinyDB:
@@ -27,14 +105,19 @@ class AbstractRepository(ABC, Generic[T]):
         if self._db is None:
             # Ensure directory exists
             Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
-            self._db = TinyDB(self.db_path , storage = lambda p : JSONStorage(p , indent = 4))
+            if self.wal_options is not None:
+                self._db = open_database(self.db_path, self.wal_options)
+            else:
+                self._db = SharedFileTinyDB(self.db_path , storage = lambda p : SharedFileStorage(p , indent = 4))
         return self._db
     
     @property
     def table(self):
         """Get the table instance"""
         if self._table is None:
-            self._table = self.db.table(self.table_name)
+            # tinydb's query cache would keep answering from before another process's writes
+            cache_size = 10 if self.wal_options is not None else 0
+            self._table = self.db.table(self.table_name, cache_size=cache_size)
         return self._table
     
     @abstractmethod
@@ -47,69 +130,380 @@ class AbstractRepository(ABC, Generic[T]):
         """Convert dictionary to entity"""
         pass
     
+    def lookup_values(self, entity: T) -> Dict[str, Any]:
+        """Stored values of the fields records are looked up by (the indexed ones) for an entity"""
+        data = self.to_dict(entity)
+        return {field: data.get(field) for field in self.INDEXED_FIELDS}
+
+    # -- secondary indexes --------------------------------------------------
+
+    def _storage_version(self, own_write: bool = False):
+        """
+        Changes whenever this repository's table may have been written by someone else than this
+        repository; writes to the other tables of the database leave it as is.
+        own_write: the version once the write this repository just made has released its lock.
+        """
+        storage = self.db.storage
+        if hasattr(storage, "table_version"):
+            return id(storage), storage.table_version(self.table_name)
+        try:
+            stat = os.stat(self.db_path)
+        except FileNotFoundError:
+            return None
+        # the lock's write counter is exact, mtime and size also catch writers that bypass the lock
+        generation = self.lock.generation()
+        if own_write and generation is not None:
+            # bumped when the write lock is released
+            generation += 1
+        file_version = generation, stat.st_mtime_ns, stat.st_size
+        if file_version != self._file_version:
+            # the file changed: compare the table itself (own writes leave it in the storage already)
+            if not own_write:
+                storage.read()
+            self._file_version = file_version
+            self._table_digest = storage.table_digest(self.table_name)
+        return self._table_digest
+
+    def _index(self) -> Dict[str, Dict[Any, Set[int]]]:
+        if self._indexes is None or self._storage_version() != self._index_version:
+            self._rebuild_indexes()
+        return self._indexes
+
+    def _rebuild_indexes(self):
+        """Build the indexes from the stored table: on first use and after outside writes"""
+        self._indexes = {field: {} for field in self.INDEXED_FIELDS}
+        self._ordered = {field: [] for field in self.ORDERED_FIELDS}
+        self._indexed_values = {}
+        for doc in self.table.all():
+            self._index_document(doc.doc_id, doc, keep_sorted=False)
+        for keys in self._ordered.values():
+            keys.sort()
+        self._index_version = self._storage_version()
+
+    def _index_document(self, doc_id: int, data: Dict[str, Any], keep_sorted: bool = True):
+        values = {}
+        for field in self.INDEXED_FIELDS:
+            value = data.get(field)
+            try:
+                self._indexes[field].setdefault(value, set()).add(doc_id)
+            except TypeError:
+                # unhashable values (lists, dicts) never equal a lookup key
+                continue
+            values[field] = value
+        for field in self.ORDERED_FIELDS:
+            value = data.get(field)
+            if not isinstance(value, (str, int, float)):
+                # missing or not comparable with the others: left out of the ordering
+                continue
+            if keep_sorted:
+                insort(self._ordered[field], (value, doc_id))
+            else:
+                self._ordered[field].append((value, doc_id))
+            values[field] = value
+        self._indexed_values[doc_id] = values
+
+    def _unindex_document(self, doc_id: int) -> Dict[str, Any]:
+        values = self._indexed_values.pop(doc_id, {})
+        for field, value in values.items():
+            if field in self.INDEXED_FIELDS:
+                doc_ids = self._indexes[field].get(value)
+                if doc_ids is not None:
+                    doc_ids.discard(doc_id)
+                    if not doc_ids:
+                        del self._indexes[field][value]
+            if field in self.ORDERED_FIELDS:
+                keys = self._ordered[field]
+                position = bisect_left(keys, (value, doc_id))
+                if position < len(keys) and keys[position] == (value, doc_id):
+                    del keys[position]
+        return values
+
+    def _indexes_fresh(self) -> bool:
+        """True when the indexes still describe the stored table, checked before writing to it"""
+        return self._indexes is not None and self._storage_version() == self._index_version
+
+    def _after_write(self, fresh: bool, inserted: Iterable[int] = (), updated: Iterable[int] = (),
+                     removed: Iterable[int] = (), data: Optional[Dict[str, Any]] = None,
+                     data_by_id: Optional[Dict[int, Dict[str, Any]]] = None):
+        """Keep the indexes in step with a write this repository just made"""
+        if not fresh:
+            # someone else wrote in between: rebuilt on the next lookup
+            self._indexes = None
+            return
+        for doc_id in removed:
+            self._unindex_document(doc_id)
+        for doc_id in list(inserted) + list(updated):
+            fields = data if data_by_id is None else data_by_id[doc_id]
+            # an update only replaces the fields it carries
+            merged = {**self._unindex_document(doc_id), **fields}
+            self._index_document(doc_id, merged)
+        self._index_version = self._storage_version(own_write=True)
+
+    def _indexed_doc_ids(self, field_name: str, value: Any) -> Optional[List[int]]:
+        """Sorted doc ids holding value, None when the field is not indexed (scan instead)"""
+        if field_name not in self.INDEXED_FIELDS:
+            return None
+        try:
+            doc_ids = self._index()[field_name].get(value, ())
+        except TypeError:
+            return None
+        return sorted(doc_ids)
+
+    def _get_documents(self, doc_ids: List[int]) -> List[Document]:
+        """Fetch documents by id straight from the stored table (Table.get(doc_ids=) walks all of it)"""
+        if not doc_ids:
+            return []
+        raw_table = (self.db.storage.read() or {}).get(self.table_name, {})
+        return [Document(raw_table[str(doc_id)], doc_id) for doc_id in doc_ids if str(doc_id) in raw_table]
+
+    @contextmanager
+    def _reading(self):
+        with self.lock.read(), self._read_mutex:
+            yield
+
+    # -- operations ----------------------------------------------------------
+
     def create(self, entity: T) -> int:
         """Create a new record and return its ID"""
         data = self.to_dict(entity)
-        return self.table.insert(data)
+        with self.lock.write():
+            fresh = self._indexes_fresh()
+            doc_id = self.table.insert(data)
+            self._after_write(fresh, inserted=[doc_id], data=data)
+        return doc_id
     
     def create_many(self , entities : List[T]) -> int : 
-        count = 0 
-        for entity in entities : 
-            count += self.create(entity=entity)
-        
-        return count
+        """Insert all records with a single database write and return how many were created"""
+        if not entities:
+            return 0
+        documents = [self.to_dict(entity) for entity in entities]
+        with self.lock.write():
+            fresh = self._indexes_fresh()
+            doc_ids = self.table.insert_multiple(documents)
+            self._after_write(fresh, inserted=doc_ids, data_by_id=dict(zip(doc_ids, documents)))
+        return len(doc_ids)
             
     def get_by_id(self, record_id: int) -> Optional[T]:
         """Get a record by its ID"""
-        doc = self.table.get(doc_id=record_id)
+        with self._reading():
+            doc = self.table.get(doc_id=record_id)
         return self.from_dict(data=doc) if doc else None
     
     def get_all(self) -> List[T]:
         """Get all records"""
-        docs = self.table.all()
+        with self._reading():
+            docs = self.table.all()
         return [self.from_dict(data=doc) for doc in docs]
     
     def update(self, record_id: int, entity: T) -> bool:
         """Update a record by ID"""
         data = self.to_dict(entity)
-        result = self.table.update(data, doc_ids=[record_id])
+        with self.lock.write():
+            fresh = self._indexes_fresh()
+            result = self.table.update(data, doc_ids=[record_id])
+            self._after_write(fresh, updated=result, data=data)
         return len(result) > 0
     
     def delete(self, record_id: int) -> bool:
         """Delete a record by ID"""
-        result = self.table.remove(doc_ids=[record_id])
+        with self.lock.write():
+            fresh = self._indexes_fresh()
+            result = self.table.remove(doc_ids=[record_id])
+            self._after_write(fresh, removed=result)
         return len(result) > 0
     
+    def _find_documents(self, field_name: str, value: Any, limit: Optional[int] = None) -> List[Document]:
+        doc_ids = self._indexed_doc_ids(field_name, value)
+        if doc_ids is not None:
+            return self._get_documents(doc_ids[:limit])
+        query = Query()
+        if limit == 1:
+            doc = self.table.get(query[field_name] == value)
+            return [doc] if doc else []
+        return self.table.search(query[field_name] == value)
+
     def find_by_field(self, field_name: str, value: Any) -> List[T]:
         """Find records by a specific field value"""
-        query = Query()
-        docs = self.table.search(query[field_name] == value)
+        with self._reading():
+            docs = self._find_documents(field_name, value)
         return [self.from_dict(doc) for doc in docs]
     
+    def project_by_field(self, field_name: str, value: Any, fields: Sequence[str]) -> List[Dict[str, Any]]:
+        """
+        Only the requested stored fields of the matching records, as plain dicts (missing ones are None).
+        No entity is built, so metadata lookups skip texts and chunk lists entirely.
+        """
+        with self._reading():
+            docs = self._find_documents(field_name, value)
+            return [{field: doc.get(field) for field in fields} for doc in docs]
+    
+    def page(self, order_by: str, limit: int, after: Optional[Tuple[Any, int]] = None,
+             filters: Optional[Dict[str, Any]] = None, fields: Sequence[str] = (),
+             descending: bool = True) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, int]]]:
+        """
+        One page of records in `order_by` order (ties broken by doc id), projected to `fields`, and the
+        keyset cursor of the next page: None on the last one, else what to pass as `after` for it.
+        Filters are equality matches on indexed fields. Pages stay consistent while records are added,
+        and only the records of the page (plus the ones filtered out on the way) are looked at.
+        """
+        if order_by not in self.ORDERED_FIELDS:
+            raise ValueError(f"Records of {self.table_name} cannot be ordered by {order_by}, expected one of {self.ORDERED_FIELDS}")
+        filters = filters or {}
+        for field_name in filters:
+            if field_name not in self.INDEXED_FIELDS:
+                raise ValueError(f"Records of {self.table_name} cannot be filtered on {field_name}, expected one of {self.INDEXED_FIELDS}")
+
+        with self._reading():
+            indexes = self._index()
+            keys = self._ordered[order_by]
+            candidates: Optional[Set[int]] = None
+            for field_name, value in filters.items():
+                try:
+                    doc_ids = indexes[field_name].get(value, set())
+                except TypeError:
+                    doc_ids = set()
+                candidates = set(doc_ids) if candidates is None else candidates & doc_ids
+            if candidates is not None and len(candidates) * 8 < len(keys):
+                # a selective filter: ordering its few matches beats walking the whole ordering
+                keys = sorted(
+                    (self._indexed_values[doc_id][order_by], doc_id)
+                    for doc_id in candidates if order_by in self._indexed_values[doc_id]
+                )
+                candidates = None
+
+            try:
+                if descending:
+                    end = bisect_left(keys, tuple(after)) if after is not None else len(keys)
+                    walk = (keys[i] for i in range(end - 1, -1, -1))
+                else:
+                    start = bisect_right(keys, tuple(after)) if after is not None else 0
+                    walk = (keys[i] for i in range(start, len(keys)))
+            except TypeError:
+                raise ValueError(f"Invalid cursor for {order_by}: {after}")
+
+            selected = []
+            for key in walk:
+                if candidates is not None and key[1] not in candidates:
+                    continue
+                selected.append(key)
+                if len(selected) > limit:
+                    break
+
+            has_more = len(selected) > limit
+            selected = selected[:limit]
+            docs = self._get_documents([doc_id for _, doc_id in selected])
+            rows = [{field: doc.get(field) for field in fields} for doc in docs]
+        return rows, (selected[-1] if has_more and selected else None)
+
     def find_one_by_field(self, field_name: str, value: Any) -> Optional[T]:
         """Find first record by a specific field value"""
-        query = Query()
-        doc = self.table.get(query[field_name] == value)
-        return self.from_dict(doc) if doc else None
+        with self._reading():
+            docs = self._find_documents(field_name, value, limit=1)
+        return self.from_dict(docs[0]) if docs else None
     
     def update_by_field(self, field_name : str , value : Any , entity : T )-> bool : 
         data = self.to_dict(entity)
-        query = Query()
-        result = self.table.update(data , query[field_name] == value) 
+        with self.lock.write():
+            doc_ids = self._indexed_doc_ids(field_name, value)
+            fresh = self._indexes_fresh()
+            if doc_ids is not None:
+                result = self.table.update(data, doc_ids=doc_ids) if doc_ids else []
+            else:
+                query = Query()
+                result = self.table.update(data , query[field_name] == value) 
+            self._after_write(fresh, updated=result, data=data)
         return len(result) > 0
 
+    def update_many(self, field_name: str, entities: List[T]) -> int:
+        """
+        Update the record of every entity, matched on its own `field_name` value,
+        with a single database write. Returns the number of updated records.
+        """
+        if not entities:
+            return 0
+        query = Query()
+        updates = []
+        for entity in entities:
+            data = self.to_dict(entity)
+            updates.append((data, query[field_name] == data[field_name]))
+        with self.lock.write():
+            fresh = self._indexes_fresh()
+            result = self.table.update_multiple(updates)
+            try:
+                by_value = {data[field_name]: data for data, _ in updates}
+                data_by_id = {doc_id: by_value[self._indexed_values[doc_id][field_name]] for doc_id in result}
+            except (KeyError, TypeError):
+                # not an indexed field: rebuilt on the next lookup
+                self._indexes = None
+            else:
+                self._after_write(fresh, updated=result, data_by_id=data_by_id)
+        return len(result)
+
     def count(self) -> int:
         """Count total records"""
-        return len(self.table)
+        with self._reading():
+            return len(self.table)
     
     def exists(self, record_id: int) -> bool:
         """Check if a record exists by ID"""
-        return self.table.contains(doc_id=record_id)
+        with self._reading():
+            return self.table.contains(doc_id=record_id)
     
+    # -- async variants: the same operations on the I/O pool, for async endpoints ----------
+
+    async def create_async(self, entity: T) -> int:
+        return await run_io(self.io_executor, self.create, entity)
+
+    async def create_many_async(self, entities: List[T]) -> int:
+        return await run_io(self.io_executor, self.create_many, entities)
+
+    async def get_by_id_async(self, record_id: int) -> Optional[T]:
+        return await run_io(self.io_executor, self.get_by_id, record_id)
+
+    async def get_all_async(self) -> List[T]:
+        return await run_io(self.io_executor, self.get_all)
+
+    async def update_async(self, record_id: int, entity: T) -> bool:
+        return await run_io(self.io_executor, self.update, record_id, entity)
+
+    async def delete_async(self, record_id: int) -> bool:
+        return await run_io(self.io_executor, self.delete, record_id)
+
+    async def find_by_field_async(self, field_name: str, value: Any) -> List[T]:
+        return await run_io(self.io_executor, self.find_by_field, field_name, value)
+
+    async def project_by_field_async(self, field_name: str, value: Any, fields: Sequence[str]) -> List[Dict[str, Any]]:
+        return await run_io(self.io_executor, self.project_by_field, field_name, value, fields)
+
+    async def page_async(self, order_by: str, limit: int, after: Optional[Tuple[Any, int]] = None,
+                         filters: Optional[Dict[str, Any]] = None, fields: Sequence[str] = (),
+                         descending: bool = True) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, int]]]:
+        return await run_io(self.io_executor, self.page, order_by, limit, after, filters, fields, descending)
+
+    async def find_one_by_field_async(self, field_name: str, value: Any) -> Optional[T]:
+        return await run_io(self.io_executor, self.find_one_by_field, field_name, value)
+
+    async def update_by_field_async(self, field_name: str, value: Any, entity: T) -> bool:
+        return await run_io(self.io_executor, self.update_by_field, field_name, value, entity)
+
+    async def update_many_async(self, field_name: str, entities: List[T]) -> int:
+        return await run_io(self.io_executor, self.update_many, field_name, entities)
+
+    async def count_async(self) -> int:
+        return await run_io(self.io_executor, self.count)
+
+    async def exists_async(self, record_id: int) -> bool:
+        return await run_io(self.io_executor, self.exists, record_id)
+
     def close(self):
         """Close database connection"""
-        if self._db:
-            self._db.close()
-            self._db = None
-            self._table = None
-
+        with self.lock.write():
+            if self._db:
+                if self.wal_options is not None:
+                    release_database(self.db_path)
+                else:
+                    self._db.close()
+                self._db = None
+                self._table = None
+                self._indexes = None
+                self._file_version = None
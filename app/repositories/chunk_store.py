@@ -0,0 +1,160 @@
+import hashlib
+import io
+import os
+import shutil
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+import logging
+
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+# marker of a chunk list stored out of line in a transcription record: {"$chunks": "<ref>"}
+CHUNK_REF_KEY = "$chunks"
+
+
+class StoredChunks:
+    """Zero-argument loader of one stored chunk list, what a lazily loaded Transcription holds."""
+
+    def __init__(self, store: "ChunkStore", ref: str):
+        self.store = store
+        self.ref = ref
+
+    def __call__(self) -> List[Dict]:
+        return self.store.load(self.ref)
+
+    def __deepcopy__(self, memo) -> "StoredChunks":
+        # a reference to an immutable file: copies of a Transcription can share it
+        return self
+
+
+class ChunkStore:
+    """
+    Timestamped chunk lists kept out of the database, one .npz per (job, version, language):
+    float64 start/end columns (NaN for a missing timestamp; float32 would drift past the millisecond
+    after a few hours), the utf-8 texts concatenated in one blob and their int64 offsets.
+    Timestamps come back rounded to the millisecond.
+    Only Whisper-shaped chunks ([{"timestamp": [start, end], "text": str}, ...]) are stored here,
+    anything else stays inline in the record.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        # ref -> digest of what was last written there, identical rewrites are skipped
+        self._written: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    # -- encoding --------------------------------------------------------------
+
+    @staticmethod
+    def is_storable(chunks: Any) -> bool:
+        if not isinstance(chunks, list) or not chunks:
+            return False
+        for chunk in chunks:
+            if not isinstance(chunk, dict) or chunk.keys() != {"timestamp", "text"} or not isinstance(chunk["text"], str):
+                return False
+            timestamp = chunk["timestamp"]
+            if not isinstance(timestamp, (list, tuple)) or len(timestamp) != 2:
+                return False
+            if any(value is not None and not isinstance(value, (int, float)) for value in timestamp):
+                return False
+        return True
+
+    @staticmethod
+    def encode(chunks: List[Dict]) -> bytes:
+        times = np.array(
+            [[np.nan if value is None else value for value in chunk["timestamp"]] for chunk in chunks],
+            dtype=np.float64
+        ).reshape(-1, 2)
+        encoded = [chunk["text"].encode("utf-8") for chunk in chunks]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in encoded], out=offsets[1:])
+
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            starts=times[:, 0],
+            ends=times[:, 1],
+            offsets=offsets,
+            text=np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        )
+        return buffer.getvalue()
+
+    @staticmethod
+    def decode(payload: bytes) -> List[Dict]:
+        with np.load(io.BytesIO(payload)) as data:
+            starts, ends = data["starts"].astype(np.float64), data["ends"].astype(np.float64)
+            offsets = data["offsets"].tolist()
+            blob = data["text"].tobytes()
+
+        def column(values: np.ndarray) -> List[Optional[float]]:
+            rounded = np.round(values, 3).tolist()
+            return [None if value != value else value for value in rounded]
+
+        return [
+            {"timestamp": [start, end], "text": blob[offsets[i]:offsets[i + 1]].decode("utf-8")}
+            for i, (start, end) in enumerate(zip(column(starts), column(ends)))
+        ]
+
+    # -- files -----------------------------------------------------------------
+
+    @staticmethod
+    def make_ref(job_id: str, version: int, language: str) -> str:
+        return f"{job_id}/v{version}_{language.lower()}.npz"
+
+    def path(self, ref: str) -> str:
+        path = os.path.abspath(os.path.join(self.root_dir, ref))
+        if os.path.commonpath([path, os.path.abspath(self.root_dir)]) != os.path.abspath(self.root_dir):
+            raise ValueError(f"Chunk reference outside the chunk store: {ref}")
+        return path
+
+    def save(self, ref: str, chunks: List[Dict]) -> str:
+        payload = self.encode(chunks)
+        digest = hashlib.sha256(payload).hexdigest()
+        path = self.path(ref)
+
+        with self._lock:
+            if self._written.get(ref) == digest and os.path.exists(path):
+                return ref
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(payload)
+            os.replace(temp_path, path)
+            self._written[ref] = digest
+        return ref
+
+    def load(self, ref: str) -> List[Dict]:
+        with open(self.path(ref), "rb") as f:
+            return self.decode(f.read())
+
+    def loader(self, ref: str) -> StoredChunks:
+        return StoredChunks(self, ref)
+
+    def delete(self, ref: str):
+        """Drop one stored chunk list (and its job's directory once empty)."""
+        path = self.path(ref)
+        with self._lock:
+            self._written.pop(ref, None)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
+
+    def delete_job(self, job_id: str):
+        """Drop every stored chunk list of a job."""
+        job_dir = self.path(job_id)
+        with self._lock:
+            for ref in [ref for ref in self._written if ref.startswith(f"{job_id}/")]:
+                del self._written[ref]
+            shutil.rmtree(job_dir, ignore_errors=True)
@@ -0,0 +1,42 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import logging
+
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_IO_THREADS = 8
+
+IO_THREAD_PREFIX = "repository-io"
+
+_default_executor: Optional[ThreadPoolExecutor] = None
+_default_lock = threading.Lock()
+
+
+def create_io_executor(max_workers: int = DEFAULT_IO_THREADS) -> ThreadPoolExecutor:
+    """
+    Threads the async repository methods run on. Kept apart from Starlette's threadpool, which
+    long pipeline runs (run_in_threadpool) can fill, so lookups never queue behind a transcription.
+    """
+    return ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix=IO_THREAD_PREFIX)
+
+
+def default_io_executor() -> ThreadPoolExecutor:
+    """Shared pool of the repositories built without an executor of their own"""
+    global _default_executor
+    with _default_lock:
+        if _default_executor is None:
+            _default_executor = create_io_executor()
+        return _default_executor
+
+
+async def run_io(executor: Optional[Executor], func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Await a blocking call made on `executor` (the shared pool when None), off the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor or default_io_executor(), functools.partial(func, *args, **kwargs))
@@ -0,0 +1,213 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+import logging
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: only threads of one process are kept apart there
+    fcntl = None
+
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+class ReadWriteLock:
+    """
+    Many reading threads or one writing thread. Waiting writers hold off new readers so a steady
+    stream of lookups cannot starve them. Both sides are reentrant, and the writing thread may
+    also read; upgrading a read to a write would deadlock and raises instead.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer: Optional[int] = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    def _read_depth(self) -> int:
+        return getattr(self._local, "depth", 0)
+
+    def acquire_read(self):
+        me = threading.get_ident()
+        if self._writer == me or self._read_depth():
+            self._local.depth = self._read_depth() + 1
+            return
+        with self._condition:
+            while self._writer is not None or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        self._local.depth = 1
+
+    def release_read(self):
+        self._local.depth = self._read_depth() - 1
+        if self._local.depth or self._writer == threading.get_ident():
+            return
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            if self._read_depth():
+                raise RuntimeError("Cannot take the write lock while holding the read lock")
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self):
+        with self._condition:
+            self._writer_depth -= 1
+            if self._writer_depth:
+                return
+            self._writer = None
+            self._condition.notify_all()
+
+
+class FileLock:
+    """
+    Shared/exclusive flock on a lock file, keeping processes apart (threads are the ReadWriteLock's
+    job: one process takes the file lock once however many of its threads read).
+    The lock file also holds a write counter, bumped by every exclusive holder, so a process can
+    tell cheaply and exactly whether anyone wrote since it last looked.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+        self._mutex = threading.Lock()
+        self._shared = 0
+        self._exclusive = 0
+
+    def _file(self) -> int:
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        return self._fd
+
+    def acquire_shared(self):
+        with self._mutex:
+            if not self._shared and not self._exclusive:
+                fcntl.flock(self._file(), fcntl.LOCK_SH)
+            self._shared += 1
+
+    def release_shared(self):
+        with self._mutex:
+            self._shared -= 1
+            if not self._shared and not self._exclusive:
+                fcntl.flock(self._file(), fcntl.LOCK_UN)
+
+    def acquire_exclusive(self):
+        with self._mutex:
+            if not self._exclusive:
+                fcntl.flock(self._file(), fcntl.LOCK_EX)
+            self._exclusive += 1
+
+    def release_exclusive(self):
+        with self._mutex:
+            if self._exclusive == 1:
+                os.pwrite(self._file(), (self._generation() + 1).to_bytes(8, "little"), 0)
+            self._exclusive -= 1
+            if not self._exclusive:
+                # the writing thread may still be reading under the write lock
+                fcntl.flock(self._file(), fcntl.LOCK_SH if self._shared else fcntl.LOCK_UN)
+
+    def generation(self) -> int:
+        with self._mutex:
+            return self._generation()
+
+    def _generation(self) -> int:
+        return int.from_bytes(os.pread(self._file(), 8, 0).ljust(8, b"\0"), "little")
+
+
+class RepositoryLock:
+    """
+    What every repository operation on one database file runs under: the ReadWriteLock between
+    threads, plus a FileLock on `db_path + ".lock"` between processes when `interprocess`.
+    Reads take both sides shared, writes exclusive, so a TinyDB read-modify-write of the JSON file
+    is never interleaved with another one or observed half written.
+    """
+
+    def __init__(self, db_path: str, interprocess: bool = True):
+        self.db_path = db_path
+        self.interprocess = interprocess and fcntl is not None
+        if interprocess and fcntl is None:
+            logger.warning(f"fcntl is unavailable: {db_path} is only protected against threads of this process")
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._threads = ReadWriteLock()
+        self._file = FileLock(self.db_path + ".lock") if self.interprocess else None
+
+    def _check_process(self):
+        # a forked child must not share the parent's lock file description (nor its thread state)
+        if self._pid != os.getpid():
+            self._reset()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        self._check_process()
+        self._threads.acquire_read()
+        try:
+            if self._file is None:
+                yield
+                return
+            self._file.acquire_shared()
+            try:
+                yield
+            finally:
+                self._file.release_shared()
+        finally:
+            self._threads.release_read()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        self._check_process()
+        self._threads.acquire_write()
+        try:
+            if self._file is None:
+                yield
+                return
+            self._file.acquire_exclusive()
+            try:
+                yield
+            finally:
+                # bumped even when the write failed: it may have rewritten the file half way
+                self._file.release_exclusive()
+        finally:
+            self._threads.release_write()
+
+    def generation(self) -> Optional[int]:
+        """Writes made under this lock by any process so far, None without inter-process locking"""
+        self._check_process()
+        return self._file.generation() if self._file is not None else None
+
+
+# one lock per database file and mode: every repository of a file must share it
+_locks: Dict[Tuple[str, bool], RepositoryLock] = {}
+_locks_guard = threading.Lock()
+
+
+def repository_lock(db_path: str, interprocess: bool = True) -> RepositoryLock:
+    key = (os.path.abspath(db_path), interprocess)
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = RepositoryLock(key[0], interprocess=interprocess)
+            _locks[key] = lock
+        return lock
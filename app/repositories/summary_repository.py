@@ -1,12 +1,17 @@
+from typing import Optional
 from app.repositories.abstract_repository import AbstractRepository
+from app.repositories.wal_storage import WALOptions
+from concurrent.futures import Executor
 from app.models.summary import Summary
 
 
 
 class SummaryRepository(AbstractRepository[Summary]) : 
 
-    def __init__(self, db_path):
-        super().__init__(db_path, table_name="summaries")
+    INDEXED_FIELDS = ("summary_id", "job_id", "language")
+
+    def __init__(self, db_path, wal_options: Optional[WALOptions] = None, io_executor: Optional[Executor] = None):
+        super().__init__(db_path, table_name="summaries", wal_options=wal_options, io_executor=io_executor)
 
     
 
@@ -15,7 +20,8 @@ class SummaryRepository(AbstractRepository[Summary]) :
             id=data["summary_id"] , 
             job_id=data["job_id"] , 
             text_content=data["text_content"] , 
-            language=data["language"]
+            language=data["language"] , 
+            version=data.get("version" , 1)
         )
     
     def to_dict(self, entity : Summary):
@@ -24,5 +30,6 @@ class SummaryRepository(AbstractRepository[Summary]) :
             "summary_id" : entity.summary_id , 
             "job_id" : entity.job_id , 
             "language" : entity.language , 
-            "text_content" : entity.text_content
+            "text_content" : entity.text_content , 
+            "version" : entity.version
         }
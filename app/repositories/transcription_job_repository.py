@@ -1,12 +1,18 @@
 from app.models.transcription_job import TranscriptionJob
+from app.models.media_info import MediaInfo
 from datetime import datetime
 from typing import Optional
 from app.repositories.abstract_repository import AbstractRepository
+from app.repositories.wal_storage import WALOptions
+from concurrent.futures import Executor
 class TranscriptionJobRepository(AbstractRepository[TranscriptionJob]):
 
     
-    def __init__(self, db_path):
-        super().__init__(db_path, table_name="jobs")
+    INDEXED_FIELDS = ("job_id", "processed", "input_language")
+    ORDERED_FIELDS = ("upload_date",)
+
+    def __init__(self, db_path, wal_options: Optional[WALOptions] = None, io_executor: Optional[Executor] = None):
+        super().__init__(db_path, table_name="jobs", wal_options=wal_options, io_executor=io_executor)
     
     def from_dict(self, data):
 
@@ -17,7 +23,17 @@ class TranscriptionJobRepository(AbstractRepository[TranscriptionJob]):
             input_language=data["input_language"],
             target_languages=data["target_languages"],
             upload_date=datetime.fromisoformat(data["upload_date"]),
-            processed=data["processed"]
+            processed=data["processed"],
+            audio_path=data.get("audio_path", ""),
+            asr_model_size=data.get("asr_model_size"),
+            version=data.get("version", 1),
+            audio_only=data.get("audio_only", False),
+            media_info=self._media_info_from_dict(data.get("media_info")),
+            stage=data.get("stage", "done" if data["processed"] else "queued"),
+            progress=data.get("progress", 1.0 if data["processed"] else 0.0),
+            estimated_seconds=data.get("estimated_seconds"),
+            delivery_mode=data.get("delivery_mode", "mux"),
+            worker=data.get("worker")
         )
     
     def to_dict(self, entity : TranscriptionJob):
@@ -29,6 +45,38 @@ class TranscriptionJobRepository(AbstractRepository[TranscriptionJob]):
             "input_language": entity.input_language,
             "target_languages": entity.target_languages,
             "upload_date": entity.upload_date.isoformat(),
-            "processed": entity.processed
+            "processed": entity.processed,
+            "audio_path": entity.audio_path,
+            "asr_model_size": entity.asr_model_size,
+            "version": entity.version,
+            "audio_only": entity.audio_only,
+            "media_info": self._media_info_to_dict(entity.media_info),
+            "stage": entity.stage,
+            "progress": entity.progress,
+            "estimated_seconds": entity.estimated_seconds,
+            "delivery_mode": entity.delivery_mode,
+            "worker": entity.worker
+        }
+
+    def _media_info_to_dict(self, media_info: Optional[MediaInfo]):
+        if media_info is None:
+            return None
+        return {
+            "format_name": media_info.format_name,
+            "duration": media_info.duration,
+            "size_bytes": media_info.size_bytes,
+            "bit_rate": media_info.bit_rate,
+            "streams": media_info.streams
         }
+
+    def _media_info_from_dict(self, data) -> Optional[MediaInfo]:
+        if not data:
+            return None
+        return MediaInfo(
+            format_name=data.get("format_name", ""),
+            duration=data.get("duration", 0.0),
+            size_bytes=data.get("size_bytes", 0),
+            bit_rate=data.get("bit_rate"),
+            streams=data.get("streams", [])
+        )
  
\ No newline at end of file
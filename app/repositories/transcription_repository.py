@@ -1,12 +1,20 @@
 from app.repositories.abstract_repository import AbstractRepository
+from app.repositories.wal_storage import WALOptions
+from concurrent.futures import Executor
+from app.repositories.chunk_store import CHUNK_REF_KEY, ChunkStore, StoredChunks
 from app.models.transcription import Transcription
 from datetime import datetime
-from typing import Optional,Dict
+from typing import Optional,Dict,Set
 
 class TranscriptionRepository(AbstractRepository[Transcription]) : 
     
-    def __init__(self, db_path):
-        super().__init__(db_path, table_name="transcriptions")
+    INDEXED_FIELDS = ("transcription_id", "job_id", "target_language")
+
+    def __init__(self, db_path, wal_options: Optional[WALOptions] = None, chunk_store: Optional[ChunkStore] = None,
+                 io_executor: Optional[Executor] = None):
+        super().__init__(db_path, table_name="transcriptions", wal_options=wal_options, io_executor=io_executor)
+        # None keeps chunk lists inline in the records
+        self.chunk_store = chunk_store
     
     
     def from_dict(self , data: Dict) -> Transcription:
@@ -14,13 +22,14 @@ class TranscriptionRepository(AbstractRepository[Transcription]) :
             transcription_id=data["transcription_id"],
             original_text=data["original_text"],
             job_id=data["job_id"],
-            original_chunks=data["original_chunks"],
+            original_chunks=self._chunks_from_record(data["original_chunks"]),
             input_language=data["input_language"],
             tr_text=data.get("translated_text"),
-            tr_chunks=data.get("translated_chunks"),
+            tr_chunks=self._chunks_from_record(data.get("translated_chunks")),
             target_language=data.get("target_language"),
             filepath=data.get("filepath"),
             creation_datetime=datetime.fromisoformat(data["creation_datetime"]) if "creation_datetime" in data else None,
+            version=data.get("version", 1),
         )
 
     
@@ -30,14 +39,64 @@ class TranscriptionRepository(AbstractRepository[Transcription]) :
             "transcription_id": data.id,
             "job_id": data.job_id,
             "original_text": data.original_text,
-            "original_chunks": data.original_chunks,
+            "original_chunks": self._chunks_to_record(data, "original_chunks", data.input_language),
             "translated_text": data.translated_text,
-            "translated_chunks": data.translated_chunks,
+            "translated_chunks": self._chunks_to_record(data, "translated_chunks", data.target_language),
             "input_language": data.input_language,
             "target_language": data.target_language,
             "filepath": data.filepath,
-            "creation_datetime": data.creation_datetime.isoformat()
+            "creation_datetime": data.creation_datetime.isoformat(),
+            "version": data.version
+        }
+
+    def delete(self, record_id: int) -> bool:
+        """Delete a record, and the stored chunk lists no other record of its job points at"""
+        with self._reading():
+            doc = self.table.get(doc_id=record_id)
+        deleted = super().delete(record_id)
+        if deleted and doc is not None and self.chunk_store is not None:
+            self._release_chunks(doc["job_id"], self._chunk_refs(doc))
+        return deleted
+
+    def _release_chunks(self, job_id: str, refs: Set[str]):
+        remaining = self.project_by_field("job_id", job_id, ("original_chunks", "translated_chunks"))
+        if not remaining:
+            self.chunk_store.delete_job(job_id)
+            return
+        kept = set().union(*(self._chunk_refs(row) for row in remaining))
+        for ref in refs - kept:
+            self.chunk_store.delete(ref)
+
+    @staticmethod
+    def _chunk_refs(record: Dict) -> Set[str]:
+        return {
+            value[CHUNK_REF_KEY] for value in (record.get("original_chunks"), record.get("translated_chunks"))
+            if isinstance(value, dict) and CHUNK_REF_KEY in value
         }
 
- 
+    def lookup_values(self, entity: Transcription) -> Dict:
+        # to_dict would write the chunk lists to the chunk store
+        return {"transcription_id": entity.id, "job_id": entity.job_id, "target_language": entity.target_language}
+
+    def _chunks_to_record(self, transcription: Transcription, name: str, language: Optional[str]):
+        """
+        The stored form of a chunk list: a {"$chunks": ref} pointer into the chunk store, one file
+        per (job, version, language) shared by every transcription of the job holding that list.
+        """
+        loader = transcription.unloaded_chunks(name)
+        if isinstance(loader, StoredChunks):
+            # never loaded, hence unchanged: keep pointing at the same file
+            return {CHUNK_REF_KEY: loader.ref}
+
+        chunks = getattr(transcription, name)
+        if self.chunk_store is None or not language or not ChunkStore.is_storable(chunks):
+            return chunks
+        ref = ChunkStore.make_ref(transcription.job_id, transcription.version, language)
+        return {CHUNK_REF_KEY: self.chunk_store.save(ref, chunks)}
 
+    def _chunks_from_record(self, value):
+        if isinstance(value, dict) and CHUNK_REF_KEY in value:
+            if self.chunk_store is None:
+                raise ValueError(f"Transcription chunks are stored out of line ({value[CHUNK_REF_KEY]}) but no chunk store is configured")
+            return self.chunk_store.loader(value[CHUNK_REF_KEY])
+        return value
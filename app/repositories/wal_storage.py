@@ -0,0 +1,324 @@
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from tinydb import TinyDB
+from tinydb.storages import Storage
+from tinydb.table import Table
+
+import logging
+
+try:
+    import orjson
+except ImportError:  # optional, the standard library encoder is used without it
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: a second process opening the database is not detected there
+    fcntl = None
+
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+
+def _dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _loads(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+class WALOptions:
+    """How a WALStorage makes its appends durable and when it folds the log into the snapshot."""
+
+    def __init__(self, fsync: str = "interval", fsync_interval: float = 1.0, compact_bytes: int = 16 * 1024 * 1024):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"WAL fsync policy must be one of {FSYNC_POLICIES}, got: {fsync}")
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.compact_bytes = compact_bytes
+
+
+class WALStorage(Storage):
+    """
+    TinyDB storage keeping the whole database in memory. The file at `path` is a snapshot in
+    the regular TinyDB JSON layout, every mutation made through a WALTable is appended to
+    `path + ".wal"` as one JSON line holding only the touched documents, and the log is
+    folded into a new snapshot once it grows past `compact_bytes` and on close.
+    Opening replays the log over the snapshot; a torn last line (crash mid-append) is dropped.
+    The database lives in this process only: another process opening the same file is refused,
+    as both would keep appending to the log from diverging copies.
+    """
+
+    def __init__(self, path: str, options: Optional[WALOptions] = None):
+        self.path = path
+        self.log_path = path + ".wal"
+        self.options = options or WALOptions()
+        self._owner_fd = self._lock_owner()
+        self._data: Dict[str, Dict[str, Dict]] = self._load_snapshot()
+        self._in_mutation = False
+        self._last_fsync = time.monotonic()
+        # let readers with derived state (indexes) notice changes: per table for the mutations of
+        # WALTables, database-wide for the writes tinydb makes on its own
+        self.version = 0
+        self._table_versions: Dict[str, int] = {}
+
+        replayed = self._replay_log()
+        self._log = open(self.log_path, "ab")
+        if replayed:
+            logger.info(f"Replayed {replayed} WAL records into {self.path}")
+            self.compact()
+
+    # -- tinydb Storage -----------------------------------------------------
+
+    def read(self) -> Optional[Dict[str, Dict[str, Dict]]]:
+        # the live data: tinydb copies documents before handing them out
+        return self._data
+
+    def write(self, data: Dict[str, Dict[str, Dict]]):
+        self._data = data
+        if not self._in_mutation:
+            # a whole-database write tinydb made on its own (e.g. drop_tables): snapshot it
+            self.version += 1
+            self.compact()
+
+    def table_version(self, table: str):
+        """Changes whenever the table may have changed, unlike `version` not on other tables' mutations"""
+        return self.version, self._table_versions.get(table, 0)
+
+    def close(self):
+        if self._log.closed:
+            return
+        self.compact()
+        self._log.close()
+        if self._owner_fd is not None:
+            os.close(self._owner_fd)
+            self._owner_fd = None
+
+    def _lock_owner(self) -> Optional[int]:
+        if fcntl is None:
+            return None
+        fd = os.open(self.path + ".wal.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # a POSIX record lock: per process, so reopening the file here (after a crash) still works
+            fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            raise ValueError(
+                f"{self.path} is already open in WAL mode by another process, "
+                f"DB_STORAGE=wal needs a single worker process"
+            )
+        return fd
+
+    # -- log ----------------------------------------------------------------
+
+    def begin_mutation(self):
+        self._in_mutation = True
+
+    def abort_mutation(self):
+        self._in_mutation = False
+        # which table the failed mutation had reached is unknown
+        self.version += 1
+
+    def end_mutation(self, table: str, doc_ids: Iterable[int] = (), truncated: bool = False):
+        """Append what a table mutation changed: the current version (or deletion) of doc_ids."""
+        self._in_mutation = False
+        self._table_versions[table] = self._table_versions.get(table, 0) + 1
+        if truncated:
+            record = {"t": table, "truncate": True}
+        else:
+            documents = self._data.get(table, {})
+            upserts, deletes = {}, []
+            for doc_id in doc_ids:
+                doc = documents.get(str(doc_id))
+                if doc is None:
+                    deletes.append(str(doc_id))
+                else:
+                    upserts[str(doc_id)] = doc
+            if not upserts and not deletes:
+                return
+            record = {"t": table, "u": upserts, "d": deletes}
+        self._append(record)
+
+    def _append(self, record: Dict):
+        self._log.write(_dumps(record) + b"\n")
+        self._log.flush()
+
+        now = time.monotonic()
+        if self.options.fsync == "always" or \
+                self.options.fsync == "interval" and now - self._last_fsync >= self.options.fsync_interval:
+            os.fsync(self._log.fileno())
+            self._last_fsync = now
+
+        if self._log.tell() >= self.options.compact_bytes:
+            self.compact()
+
+    def compact(self):
+        """Write the in-memory database as the new snapshot (atomically) and empty the log."""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(_dumps(self._data))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self._fsync_directory()
+
+        # replaying an old log over the new snapshot is harmless: records are whole documents
+        if not getattr(self, "_log", None) or self._log.closed:
+            return
+        self._log.truncate(0)
+        self._log.seek(0)
+        os.fsync(self._log.fileno())
+        self._last_fsync = time.monotonic()
+
+    def _load_snapshot(self) -> Dict[str, Dict[str, Dict]]:
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return {}
+        with open(self.path, "rb") as f:
+            return _loads(f.read()) or {}
+
+    def _replay_log(self) -> int:
+        if not os.path.exists(self.log_path):
+            return 0
+
+        replayed, valid_bytes = 0, 0
+        with open(self.log_path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete record")
+                    record = _loads(line)
+                except ValueError:
+                    logger.warning(f"Dropping a torn record at the end of {self.log_path}")
+                    break
+                self._apply(record)
+                replayed += 1
+                valid_bytes += len(line)
+
+        if valid_bytes < os.path.getsize(self.log_path):
+            with open(self.log_path, "r+b") as f:
+                f.truncate(valid_bytes)
+        return replayed
+
+    def _apply(self, record: Dict):
+        if record.get("truncate"):
+            self._data[record["t"]] = {}
+            return
+        documents = self._data.setdefault(record["t"], {})
+        documents.update(record.get("u", {}))
+        for doc_id in record.get("d", []):
+            documents.pop(doc_id, None)
+
+    def _fsync_directory(self):
+        if os.name != "posix":
+            return
+        fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class WALTable(Table):
+    """
+    Table reporting the documents each mutation touched, so WALStorage logs only those.
+    upsert is covered through the update/insert calls it makes.
+    """
+
+    def _mutate(self, method, *args, **kwargs):
+        self._storage.begin_mutation()
+        try:
+            result = method(*args, **kwargs)
+        except BaseException:
+            self._storage.abort_mutation()
+            raise
+        doc_ids = result if isinstance(result, list) else [result]
+        self._storage.end_mutation(self.name, doc_ids)
+        return result
+
+    def insert(self, document):
+        return self._mutate(super().insert, document)
+
+    def insert_multiple(self, documents):
+        return self._mutate(super().insert_multiple, documents)
+
+    def update(self, fields, cond=None, doc_ids=None):
+        return self._mutate(super().update, fields, cond, doc_ids)
+
+    def update_multiple(self, updates):
+        return self._mutate(super().update_multiple, updates)
+
+    def remove(self, cond=None, doc_ids=None):
+        return self._mutate(super().remove, cond, doc_ids)
+
+    def truncate(self):
+        self._storage.begin_mutation()
+        try:
+            super().truncate()
+        except BaseException:
+            self._storage.abort_mutation()
+            raise
+        self._storage.end_mutation(self.name, truncated=True)
+
+
+class WALTinyDB(TinyDB):
+    table_class = WALTable
+
+
+# one database per file: repositories of the same file must share the in-memory state
+_databases: Dict[str, WALTinyDB] = {}
+_references: Dict[str, int] = {}
+_registry_lock = threading.Lock()
+_registry_pid = os.getpid()
+
+
+def open_database(db_path: str, options: Optional[WALOptions] = None) -> WALTinyDB:
+    global _registry_pid
+    key = os.path.abspath(db_path)
+    with _registry_lock:
+        if _registry_pid != os.getpid():
+            # a forked child: the inherited databases belong to the parent, which still writes them
+            _databases.clear()
+            _references.clear()
+            _registry_pid = os.getpid()
+        db = _databases.get(key)
+        if db is None:
+            db = WALTinyDB(key, storage=WALStorage, options=options)
+            _databases[key] = db
+        _references[key] = _references.get(key, 0) + 1
+        return db
+
+
+def release_database(db_path: str):
+    key = os.path.abspath(db_path)
+    with _registry_lock:
+        _references[key] = _references.get(key, 1) - 1
+        if _references[key] > 0:
+            return
+        _references.pop(key, None)
+        db = _databases.pop(key, None)
+    if db is not None:
+        db.close()
+
+
+@atexit.register
+def close_all_databases():
+    with _registry_lock:
+        databases = list(_databases.values())
+        _databases.clear()
+        _references.clear()
+    for db in databases:
+        db.close()
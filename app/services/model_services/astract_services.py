@@ -1,28 +1,164 @@
-from typing import TypeVar , Generic, List, Any, Optional
+from typing import TypeVar , Generic, List, Any, Optional, Dict, Sequence, Tuple
 from app.repositories.abstract_repository import AbstractRepository
+from app.services.model_services.entity_cache import EntityCache
 from abc import ABC , abstractmethod
 
 T = TypeVar("T")
 
 class AbstractServices(Generic[T]) :
 
-    def __init__(self , repository : AbstractRepository[T]):
+    def __init__(self , repository : AbstractRepository[T] , cache : Optional[EntityCache] = None):
         self.repository = repository
+        # optional read-through cache of find_one_by_field / find_by_field results
+        self.cache = cache
 
     def create(self , entity : T) -> int : 
-        return self.repository.create(entity=entity)
+        result = self.repository.create(entity=entity)
+        self._invalidate([entity])
+        return result
 
     def create_many(self , entities : List[T]) -> int : 
-        return self.repository.create_many(entities=entities)
+        result = self.repository.create_many(entities=entities)
+        self._invalidate(entities)
+        return result
 
     def find_one_by_field(self , field_name : str , value : Any) -> Optional[T] : 
-        return self.repository.find_one_by_field(field_name=field_name , value=value)
+        return self._cached(
+            ("one", field_name, value),
+            lambda: self.repository.find_one_by_field(field_name=field_name , value=value)
+        )
     
     def find_by_field(self , field_name : str , value : Any) -> List[T] :
-        return self.repository.find_by_field(field_name=field_name , value=value)
+        return self._cached(
+            ("all", field_name, value),
+            lambda: self.repository.find_by_field(field_name=field_name , value=value)
+        )
+
+    def project_by_field(self , field_name : str , value : Any , fields : Sequence[str]) -> List[Dict[str, Any]] :
+        return self.repository.project_by_field(field_name=field_name , value=value , fields=fields)
+
+    def page(self , order_by : str , limit : int , after : Optional[Tuple[Any, int]] = None ,
+             filters : Optional[Dict[str, Any]] = None , fields : Sequence[str] = () ,
+             descending : bool = True) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, int]]] :
+        # listings are not cached: every page of every filter would be its own entry
+        return self.repository.page(order_by=order_by , limit=limit , after=after , filters=filters ,
+                                    fields=fields , descending=descending)
 
     def update_by_field(self , field_name : str, value : Any , entity : T ) -> bool : 
-        return self.repository.update_by_field(field_name=field_name , value=value , entity=entity)
+        result = self.repository.update_by_field(field_name=field_name , value=value , entity=entity)
+        self._invalidate([entity])
+        if self.cache is not None:
+            # the records matched by (field_name, value) are the ones rewritten
+            self.cache.invalidate(values={field_name: value})
+        return result
+
+    def update_many(self , field_name : str , entities : List[T]) -> int : 
+        result = self.repository.update_many(field_name=field_name , entities=entities)
+        self._invalidate(entities)
+        return result
     
     def find_all(self) -> List[T] : 
-        return self.repository.get_all()
\ No newline at end of file
+        return self.repository.get_all()
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        return self.cache.stats() if self.cache is not None else None
+
+    # async variants for async endpoints: cache hits are answered on the event loop,
+    # everything else runs on the repository's I/O pool
+
+    async def create_async(self , entity : T) -> int :
+        result = await self.repository.create_async(entity=entity)
+        self._invalidate([entity])
+        return result
+
+    async def create_many_async(self , entities : List[T]) -> int :
+        result = await self.repository.create_many_async(entities=entities)
+        self._invalidate(entities)
+        return result
+
+    async def find_one_by_field_async(self , field_name : str , value : Any) -> Optional[T] :
+        return await self._cached_async(
+            ("one", field_name, value),
+            lambda: self.repository.find_one_by_field_async(field_name=field_name , value=value)
+        )
+
+    async def find_by_field_async(self , field_name : str , value : Any) -> List[T] :
+        return await self._cached_async(
+            ("all", field_name, value),
+            lambda: self.repository.find_by_field_async(field_name=field_name , value=value)
+        )
+
+    async def project_by_field_async(self , field_name : str , value : Any , fields : Sequence[str]) -> List[Dict[str, Any]] :
+        return await self.repository.project_by_field_async(field_name=field_name , value=value , fields=fields)
+
+    async def page_async(self , order_by : str , limit : int , after : Optional[Tuple[Any, int]] = None ,
+                         filters : Optional[Dict[str, Any]] = None , fields : Sequence[str] = () ,
+                         descending : bool = True) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, int]]] :
+        return await self.repository.page_async(order_by=order_by , limit=limit , after=after , filters=filters ,
+                                                fields=fields , descending=descending)
+
+    async def update_by_field_async(self , field_name : str, value : Any , entity : T ) -> bool :
+        result = await self.repository.update_by_field_async(field_name=field_name , value=value , entity=entity)
+        self._invalidate([entity])
+        if self.cache is not None:
+            self.cache.invalidate(values={field_name: value})
+        return result
+
+    async def update_many_async(self , field_name : str , entities : List[T]) -> int :
+        result = await self.repository.update_many_async(field_name=field_name , entities=entities)
+        self._invalidate(entities)
+        return result
+
+    async def find_all_async(self) -> List[T] :
+        return await self.repository.get_all_async()
+
+    def _cache_key(self , lookup) :
+        if self.cache is None:
+            return None
+        kind, field_name, value = lookup
+        key = (f"{type(self).__name__}.{kind}", field_name, value)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _cache_put(self , key , result , generation : int):
+        entities = result if isinstance(result, list) else [result] if result is not None else []
+        self.cache.put(key, result, [getattr(entity, "id", None) for entity in entities], generation=generation)
+
+    def _cached(self , lookup , load) :
+        key = self._cache_key(lookup)
+        if key is None:
+            return load()
+
+        hit, result = self.cache.get(key)
+        if hit:
+            return result
+        generation = self.cache.generation()
+        result = load()
+        self._cache_put(key, result, generation)
+        return result
+
+    async def _cached_async(self , lookup , load) :
+        key = self._cache_key(lookup)
+        if key is None:
+            return await load()
+
+        hit, result = self.cache.get(key)
+        if hit:
+            return result
+        generation = self.cache.generation()
+        result = await load()
+        self._cache_put(key, result, generation)
+        return result
+
+    def _invalidate(self , entities : List[T]):
+        if self.cache is None:
+            return
+        for entity in entities:
+            self.cache.invalidate(
+                entity_ids=[getattr(entity, "id", None)],
+                values=self.repository.lookup_values(entity),
+                drop_unknown_fields=True
+            )
@@ -0,0 +1,109 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, Optional, Tuple
+
+import logging
+
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+class EntityCache:
+    """
+    Bounded LRU of lookup results with a time-to-live, keyed by (entity type, field, value).
+    Values are deep-copied in and out, so callers can mutate what they get without touching
+    the cached copy. Entries are dropped when an entity they hold, or that now matches their
+    key, is written through the owning services; the TTL bounds staleness for writes made
+    elsewhere (other processes, direct repository access).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 5.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, value, ids of the entities in value)
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any, FrozenSet[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        # bumped by every invalidation: a result loaded before a write must not be cached after it
+        self._generation = 0
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def get(self, key: Tuple) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            value = entry[1]
+        return True, copy.deepcopy(value)
+
+    def put(self, key: Tuple, value: Any, entity_ids: Iterable[str], generation: Optional[int] = None):
+        if self.max_entries <= 0:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value, frozenset(entity_ids))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, entity_ids: Iterable[str] = (), values: Optional[Dict[Hashable, Any]] = None,
+                   drop_unknown_fields: bool = False):
+        """
+        Drop the entries holding any of entity_ids, and those whose (field, value) key matches
+        one of `values` (the stored fields of a written entity, which may now belong to them).
+        With drop_unknown_fields, entries keyed on a field missing from `values` go too.
+        """
+        entity_ids = set(entity_ids)
+        values = values or {}
+        with self._lock:
+            self._generation += 1
+            stale = []
+            for key, (_, _, ids) in self._entries.items():
+                _, field, value = key
+                if ids & entity_ids or self._matches(values, field, value) or drop_unknown_fields and field not in values:
+                    stale.append(key)
+            for key in stale:
+                del self._entries[key]
+            self._invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+    @staticmethod
+    def _matches(values: Dict[Hashable, Any], field: str, value: Any) -> bool:
+        if field not in values:
+            return False
+        try:
+            return values[field] == value
+        except Exception:
+            return False
@@ -1,9 +1,11 @@
+from typing import Optional
 from app.services.model_services.astract_services import AbstractServices
+from app.services.model_services.entity_cache import EntityCache
 from app.repositories.abstract_repository import AbstractRepository
 from app.models.summary import Summary
 
 
 class SummaryServices(AbstractServices[Summary]) : 
     
-    def __init__(self, repository : AbstractRepository[Summary]):
-        super().__init__(repository)
\ No newline at end of file
+    def __init__(self, repository : AbstractRepository[Summary], cache : Optional[EntityCache] = None):
+        super().__init__(repository, cache=cache)
\ No newline at end of file
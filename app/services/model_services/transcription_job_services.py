@@ -1,10 +1,12 @@
+from typing import Optional
 from app.services.model_services.astract_services import AbstractServices
+from app.services.model_services.entity_cache import EntityCache
 from app.models.transcription_job import TranscriptionJob
 from app.repositories.abstract_repository import AbstractRepository
 
 
 class TranscriptionJobServices(AbstractServices[TranscriptionJob]) : 
 
-    def __init__(self, repository : AbstractRepository[TranscriptionJob]):
-        super().__init__(repository)
+    def __init__(self, repository : AbstractRepository[TranscriptionJob], cache : Optional[EntityCache] = None):
+        super().__init__(repository, cache=cache)
     
@@ -1,10 +1,12 @@
+from typing import Optional
 from app.services.model_services.astract_services import AbstractServices
+from app.services.model_services.entity_cache import EntityCache
 from app.models.transcription import Transcription
 from app.repositories.abstract_repository import AbstractRepository
 
 
 class TranscriptionServices(AbstractServices[Transcription]) : 
 
-    def __init__(self, repository : AbstractRepository[Transcription]):
-        super().__init__(repository)
+    def __init__(self, repository : AbstractRepository[Transcription], cache : Optional[EntityCache] = None):
+        super().__init__(repository, cache=cache)
 
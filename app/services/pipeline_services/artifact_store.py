@@ -0,0 +1,283 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Sequence
+
+import logging
+
+from app.models.transcription_job import TranscriptionJob
+from app.services.model_services.astract_services import AbstractServices
+
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+# kinds of artifacts, the first segment of every key
+ARTIFACT_KINDS = ("uploads", "audios", "processed_videos", "transcriptions")
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+# keys are locked through a fixed set of stripes, not one lock per key ever stored
+KEY_LOCK_STRIPES = 64
+
+
+class ArtifactBackend(ABC):
+    """
+    Where the blobs behind the keys live. A backend may manage only some kinds, the others are
+    left as plain files where the pipeline wrote them.
+    An object store backend keeps the same interface: put_file uploads (and removes the local
+    file), local_path downloads to a local cache for ffmpeg and file serving.
+    """
+
+    @abstractmethod
+    def manages(self, kind: str) -> bool:
+        pass
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        pass
+
+    @abstractmethod
+    def put_file(self, key: str, source_path: str):
+        """Take over source_path as the blob of key (the source file is gone afterwards)"""
+        pass
+
+    @abstractmethod
+    def local_path(self, key: str) -> str:
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        pass
+
+    def staging_dir(self, kind: str) -> str:
+        """Where files of a kind are written before they are put, ideally on the same filesystem"""
+        return tempfile.gettempdir()
+
+
+class LocalFileBackend(ArtifactBackend):
+    """Blobs as files under one root directory per kind, "<kind>/<ab>/<digest><ext>" at "<root>/<ab>/<digest><ext>"."""
+
+    def __init__(self, roots: Optional[Dict[str, str]] = None):
+        self.roots = {kind: os.path.abspath(root) for kind, root in (roots or {}).items()}
+
+    def manages(self, kind: str) -> bool:
+        return kind in self.roots
+
+    def path(self, key: str) -> str:
+        kind, _, rest = key.partition("/")
+        root = self.roots.get(kind)
+        if root is None or not rest:
+            raise ValueError(f"Artifact key outside the store: {key}")
+        path = os.path.abspath(os.path.join(root, rest))
+        if os.path.commonpath([path, root]) != root:
+            raise ValueError(f"Artifact key outside the store: {key}")
+        return path
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.path(key))
+
+    def put_file(self, key: str, source_path: str):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            # atomic on the same filesystem: readers see the whole blob or none
+            os.replace(source_path, path)
+        except OSError:
+            temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            shutil.move(source_path, temp_path)
+            os.replace(temp_path, path)
+
+    def local_path(self, key: str) -> str:
+        return self.path(key)
+
+    def delete(self, key: str) -> bool:
+        path = self.path(key)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        try:
+            # the "<ab>" fan-out directory, once empty
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass
+        return True
+
+    def staging_dir(self, kind: str) -> str:
+        if kind not in self.roots:
+            return super().staging_dir(kind)
+        directory = os.path.join(self.roots[kind], ".staging")
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+
+class ArtifactStore:
+    """
+    Job artifacts stored by content: an upload or a derived file (extracted audio, remux, subtitle
+    file) gets the key "<kind>/<ab>/<sha256><ext>", relative, so the database never holds a
+    machine's absolute paths. Identical content is stored once: putting it again drops the new
+    copy and returns the existing key, so a blob may be shared by several jobs (see discard_job_artifact).
+    A key put with pin=True is kept from discard_job_artifact until unpinned, which its writer does
+    once a record points at it: the blob another job is about to reuse cannot be deleted in between.
+    Pins and key locks are per process.
+
+    Records written before the store hold plain paths. local_path passes them through, and finds
+    files moved to another checkout by their name in legacy_dirs. Kinds the backend does not
+    manage (the default, empty backend manages none) keep plain paths too.
+    """
+
+    def __init__(self, backend: Optional[ArtifactBackend] = None, legacy_dirs: Sequence[str] = ()):
+        self.backend = backend or LocalFileBackend()
+        self.legacy_dirs = [os.path.abspath(directory) for directory in legacy_dirs]
+        self._key_locks = [threading.Lock() for _ in range(KEY_LOCK_STRIPES)]
+        # key -> writers that put it and have not saved their reference yet
+        self._pins: Dict[str, int] = {}
+
+    # -- keys ------------------------------------------------------------------
+
+    @staticmethod
+    def make_key(kind: str, digest: str, suffix: str) -> str:
+        if kind not in ARTIFACT_KINDS:
+            raise ValueError(f"Unknown artifact kind: {kind}, expected one of {ARTIFACT_KINDS}")
+        return f"{kind}/{digest[:2]}/{digest}{suffix.lower()}"
+
+    @staticmethod
+    def is_key(ref: Optional[str]) -> bool:
+        return bool(ref) and not os.path.isabs(ref) and ref.split("/", 1)[0] in ARTIFACT_KINDS
+
+    @staticmethod
+    def file_digest(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _manages(self, ref: Optional[str]) -> bool:
+        return self.is_key(ref) and self.backend.manages(ref.split("/", 1)[0])
+
+    # -- writing ---------------------------------------------------------------
+
+    def staging_path(self, kind: str, suffix: str = "") -> str:
+        """A fresh path to write a file of `kind` to before putting it"""
+        return os.path.join(self.backend.staging_dir(kind), f"{uuid.uuid4().hex}{suffix.lower()}")
+
+    def put_file(self, path: str, kind: str, suffix: Optional[str] = None, digest: Optional[str] = None,
+                 pin: bool = False) -> str:
+        """
+        Move a written file into the store and return its key (its path when the kind is not managed).
+        digest: the file's sha256 when the writer computed it on the fly, else the file is read again.
+        pin: keep the blob until unpin(key), for a writer that saves a reference to it afterwards.
+        """
+        if not self.backend.manages(kind):
+            return path
+        suffix = os.path.splitext(path)[1] if suffix is None else suffix
+        key = self.make_key(kind, digest or self.file_digest(path), suffix)
+
+        with self.key_lock(key):
+            if self.backend.exists(key):
+                logger.info(f"{path} is already stored as {key}, dropping the copy")
+                os.remove(path)
+            else:
+                self.backend.put_file(key, path)
+            if pin:
+                self._pins[key] = self._pins.get(key, 0) + 1
+        return key
+
+    @contextmanager
+    def storing(self, path: str, kind: str, suffix: Optional[str] = None) -> Iterator[str]:
+        """put_file, the key pinned while the block saves the record pointing at it"""
+        key = self.put_file(path, kind, suffix=suffix, pin=True)
+        try:
+            yield key
+        finally:
+            self.unpin(key)
+
+    def unpin(self, key: Optional[str]):
+        if not self._manages(key):
+            return
+        with self.key_lock(key):
+            remaining = self._pins.get(key, 0) - 1
+            if remaining > 0:
+                self._pins[key] = remaining
+            else:
+                self._pins.pop(key, None)
+
+    def is_pinned(self, key: Optional[str]) -> bool:
+        return bool(key) and self._pins.get(key, 0) > 0
+
+    def key_lock(self, key: str) -> threading.Lock:
+        """Held by puts and by discard_job_artifact's reference check and delete of the key"""
+        return self._key_locks[int(hashlib.sha1(key.encode("utf-8")).hexdigest(), 16) % KEY_LOCK_STRIPES]
+
+    def put_sibling(self, path: str, key: str, suffix: str) -> str:
+        """
+        Store a file derived from the blob of `key` (e.g. the SRT of a VTT) next to it, under the
+        same digest with its own extension. Paths of unmanaged kinds are left as they are.
+        """
+        if not self._manages(key):
+            return path
+        sibling = f"{os.path.splitext(key)[0]}{suffix.lower()}"
+        self.backend.put_file(sibling, path)
+        return sibling
+
+    # -- reading ---------------------------------------------------------------
+
+    def local_path(self, ref: Optional[str]) -> Optional[str]:
+        """A local file path for a key or a stored plain path, what ffmpeg and the file server open"""
+        if not ref:
+            return ref
+        if self._manages(ref):
+            return self.backend.local_path(ref)
+        if os.path.exists(ref) or not self.legacy_dirs:
+            return ref
+        # an absolute path of another machine or checkout: the file kept its name
+        for directory in self.legacy_dirs:
+            candidate = os.path.join(directory, os.path.basename(ref))
+            if os.path.isfile(candidate):
+                return candidate
+        return ref
+
+    def exists(self, ref: Optional[str]) -> bool:
+        if not ref:
+            return False
+        if self._manages(ref):
+            return self.backend.exists(ref)
+        return os.path.isfile(self.local_path(ref))
+
+    def delete(self, ref: Optional[str]) -> bool:
+        if not ref:
+            return False
+        if self._manages(ref):
+            return self.backend.delete(ref)
+        try:
+            os.remove(self.local_path(ref))
+            return True
+        except FileNotFoundError:
+            return False
+
+
+def discard_job_artifact(store: ArtifactStore, job_services: AbstractServices[TranscriptionJob],
+                         field_name: str, ref: Optional[str], job_id: Optional[str]) -> bool:
+    """
+    Delete an artifact `job_id` no longer points at, unless another job's `field_name` (a record
+    field, e.g. "audio_path") still does: identical content is stored once and shared. A pinned
+    key is kept too, a job put the same content and is saving its reference to it.
+    """
+    if not ref:
+        return False
+    with store.key_lock(ref):
+        if store.is_pinned(ref):
+            logger.info(f"Keeping {ref}, another job is storing the same content")
+            return False
+        if any(job.id != job_id for job in job_services.find_by_field(field_name=field_name, value=ref)):
+            logger.info(f"Keeping {ref}, another job still uses it")
+            return False
+        return store.delete(ref)
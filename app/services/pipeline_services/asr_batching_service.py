@@ -0,0 +1,258 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.transcription import Transcription
+from app.services.pipeline_services.audio_service import AudioUtils
+from app.services.pipeline_services.sharding_service import Shard, stitch_shard_chunks
+from app.services.pipeline_services.transcription_service import ASRModel, AUTO_LANGUAGE
+
+import logging
+
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+# (model_size, language, task) -- windows can only share a forward pass if all three match
+BatchKey = Tuple[str, str, str]
+
+
+class ASRBatchingStoppedError(RuntimeError):
+    """Set on the windows still queued when the batching server stops."""
+
+
+class _WindowRequest:
+
+    __slots__ = ("array", "sampling_rate", "key", "future")
+
+    def __init__(self, array: np.ndarray, sampling_rate: int, key: BatchKey):
+        self.array = array
+        self.sampling_rate = sampling_rate
+        self.key = key
+        self.future: Future = Future()
+
+
+class ASRBatchingServer:
+    """
+    Cross-job micro-batching front-end for ASRModel.
+
+    Each job's audio is cut into 30 s Whisper windows, overlapping by `overlap_seconds` so a
+    word cut at a window edge is heard whole by the next one, which are queued to a single
+    worker thread. The worker groups windows with the same (model size, language, task)
+    into batches of up to `max_batch_size`, waiting at most `max_wait_ms` for a batch
+    to fill, decodes them in one forward pass and routes the results back to the
+    submitting job, where the overlaps are resolved like time shards (a chunk belongs to the
+    window owning its midpoint). Exposes the same `transcribe()` signature as ASRModel.
+    """
+
+    WINDOW_SECONDS = 30
+
+    def __init__(self,
+                 asr_model: ASRModel,
+                 max_batch_size: int = 8,
+                 max_wait_ms: int = 50,
+                 idle_unload_seconds: float = 60.0,
+                 overlap_seconds: float = 5.0):
+
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        if not 0 <= overlap_seconds < self.WINDOW_SECONDS / 2:
+            raise ValueError(f"overlap_seconds must be in [0, {self.WINDOW_SECONDS / 2})")
+
+        self.asr_model = asr_model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.idle_unload_seconds = idle_unload_seconds
+        self.overlap_seconds = overlap_seconds
+
+        self._queue: "queue.Queue[_WindowRequest]" = queue.Queue()
+        self._carry_over: Deque[_WindowRequest] = deque()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        self._stats = {"batches": 0, "windows": 0, "audio_seconds": 0.0, "busy_seconds": 0.0}
+        # updated by the worker, read by API threads
+        self._stats_lock = threading.Lock()
+        logger.info(f"ASRBatchingServer initialized max_batch_size={max_batch_size}, max_wait_ms={max_wait_ms}")
+
+    def start(self):
+        with self._start_lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._stopped.clear()
+            self._worker = threading.Thread(target=self._run, name="asr-batching-worker", daemon=True)
+            self._worker.start()
+            logger.info("ASR batching worker started")
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the worker; windows it did not take fail with ASRBatchingStoppedError instead of hanging their job"""
+        self._stopped.set()
+        if self._worker is not None:
+            self._worker.join(timeout=timeout)
+            self._worker = None
+
+        pending = list(self._carry_over)
+        self._carry_over.clear()
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for request in pending:
+            if not request.future.done():
+                request.future.set_exception(ASRBatchingStoppedError("The ASR batching server stopped before decoding this window"))
+        logger.info(f"ASR batching worker stopped ({len(pending)} queued windows failed)")
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["avg_batch_size"] = stats["windows"] / stats["batches"] if stats["batches"] else 0.0
+        stats["audio_seconds_per_second"] = stats["audio_seconds"] / stats["busy_seconds"] if stats["busy_seconds"] else 0.0
+        return stats
+
+    def transcribe(self, audio: AudioUtils, model_size: str, translate_to_eng: bool = False) -> Transcription:
+        """Transcribe audio through the shared batching queue. Blocks the calling job thread only."""
+        logger.info(f"Queueing transcription for job_id: {getattr(audio, 'job_id', None)}")
+        self.asr_model.validate_audio(audio)
+        self.start()
+
+        if audio.language == AUTO_LANGUAGE:
+            audio.language = self.asr_model.detect_language(audio=audio, model_size=model_size)
+
+        task = "translate" if translate_to_eng else "transcribe"
+        cached = self.asr_model.cache_lookup(audio=audio, model_size=model_size, task=task)
+        if cached is not None:
+            text, chunks = cached
+            logger.info(f"Transcription cache hit for job_id: {audio.job_id}, skipping ASR")
+            return Transcription(
+                original_text=text,
+                original_chunks=chunks,
+                input_language=audio.language,
+                job_id=audio.job_id
+            )
+
+        key: BatchKey = (model_size, audio.language, task)
+        windows = self._plan_windows(total_seconds=audio.array.size / audio.sampling_rate)
+
+        requests = []
+        for window in windows:
+            array = audio.array[int(round(window.extract_start * audio.sampling_rate)):int(round(window.extract_end * audio.sampling_rate))]
+            request = _WindowRequest(array=array, sampling_rate=audio.sampling_rate, key=key)
+            self._queue.put(request)
+            requests.append(request)
+
+        results = [request.future.result() for request in requests]
+        text, chunks = self._merge_windows(windows, results)
+        self.asr_model.cache_store(audio=audio, model_size=model_size, task=task, text=text, chunks=chunks)
+
+        logger.info(f"Batched transcription result: windows={len(windows)}, text length={len(text)}, chunks={len(chunks)}")
+        return Transcription(
+            original_text=text,
+            original_chunks=chunks,
+            input_language=audio.language,
+            job_id=audio.job_id
+        )
+
+    def _plan_windows(self, total_seconds: float) -> List[Shard]:
+        """
+        30 s windows every WINDOW_SECONDS - overlap_seconds. Each owns the part of the timeline up to
+        the middle of its overlaps with its neighbours, [start, end); it decodes [extract_start, extract_end).
+        """
+        hop = self.WINDOW_SECONDS - self.overlap_seconds
+        starts = [0.0]
+        while starts[-1] + self.WINDOW_SECONDS < total_seconds:
+            starts.append(starts[-1] + hop)
+
+        half_overlap = self.overlap_seconds / 2
+        windows = []
+        for index, start in enumerate(starts):
+            extract_end = min(start + self.WINDOW_SECONDS, total_seconds)
+            windows.append(Shard(
+                index=index,
+                start=start + half_overlap if index > 0 else 0.0,
+                end=extract_end - half_overlap if index < len(starts) - 1 else total_seconds,
+                extract_start=start,
+                extract_end=extract_end
+            ))
+        return windows
+
+    @staticmethod
+    def _merge_windows(windows: List[Shard], results: List[Dict]) -> Tuple[str, List[Dict]]:
+        """Shift window-relative timestamps to absolute time, keeping each overlapped chunk once."""
+        # Whisper leaves the last timestamp open when speech runs to the window edge, stitching closes it
+        chunks = stitch_shard_chunks(windows, [result.get("chunks", []) for result in results])
+        text = " ".join(chunk["text"].strip() for chunk in chunks if chunk["text"].strip())
+        return text, chunks
+
+    def _next_request(self, timeout: Optional[float]) -> Optional[_WindowRequest]:
+        if self._carry_over:
+            return self._carry_over.popleft()
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _collect_batch(self, first: _WindowRequest) -> List[_WindowRequest]:
+        batch = [first]
+        skipped: List[_WindowRequest] = []
+
+        # windows of another key left over from the previous round are considered first
+        while self._carry_over and len(batch) < self.max_batch_size:
+            request = self._carry_over.popleft()
+            (batch if request.key == first.key else skipped).append(request)
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            (batch if request.key == first.key else skipped).append(request)
+
+        self._carry_over.extend(skipped)
+        return batch
+
+    def _run(self):
+        idle_since = time.monotonic()
+        while not self._stopped.is_set():
+            first = self._next_request(timeout=0.5)
+            if first is None:
+                if self.asr_model.pipeline is not None and time.monotonic() - idle_since > self.idle_unload_seconds:
+                    self.asr_model.unload()
+                continue
+
+            batch = self._collect_batch(first)
+            model_size, language, task = first.key
+            started = time.monotonic()
+            try:
+                results = self.asr_model.transcribe_windows(
+                    windows=[request.array for request in batch],
+                    model_size=model_size,
+                    language=language,
+                    task=task
+                )
+                for request, result in zip(batch, results):
+                    request.future.set_result(result)
+            except Exception as e:
+                logger.error(f"Batched decoding failed for {len(batch)} windows: {e}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+            elapsed = time.monotonic() - started
+            with self._stats_lock:
+                self._stats["batches"] += 1
+                self._stats["windows"] += len(batch)
+                self._stats["audio_seconds"] += sum(request.array.size / request.sampling_rate for request in batch)
+                self._stats["busy_seconds"] += elapsed
+            idle_since = time.monotonic()
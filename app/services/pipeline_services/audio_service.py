@@ -1,3 +1,4 @@
+import hashlib
 import numpy as np
 import librosa 
 import matplotlib.pyplot as plt 
@@ -17,6 +18,7 @@ class AudioUtils() :
         self.sampling_rate = sampling_rate
         self.language = language
         self.job_id = job_id
+        self._fingerprint = None
 
     @classmethod
     def load_resample_audio(cls , audio : Audio)  : 
@@ -41,12 +43,37 @@ class AudioUtils() :
         return instance
 
 
+    @classmethod
+    def from_array(cls , array , sampling_rate , language , job_id , target_sr = 16_000) : 
+        """Wrap already decoded samples, resampling only if needed"""
+
+        instance = cls(
+            array = array , 
+            sampling_rate = sampling_rate , 
+            language = language , 
+            job_id = job_id
+        )
+
+        if sampling_rate != target_sr : 
+            instance.resample(target_sr=target_sr)
+        instance.reduce_noise()
+
+        return instance
+
     def resample(self , target_sr = 16_000) : 
         resmpled_audio = librosa.resample(self.array , orig_sr=self.sampling_rate , target_sr=target_sr) 
         self.array = resmpled_audio
         self.sampling_rate = target_sr
+        self._fingerprint = None
         logger.info("Audio was resmapled successfully")
     
+    def fingerprint(self) -> str : 
+        """sha256 of the decoded PCM samples, identical for re-uploads of the same audio"""
+        if self._fingerprint is None : 
+            samples = np.ascontiguousarray(self.array , dtype=np.float32)
+            self._fingerprint = hashlib.sha256(memoryview(samples)).hexdigest()
+        return self._fingerprint
+
     def audio_stats(self) : 
         stats = {}
         stats["size_MB"] = np.round((self.array.size * self.array.itemsize) * 1 / (1024 * 1024) , decimals=2) 
@@ -0,0 +1,241 @@
+import asyncio
+import os
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import ffmpeg
+import logging
+
+from app.services.pipeline_services.job_cancellation import JobCancelledError
+
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+class FfmpegProgress:
+    """One `-progress` report of a running ffmpeg process."""
+
+    def __init__(self, out_time: float, duration: Optional[float], speed: Optional[float], done: bool = False):
+        self.out_time = out_time      # seconds of output written so far
+        self.duration = duration      # expected output duration, if known
+        self.speed = speed            # media seconds processed per wall-clock second
+        self.done = done
+
+    @property
+    def percent(self) -> Optional[float]:
+        if self.done:
+            return 100.0
+        if not self.duration:
+            return None
+        return round(min(100.0, 100.0 * self.out_time / self.duration), 1)
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        if self.done:
+            return 0.0
+        if not self.duration or not self.speed:
+            return None
+        return round(max(0.0, self.duration - self.out_time) / self.speed, 1)
+
+    def to_dict(self) -> Dict:
+        return {"out_time": self.out_time, "percent": self.percent, "eta_seconds": self.eta_seconds, "speed": self.speed}
+
+
+def parse_progress_block(fields: Dict[str, str], duration: Optional[float]) -> FfmpegProgress:
+    """Turn the key=value lines of one `-progress` block into an FfmpegProgress."""
+    out_time = 0.0
+    # out_time_us is the precise one; out_time_ms is also microseconds despite its name
+    for key in ("out_time_us", "out_time_ms"):
+        value = fields.get(key)
+        if value and value.lstrip("-").isdigit():
+            out_time = max(0.0, int(value) / 1_000_000)
+            break
+
+    speed = None
+    raw_speed = fields.get("speed", "").strip().rstrip("x")
+    try:
+        speed = float(raw_speed) or None
+    except ValueError:
+        pass
+
+    return FfmpegProgress(out_time=out_time, duration=duration, speed=speed, done=fields.get("progress") == "end")
+
+
+class FfmpegRunner:
+    """
+    Runs ffmpeg as an asyncio subprocess: `-progress` output is parsed into FfmpegProgress
+    events, stderr is streamed to the log line by line (only the tail is kept for errors),
+    a timeout is enforced and the process is killed when its job is cancelled.
+    """
+
+    STDERR_TAIL_LINES = 50
+    OUTPUT_CHUNK_BYTES = 256 * 1024
+
+    def __init__(self, timeout_seconds: Optional[float] = None, cancel_poll_seconds: float = 0.2):
+        self.timeout_seconds = timeout_seconds
+        self.cancel_poll_seconds = cancel_poll_seconds
+
+    async def run(self,
+                  cmd: List[str],
+                  duration: Optional[float] = None,
+                  on_progress: Optional[Callable[[FfmpegProgress], None]] = None,
+                  cancel_event: Optional[threading.Event] = None,
+                  timeout_seconds: Optional[float] = None,
+                  on_output: Optional[Callable[[bytes], None]] = None) -> int:
+        """
+        Run a compiled ffmpeg command (as returned by ffmpeg-python's `.compile()`).
+        on_output: receives what the command writes to stdout (an output to "pipe:"), chunk by
+        chunk as it is produced; the progress reports then come over a pipe of their own.
+        Raises ffmpeg.Error on a non-zero exit, TimeoutError on timeout and
+        JobCancelledError when cancel_event is set while the process runs.
+        """
+        progress_read, progress_write = os.pipe() if on_output is not None else (None, None)
+        progress_target = f"pipe:{progress_write}" if on_output is not None else "pipe:1"
+        args = [cmd[0], "-hide_banner", "-nostats", "-progress", progress_target] + list(cmd[1:])
+        timeout = timeout_seconds if timeout_seconds is not None else self.timeout_seconds
+
+        logger.info(f"Running: {' '.join(args)}")
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *args,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                pass_fds=(progress_write,) if on_output is not None else ()
+            )
+        except BaseException:
+            if on_output is not None:
+                os.close(progress_read)
+            raise
+        finally:
+            if on_output is not None:
+                # the child holds its end now, EOF comes when it exits
+                os.close(progress_write)
+
+        progress_transport = None
+        if on_output is not None:
+            progress_stream, progress_transport = await self._open_pipe(progress_read)
+            streams = [
+                self._read_progress(progress_stream, duration, on_progress),
+                self._read_output(process.stdout, on_output),
+            ]
+        else:
+            streams = [self._read_progress(process.stdout, duration, on_progress)]
+
+        stderr_tail = deque(maxlen=self.STDERR_TAIL_LINES)
+        readers = asyncio.gather(*streams, self._read_stderr(process.stderr, stderr_tail))
+        watcher = asyncio.ensure_future(self._watch_cancellation(cancel_event))
+        waiter = asyncio.ensure_future(process.wait())
+
+        try:
+            done, _ = await asyncio.wait({waiter, watcher}, timeout=timeout or None, return_when=asyncio.FIRST_COMPLETED)
+
+            if waiter not in done:
+                await self._kill(process)
+                if watcher in done:
+                    raise JobCancelledError("ffmpeg was stopped because its job was cancelled")
+                raise TimeoutError(f"ffmpeg did not finish within {timeout}s")
+
+            await readers
+        except asyncio.CancelledError:
+            # the awaiting task itself was cancelled, do not leave ffmpeg running
+            await self._kill(process)
+            raise
+        finally:
+            watcher.cancel()
+            if not readers.done():
+                readers.cancel()
+            if progress_transport is not None:
+                progress_transport.close()
+
+        if process.returncode != 0:
+            stderr = "\n".join(stderr_tail).encode("utf-8")
+            raise ffmpeg.Error(cmd[0], b"", stderr)
+
+        return process.returncode
+
+    def run_blocking(self, cmd: List[str], **kwargs) -> int:
+        """Run from a worker thread (or a process without an event loop) on a private event loop."""
+        return asyncio.run(self.run(cmd, **kwargs))
+
+    @staticmethod
+    async def _open_pipe(fd: int):
+        loop = asyncio.get_running_loop()
+        stream = asyncio.StreamReader()
+        transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(stream), os.fdopen(fd, "rb", buffering=0)
+        )
+        return stream, transport
+
+    async def _read_output(self, stream, on_output):
+        while True:
+            chunk = await stream.read(self.OUTPUT_CHUNK_BYTES)
+            if not chunk:
+                return
+            on_output(chunk)
+
+    async def _read_progress(self, stream, duration, on_progress):
+        fields: Dict[str, str] = {}
+        async for raw_line in stream:
+            line = raw_line.decode("utf-8", errors="ignore").strip()
+            if "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            fields[key] = value
+            # every block ends with progress=continue|end
+            if key == "progress":
+                if on_progress is not None:
+                    try:
+                        on_progress(parse_progress_block(fields, duration))
+                    except Exception as e:
+                        logger.error(f"ffmpeg progress callback failed: {e}")
+                fields = {}
+
+    async def _read_stderr(self, stream, tail: deque):
+        async for raw_line in stream:
+            line = raw_line.decode("utf-8", errors="ignore").rstrip()
+            if line:
+                tail.append(line)
+                logger.info(f"ffmpeg: {line}")
+
+    async def _watch_cancellation(self, cancel_event: Optional[threading.Event]):
+        if cancel_event is None:
+            # nothing to watch: never completes, cancelled once ffmpeg exits
+            await asyncio.Event().wait()
+        while not cancel_event.is_set():
+            await asyncio.sleep(self.cancel_poll_seconds)
+
+    async def _kill(self, process):
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        logger.warning(f"ffmpeg process {process.pid} was killed")
+
+
+class ProgressLogger:
+    """on_progress callback that logs every `step` percent and remembers the last event per key."""
+
+    def __init__(self, step: float = 10.0):
+        self.step = step
+        self.latest: Dict[str, FfmpegProgress] = {}
+        self._logged: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def callback(self, key: str, label: str) -> Callable[[FfmpegProgress], None]:
+        def on_progress(progress: FfmpegProgress):
+            with self._lock:
+                self.latest[key] = progress
+                percent = progress.percent
+                last = self._logged.get(key, -self.step)
+                if percent is None or percent - last < self.step and not progress.done:
+                    return
+                self._logged[key] = percent
+            logger.info(f"{label}: {percent:.0f}% (eta {progress.eta_seconds}s, speed {progress.speed}x)")
+        return on_progress
+
+    def clear(self, key: str):
+        with self._lock:
+            self.latest.pop(key, None)
+            self._logged.pop(key, None)
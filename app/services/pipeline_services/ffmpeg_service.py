@@ -1,19 +1,107 @@
 import ffmpeg
 import logging
-from typing import Dict, List
+import numpy as np
+import threading
+from typing import Dict, List, Optional
 from app.models.audio import Audio
 from app.models.transcription_job import TranscriptionJob
 from app.models.transcription import Transcription
 from app.services.model_services.transcription_job_services import TranscriptionJobServices
+from app.services.pipeline_services.ffmpeg_runner import FfmpegRunner, ProgressLogger
+from app.services.pipeline_services.job_cancellation import CancellationRegistry
+from app.services.pipeline_services.artifact_store import ArtifactStore, discard_job_artifact
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+class PcmBuffer:
+    """f32le samples written by ffmpeg, gathered chunk by chunk into one array sized from the expected duration"""
+
+    def __init__(self, expected_samples : int = 0):
+        self._array = np.empty(max(expected_samples , 1 << 16) , dtype=np.float32)
+        self._size = 0
+        # the bytes of a sample split across two chunks
+        self._pending = b""
+
+    def write(self , data : bytes):
+        if self._pending : 
+            data = self._pending + data
+        usable = len(data) - len(data) % 4
+        self._pending = data[usable:]
+        samples = np.frombuffer(data , dtype=np.float32 , count=usable // 4)
+
+        end = self._size + samples.size
+        if end > self._array.size : 
+            grown = np.empty(max(end , 2 * self._array.size) , dtype=np.float32)
+            grown[:self._size] = self._array[:self._size]
+            self._array = grown
+        self._array[self._size:end] = samples
+        self._size = end
+
+    def array(self) -> np.ndarray : 
+        return self._array[:self._size]
+
+
 class FfmpegUtils:
-    def __init__(self, job_service: TranscriptionJobServices):
+    def __init__(self, job_service: TranscriptionJobServices ,
+                 runner: Optional[FfmpegRunner] = None ,
+                 cancellation: Optional[CancellationRegistry] = None ,
+                 store: Optional[ArtifactStore] = None):
         self.job_service = job_service
+        self.runner = runner or FfmpegRunner()
+        self.cancellation = cancellation or CancellationRegistry()
+        # outputs are written to output_dir, then moved into the store by content
+        self.store = store or ArtifactStore()
+        self.progress = ProgressLogger()
         
     
+    def register_job(self , job : TranscriptionJob) -> TranscriptionJob : 
+
+        # add english to the target languages if it is not the main language (for summarization) 
+        if "english" not in job.target_languages : 
+            job.target_languages.append("english")
+
+        # save the input job to the database (re-registration of a known job only updates it) :
+        if self.job_service.find_one_by_field(field_name="job_id" , value=job.id) is None : 
+            self.job_service.create(entity=job)
+        else : 
+            self.job_service.update_by_field(field_name="job_id" , value=job.id , entity=job)
+
+        return job
+
+    def decode_audio(self , media_path : str , sampling_rate : int = 16000 ,
+                     job : Optional[TranscriptionJob] = None) -> np.ndarray : 
+        """
+        Decode the first audio stream straight into a mono float32 array, without an intermediate file.
+        Runs like the extractions (timeout, progress, killed when the job is cancelled), the samples
+        read from the pipe as ffmpeg produces them.
+        """
+        logger.info(f"Decoding audio of {media_path} to {sampling_rate} Hz mono")
+        expected_duration = job.media_info.duration if job is not None and job.media_info else None
+        buffer = PcmBuffer(expected_samples=int((expected_duration or 0) * sampling_rate))
+
+        cmd = (
+            ffmpeg
+            .input(media_path)
+            .output('pipe:' , format='f32le' , acodec='pcm_f32le' , ac=1 , ar=sampling_rate , map='0:a:0')
+            .compile()
+        )
+        try : 
+            self.runner.run_blocking(
+                cmd , 
+                duration=expected_duration , 
+                on_progress=self.progress.callback(job.id , f"Audio decoding for job {job.id}") if job is not None else None , 
+                cancel_event=self.cancellation.event(job.id) if job is not None else None , 
+                on_output=buffer.write
+            )
+        except ffmpeg.Error as e : 
+            logger.error("Error during decoding: %s", e)
+            logger.error("FFmpeg stderr:\n %s", e.stderr.decode('utf-8', errors='ignore'))
+            raise
+
+        return buffer.array()
+
     def extract_audio(self, job : TranscriptionJob , output_dir: str,
                   start: str = "00:00:00" ,
                   duration: str = None,
@@ -23,26 +111,60 @@ class FfmpegUtils:
 
         logger.info("audio extraction is starting")
 
-        # add english to the target languages if it is not the main language (for summarization) 
-        if "english" not in job.target_languages : 
-            job.target_languages.append("english")
-
-        # save the input job to the database :
-        self.job_service.create(entity=job)
-
-
         audio = Audio(
             job_id=job.id , 
             audio_filepath= None, 
             language=job.input_language
         )
 
-        audio.audio_filepath = output_dir + f"/{audio.id}.{audio_format}"
+        output_path = output_dir + f"/{audio.id}.{audio_format}"
+
+        self.extract_segment(
+            media_path=self.store.local_path(job.video_storage_path) , 
+            output_path=output_path , 
+            start=start , 
+            duration=duration , 
+            bitrate=bitrate , 
+            sampling_rate=sampling_rate , 
+            audio_format=audio_format , 
+            runner=self.runner , 
+            expected_duration=job.media_info.duration if job.media_info and not duration else None , 
+            on_progress=self.progress.callback(job.id , f"Audio extraction for job {job.id}") , 
+            cancel_event=self.cancellation.event(job.id)
+        )
+
+        # keep the extracted audio on the job so it can be reprocessed without re-extraction
+        with self.store.storing(output_path , kind="audios") as audio_key:
+            job.audio_path = audio_key
+            audio.audio_filepath = self.store.local_path(job.audio_path)
+            self.job_service.update_by_field(field_name="job_id" , value=job.id , entity=job)
+
+        logger.info(f"Audio extraction was successful : {audio}")
+
+        return audio
+
+    @staticmethod
+    def extract_segment(media_path : str , output_path : str ,
+                        start = "00:00:00" ,
+                        duration = None ,
+                        bitrate : str = "192k" ,
+                        sampling_rate : int = 16000 ,
+                        audio_format : str = 'wav' ,
+                        runner : Optional[FfmpegRunner] = None ,
+                        expected_duration : Optional[float] = None ,
+                        on_progress = None ,
+                        cancel_event : Optional[threading.Event] = None) -> str : 
+        """Extract the first audio stream (or a start/duration time range of it) to a file, without touching the database"""
+        runner = runner or FfmpegRunner()
+
+        # progress is reported against the requested range, or the whole media if known
+        if duration and not isinstance(duration , str) : 
+            expected_duration = float(duration)
 
         try:
 
             # input stream
-            stream = ffmpeg.input(job.video_storage_path , ss = start) 
+            stream = ffmpeg.input(media_path , ss = start) 
 
             # output options : 
             output_kwargs = {
@@ -56,16 +178,16 @@ class FfmpegUtils:
             if duration : 
                 output_kwargs['t'] = duration
             
-            (
+            cmd = (
                 stream
-                .output(audio.audio_filepath , **output_kwargs) 
+                .output(output_path , **output_kwargs) 
                 .overwrite_output()
-                .run(quiet = False , capture_stdout=True , capture_stderr = True)
+                .compile()
             )
 
-            logger.info(f"Audio extraction was successful : {audio}")
+            runner.run_blocking(cmd , duration=expected_duration , on_progress=on_progress , cancel_event=cancel_event)
 
-            return audio
+            return output_path
 
         except ffmpeg.Error as e:
             logger.error("Error during extraction: %s", e)
@@ -99,11 +221,11 @@ class FfmpegUtils:
             raise ValueError(f"Job with ID {job_id} not found")
 
         # extract the path where the video is stored:
-        video_path = job.video_storage_path
-        
-        if not video_path:
+        if not job.video_storage_path:
             raise ValueError(f"Video storage path is None for job {job_id}")
 
+        video_path = self.store.local_path(job.video_storage_path)
+
         # extract the  paths as dictionary:
         vtt_paths = {}
 
@@ -114,7 +236,7 @@ class FfmpegUtils:
             if not transcription.target_language:
                 raise ValueError(f"Target language is None for transcription with job_id {transcription.job_id}")
                 
-            vtt_paths[transcription.target_language] = transcription.filepath
+            vtt_paths[transcription.target_language] = self.store.local_path(transcription.filepath)
         
         try:
             logger.info(f"Muxing process for video: {video_path} is starting ...")
@@ -144,23 +266,32 @@ class FfmpegUtils:
             
             output_path = f"{output_dir}/video_subtitled_{job_id}.mkv"
 
-            job.processed_video_path = output_path
-            
             # Build output with all inputs and metadata
             out = ffmpeg.output(*inputs, output_path, **output_kwargs)
             out = out.global_args(*map_args)
             out = out.overwrite_output()
-            out.run(quiet=False)
-            
-            logger.info(f"Muxing completed successfully, output saved to: {output_path}")
-            job.processed = True
-            
-
-            self.job_service.update_by_field(
-                field_name="job_id",
-                value=job_id,
-                entity=job
+            self.runner.run_blocking(
+                out.compile() , 
+                duration=job.media_info.duration if job.media_info else None , 
+                on_progress=self.progress.callback(job_id , f"Subtitle muxing for job {job_id}") , 
+                cancel_event=self.cancellation.event(job_id)
             )
+            
+            previous_path = job.processed_video_path
+            with self.store.storing(output_path , kind="processed_videos") as video_key:
+                job.processed_video_path = video_key
+                logger.info(f"Muxing completed successfully, output saved to: {job.processed_video_path}")
+                job.processed = True
+
+                self.job_service.update_by_field(
+                    field_name="job_id",
+                    value=job_id,
+                    entity=job
+                )
+
+            # a remux with other tracks has another key, the previous one is no longer this job's
+            if previous_path and previous_path != job.processed_video_path : 
+                discard_job_artifact(self.store , self.job_service , "processed_video_path" , previous_path , job_id)
 
             return job
 
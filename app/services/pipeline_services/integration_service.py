@@ -1,14 +1,25 @@
 from app.services.pipeline_services.audio_service import AudioUtils 
 from app.services.pipeline_services.ffmpeg_service import FfmpegUtils
-from app.services.pipeline_services.subtitle_formatter_service import SubtitleWriter
-from app.services.pipeline_services.transcription_service import  ASRModel 
+from app.services.pipeline_services.media_inspection_service import MediaInspector
+from app.services.pipeline_services.sharding_service import ShardedTranscriber
+from app.services.pipeline_services.job_cancellation import CancellationRegistry, JobCancelledError
+from app.services.pipeline_services.subtitle_formatter_service import SubtitleWriter, validate_cues
+from app.services.pipeline_services.subtitle_renderer import SubtitleRenderer
+from app.services.pipeline_services.transcription_service import  ASRModel , AUTO_LANGUAGE
+from app.services.pipeline_services.asr_batching_service import ASRBatchingServer
 from app.services.pipeline_services.translation_service import TranslationModel
 from app.services.pipeline_services.summarization_service import SummarizationModel
+from app.services.pipeline_services.retention_service import RetentionService
+from app.services.pipeline_services.artifact_store import ArtifactStore, discard_job_artifact
 from app.models.transcription import Transcription 
 from app.models.transcription_job import TranscriptionJob
 from app.models.audio import Audio
-from typing import List
+from app.services.model_services.astract_services import AbstractServices
+from typing import Callable, Dict, List, Optional, Union
+import numpy as np
 import logging
+import os
+import socket
 from app.config.app_config import AppConfig
 
 logging.basicConfig(level=logging.INFO) 
@@ -16,62 +27,193 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def current_worker() -> str:
+    """The "<host>:<pid>" recorded on the jobs this server process queues or runs."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _worker_alive(worker: Optional[str]) -> bool:
+    """Whether the process recorded on a job may still be running it (processes of other hosts are assumed alive)."""
+    if not worker:
+        return False
+    host, _, pid = worker.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit() or os.name != "posix":
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OverflowError):
+        return True
+    return True
+
 
 
 class IntegrationService:
+
+    # progress reported when each pipeline stage starts, weighted by its share of the work
+    STAGES = {
+        "queued": 0.0,
+        "inspecting": 0.0,
+        "extracting": 0.02,
+        "transcribing": 0.05,
+        "translating": 0.6,
+        "writing": 0.8,
+        "muxing": 0.82,
+        "summarizing": 0.9,
+        "done": 1.0,
+        "failed": 1.0,
+        "cancelled": None,  # keeps the progress reached before the cancellation
+    }
+
+    TERMINAL_STAGES = ("done", "failed", "cancelled")
+
     def __init__(
         self,
         ffmpeg: FfmpegUtils,
+        media_inspector: MediaInspector,
         audio_utils: AudioUtils,
-        asr_model: ASRModel,
+        asr_model: Union[ASRModel, ASRBatchingServer],
+        sharded_transcriber: ShardedTranscriber,
         translator: TranslationModel,
         writer: SubtitleWriter, 
         summarization_model: SummarizationModel,
-        app_config: AppConfig
+        job_services: AbstractServices[TranscriptionJob],
+        transcription_services: AbstractServices[Transcription],
+        app_config: AppConfig,
+        cancellation: CancellationRegistry,
+        subtitle_renderer: SubtitleRenderer,
+        retention: Optional[RetentionService] = None,
+        store: Optional[ArtifactStore] = None
     ):
         self.ffmpeg = ffmpeg
+        self.media_inspector = media_inspector
         self.audio_utils = audio_utils
         self.asr_model = asr_model
+        self.sharded_transcriber = sharded_transcriber
         self.translator = translator
         self.writer = writer
         self.summarization_model = summarization_model
+        self.job_services = job_services
+        self.transcription_services = transcription_services
         self.app_config: AppConfig = app_config
+        self.cancellation = cancellation
+        self.subtitle_renderer = subtitle_renderer
+        self.retention = retention
+        # job records hold artifact keys, ffmpeg and ffprobe are given their local paths
+        self.store = store or ArtifactStore()
 
     
 
     def process(self, job: TranscriptionJob, asr_model_size: str) -> TranscriptionJob: 
+        """Submit a job and run its pipeline right away, in the calling thread."""
+        return self.execute(self.submit(job, asr_model_size))
 
-        # audio extraction: 
-        extracted_audio: Audio = self.ffmpeg.extract_audio(
-            job=job, 
-            output_dir=self.app_config.AUDIOS_DIR
-        )
+    def submit(self, job: TranscriptionJob, asr_model_size: str) -> TranscriptionJob:
+        """
+        Inspect the upload and record the job as queued, registered for cancellation, so its id
+        can be handed out before the pipeline runs (see execute). Unusable media raises
+        UnusableMediaError and nothing is recorded.
+        """
+        job.asr_model_size = asr_model_size
 
-        # preprocessing (if needed) 
-        extracted_audio = self.audio_utils.load_resample_audio(audio=extracted_audio)
+        # inspect the upload once, unusable media is rejected before any work is done:
+        job.stage = "inspecting"
+        media_info = self.media_inspector.inspect(self.store.local_path(job.video_storage_path))
+        job.media_info = media_info
+        job.audio_only = not media_info.has_video
+        job.estimated_seconds = self.media_inspector.estimate_processing_seconds(media_info, asr_model_size)
 
-        # speech recognition: 
-        transcription: Transcription = self.asr_model.transcribe(
-            audio=extracted_audio, 
-            model_size=asr_model_size, 
-            translate_to_eng=False
-        )
+        job.stage = "queued"
+        job.worker = current_worker()
+        self.ffmpeg.register_job(job)
+        self.cancellation.register(job.id)
+        return job
+
+    def recover_jobs(self) -> List[TranscriptionJob]:
+        """
+        Settle the jobs a stopped server process left behind, called at startup: its queued jobs are
+        claimed and returned to be queued again, the ones it was running are marked failed. Jobs of
+        a process that is still running (another worker) are left alone.
+        """
+        requeued = []
+        for job in self.job_services.find_all():
+            if job.stage in self.TERMINAL_STAGES or _worker_alive(job.worker):
+                continue
+            if job.stage == "queued" and job.media_info is not None and job.asr_model_size:
+                job.worker = current_worker()
+                self.job_services.update_by_field(field_name="job_id", value=job.id, entity=job)
+                self.cancellation.register(job.id)
+                requeued.append(job)
+            else:
+                logger.warning(f"Job {job.id} was interrupted during {job.stage}, marking it failed")
+                self._set_stage(job, "failed")
+        if requeued:
+            logger.info(f"Queued {len(requeued)} job(s) again after a restart")
+        return requeued
+
+    def execute(self, job: TranscriptionJob) -> TranscriptionJob:
+        """Run the pipeline of a submitted job, its stage and progress are recorded as it goes."""
+        asr_model_size = job.asr_model_size
+        try:
+            # cancelled while it was queued
+            self.cancellation.check(job.id)
+            return self._run(job, asr_model_size)
+        except JobCancelledError:
+            logger.info(f"Job {job.id} was cancelled during {job.stage}")
+            self._set_stage(job, "cancelled")
+            raise
+        except Exception:
+            self._set_stage(job, "failed")
+            raise
+        finally:
+            self.cancellation.release(job.id)
+            self.ffmpeg.progress.clear(job.id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Ask a running job to stop: the running ffmpeg process is killed, other stages stop at the next stage boundary."""
+        return self.cancellation.cancel(job_id)
+
+    def _run(self, job: TranscriptionJob, asr_model_size: str) -> TranscriptionJob:
+
+        if self.sharded_transcriber.should_shard(job.media_info.duration):
+            # long-form media: worker processes extract and transcribe time shards in parallel
+            if job.audio_only:
+                job.audio_path = job.video_storage_path
+            self._set_stage(job, "transcribing")
+            transcription: Transcription = self.sharded_transcriber.transcribe(
+                job=job,
+                duration=job.media_info.duration,
+                model_size=asr_model_size,
+                media_path=self.store.local_path(job.video_storage_path)
+            )
+        else:
+            transcription: Transcription = self._transcribe(job, asr_model_size)
+            self._release_audio(job)
+
+        # persist the language Whisper identified so translation/summaries and the response use it
+        if job.input_language == AUTO_LANGUAGE:
+            job.input_language = transcription.input_language
+            logger.info(f"Detected input language for job {job.id}: {job.input_language}")
+            self.job_services.update_by_field(field_name="job_id", value=job.id, entity=job)
 
         # translation: 
+        self._set_stage(job, "translating")
         transcriptions: List[Transcription] = self.translator.translate_transcription_to_multiple_languages(transcription=transcription)
 
         # subtitle formatting: 
+        self._set_stage(job, "writing")
         transcriptions: List[Transcription] = self.writer.batch_save(
             transcription_list=transcriptions, 
             output_dir=self.app_config.TRANSCRIPTIONS_DIR)
 
-        # subtitle muxing: 
-        job: TranscriptionJob = self.ffmpeg.mux_subtitles(
-            transcriptions_list=transcriptions, 
-            output_dir=self.app_config.PROCESSED_VID_DIR
-        )
+        # subtitle muxing (video uploads in mux delivery mode only): 
+        if not job.audio_only and job.delivery_mode != "sidecar":
+            self._set_stage(job, "muxing")
+        job = self._deliver(job, transcriptions)
 
         # Summarization of the video: 
+        self._set_stage(job, "summarizing")
         try:
             job = self.summarization_model.summarize(job)
             logger.info(f"Successfully generated summaries for job {job.id}")
@@ -79,10 +221,322 @@ class IntegrationService:
             logger.error(f"Failed to generate summaries for job {job.id}: {e}")
             # Continue processing even if summarization fails
 
+        self._set_stage(job, "done")
         return job
 
+    def _transcribe(self, job: TranscriptionJob, asr_model_size: str) -> Transcription:
+        """Get the job's audio as 16 kHz samples and run speech recognition on it in one piece."""
+
+        if job.audio_only:
+            # audio-only upload: decode it directly, no extraction and no muxing
+            logger.info(f"Job {job.id} is audio-only, skipping extraction")
+            job.audio_path = job.video_storage_path
+            extracted_audio = self._load_upload_audio(job)
+        else:
+            # audio extraction: 
+            self._set_stage(job, "extracting")
+            extracted_audio: Audio = self.ffmpeg.extract_audio(
+                job=job, 
+                output_dir=self.app_config.AUDIOS_DIR
+            )
+
+            # preprocessing (if needed) 
+            extracted_audio = self.audio_utils.load_resample_audio(audio=extracted_audio)
+
+        # speech recognition: 
+        self._set_stage(job, "transcribing")
+        transcription: Transcription = self.asr_model.transcribe(
+            audio=extracted_audio, 
+            model_size=asr_model_size, 
+            translate_to_eng=False
+        )
+
+        return transcription
+
+    def add_languages(self, job_id: str, target_languages: List[str]) -> TranscriptionJob:
+        """
+        Add subtitle languages to a finished job without re-running extraction or ASR:
+        translate the stored source transcription into the new languages only, write their
+        VTTs, remux all tracks and add summaries for the new languages.
+        """
+        job: TranscriptionJob = self.job_services.find_one_by_field(field_name="job_id", value=job_id)
+
+        if job is None:
+            raise ValueError(f"Job with ID {job_id} not found")
+
+        transcriptions: List[Transcription] = self._current_transcriptions(job)
+
+        # the source transcription is the one that was never translated
+        source = next(
+            (t for t in transcriptions if t.target_language and t.target_language.lower() == t.input_language.lower()),
+            None
+        )
+
+        if source is None:
+            raise ValueError(f"No source transcription stored for job {job_id}")
+
+        existing_languages = {t.target_language.lower() for t in transcriptions if t.target_language}
+        new_languages = [
+            lang for lang in dict.fromkeys(target_languages)
+            if lang and lang.lower() not in existing_languages
+        ]
+
+        if not new_languages:
+            logger.info(f"Job {job_id} already has subtitles for {target_languages}")
+            return job
+
+        logger.info(f"Adding languages {new_languages} to job {job_id}")
+
+        def add(job: TranscriptionJob) -> TranscriptionJob:
+            # translation of the new languages only:
+            new_transcriptions: List[Transcription] = self.translator.translate_to_additional_languages(
+                transcription=source,
+                target_languages=new_languages
+            )
 
-        
-        
+            # subtitle formatting:
+            self._set_stage(job, "writing")
+            new_transcriptions = self.writer.batch_save(
+                transcription_list=new_transcriptions,
+                output_dir=self.app_config.TRANSCRIPTIONS_DIR
+            )
+
+            job.target_languages = list(job.target_languages) + [
+                t.target_language for t in new_transcriptions if t is not None
+            ]
+            self.job_services.update_by_field(field_name="job_id", value=job.id, entity=job)
+
+            # remux with the existing and the new subtitle tracks:
+            if not job.audio_only and job.delivery_mode != "sidecar":
+                self._set_stage(job, "muxing")
+            job = self._deliver(job, transcriptions + new_transcriptions)
+
+            self._set_stage(job, "summarizing")
+            try:
+                job = self.summarization_model.summarize_languages(job, new_languages)
+                logger.info(f"Successfully added summaries for job {job.id}")
+            except Exception as e:
+                logger.error(f"Failed to add summaries for job {job.id}: {e}")
+            return job
+
+        return self._run_operation(job, "translating", add)
+
+    def reprocess(self, job_id: str, asr_model_size: str) -> TranscriptionJob:
+        """
+        Re-run ASR for an existing job with another Whisper size, reusing its extracted audio.
+        Results are stored as a new job version; previous versions' transcriptions, subtitle files
+        and summaries stay available. The subtitled MKV is not versioned: it is remuxed with the new
+        tracks and the previous one is discarded. Translations are only redone for chunks whose
+        source text changed.
+        """
+        job: TranscriptionJob = self.job_services.find_one_by_field(field_name="job_id", value=job_id)
+
+        if job is None:
+            raise ValueError(f"Job with ID {job_id} not found")
+
+        previous: List[Transcription] = self._current_transcriptions(job)
+        previous_source = next(
+            (t for t in previous if t.target_language and t.target_language.lower() == t.input_language.lower()),
+            None
+        )
+
+        # reuse the stored audio, re-extract only if it is gone:
+        reusable_audio = self.store.exists(job.audio_path)
+        if (job.audio_only or not reusable_audio) and not self._upload_exists(job):
+            raise ValueError(f"The upload of job {job_id} was deleted, it cannot be reprocessed")
+
+        def rerun(job: TranscriptionJob) -> TranscriptionJob:
+            if job.audio_only:
+                audio = self._load_upload_audio(job)
+            elif reusable_audio:
+                logger.info(f"Reusing extracted audio {job.audio_path} for job {job.id}")
+                audio = Audio(job_id=job.id, audio_filepath=self.store.local_path(job.audio_path), language=job.input_language)
+                audio = self.audio_utils.load_resample_audio(audio=audio)
+            else:
+                logger.info(f"Extracted audio missing for job {job.id}, extracting again")
+                audio = self.ffmpeg.extract_audio(job=job, output_dir=self.app_config.AUDIOS_DIR)
+                audio = self.audio_utils.load_resample_audio(audio=audio)
+
+            # speech recognition only:
+            self._set_stage(job, "transcribing")
+            transcription: Transcription = self.asr_model.transcribe(
+                audio=audio,
+                model_size=asr_model_size,
+                translate_to_eng=False
+            )
+            self._release_audio(job)
+
+            if previous_source is not None and \
+                    transcription.original_text == previous_source.original_text and \
+                    self._same_cues(transcription.original_chunks, previous_source.original_chunks):
+                logger.info(f"ASR output with '{asr_model_size}' is unchanged for job {job.id}, keeping version {job.version}")
+                job.asr_model_size = asr_model_size
+                return job
+
+            job.version += 1
+            job.asr_model_size = asr_model_size
+            transcription.version = job.version
+            logger.info(f"Reprocessing job {job.id} as version {job.version} with model '{asr_model_size}'")
+
+            # translation, reusing unchanged chunk translations of the previous version:
+            self._set_stage(job, "translating")
+            transcriptions: List[Transcription] = self.translator.retranslate_transcription(
+                transcription=transcription,
+                previous=previous,
+                target_languages=job.target_languages
+            )
+
+            # subtitle formatting (new files, the previous version's VTTs are kept):
+            self._set_stage(job, "writing")
+            transcriptions = self.writer.batch_save(
+                transcription_list=transcriptions,
+                output_dir=self.app_config.TRANSCRIPTIONS_DIR
+            )
+
+            # subtitle muxing:
+            if not job.audio_only and job.delivery_mode != "sidecar":
+                self._set_stage(job, "muxing")
+            job = self._deliver(job, transcriptions)
+
+            self._set_stage(job, "summarizing")
+            try:
+                job = self.summarization_model.summarize(job)
+                logger.info(f"Successfully generated summaries for job {job.id} version {job.version}")
+            except Exception as e:
+                logger.error(f"Failed to generate summaries for job {job.id}: {e}")
+            return job
+
+        # a missing extraction is redone first, otherwise the stored audio is read for ASR
+        return self._run_operation(job, "extracting" if not (job.audio_only or reusable_audio) else "transcribing", rerun)
+
+    @staticmethod
+    def _same_cues(chunks: List[Dict], other_chunks: List[Dict]) -> bool:
+        """
+        Whether two chunk lists give the same subtitles. Fresh ASR chunks carry tuple timestamps,
+        stored ones come back with lists (and millisecond precision from the chunk store), so the
+        validated cues are compared, to the millisecond the subtitle files are written with.
+        """
+        times, texts = validate_cues(chunks)
+        other_times, other_texts = validate_cues(other_chunks)
+        return texts == other_texts and times.shape == other_times.shape and \
+            np.array_equal(np.rint(times * 1000), np.rint(other_times * 1000))
+
+    def _load_upload_audio(self, job: TranscriptionJob) -> AudioUtils:
+        """Load an audio-only upload as 16 kHz mono samples without writing an intermediate file."""
+        media_path = self.store.local_path(job.video_storage_path)
+        media_info = job.media_info or self.media_inspector.probe(media_path)
+
+        if media_info.is_pcm_wav(sampling_rate=16000, channels=1):
+            # already in Whisper's input format, read the samples as they are
+            audio = Audio(job_id=job.id, audio_filepath=media_path, language=job.input_language)
+            return self.audio_utils.load_resample_audio(audio=audio)
+
+        array = self.ffmpeg.decode_audio(media_path, sampling_rate=16000, job=job)
+        return self.audio_utils.from_array(
+            array=array,
+            sampling_rate=16000,
+            language=job.input_language,
+            job_id=job.id
+        )
+
+    def _release_audio(self, job: TranscriptionJob):
+        """ASR is done with the extracted audio, let retention delete it."""
+        if self.retention is not None:
+            self.retention.release_audio(job)
+
+    def _upload_exists(self, job: TranscriptionJob) -> bool:
+        return self.store.exists(job.video_storage_path)
+
+    def _set_stage(self, job: TranscriptionJob, stage: str):
+        """Record the running stage and its progress on the job so the status endpoint can report it."""
+        if stage not in self.TERMINAL_STAGES:
+            # stage boundaries are the cancellation points of the in-process stages (ASR, translation, ...)
+            self.cancellation.check(job.id)
+            job.worker = current_worker()
+
+        job.stage = stage
+        if self.STAGES[stage] is not None:
+            job.progress = self.STAGES[stage]
+        logger.info(f"Job {job.id}: {stage} ({job.progress:.0%})")
+        self.job_services.update_by_field(field_name="job_id", value=job.id, entity=job)
+
+    def remux(self, job_id: str) -> TranscriptionJob:
+        """Mux the current subtitle tracks into an MKV on explicit request (sidecar jobs are never remuxed implicitly)."""
+        job: TranscriptionJob = self.job_services.find_one_by_field(field_name="job_id", value=job_id)
+
+        if job is None:
+            raise ValueError(f"Job with ID {job_id} not found")
+        if job.audio_only:
+            raise ValueError(f"Job {job_id} is an audio-only upload, there is no video to mux into")
+        if not self._upload_exists(job):
+            raise ValueError(f"The upload of job {job_id} was deleted, there is no video to mux into")
+
+        transcriptions = [t for t in self._current_transcriptions(job) if t.filepath]
+        if not transcriptions:
+            raise ValueError(f"No subtitle files stored for job {job_id}")
+
+        return self._run_operation(job, "muxing", lambda job: self.ffmpeg.mux_subtitles(
+            transcriptions_list=transcriptions,
+            output_dir=self.app_config.PROCESSED_VID_DIR
+        ))
+
+    def _run_operation(self, job: TranscriptionJob, stage: str,
+                       operation: Callable[[TranscriptionJob], TranscriptionJob]) -> TranscriptionJob:
+        """
+        Run an operation on a settled job (add languages, reprocess, remux) with the job marked as
+        running, from `stage` on: retention never deletes the files of a running job, and checks the
+        stage again right before deleting, so the upload, audio and MKV being read stay in place.
+        The operation is registered for cancellation like a pipeline run: its stage boundaries are
+        cancellation points, and its ffmpeg process is killed.
+        """
+        if self.cancellation.claim(job.id) is None:
+            raise ValueError(f"Job {job.id} is already running ({job.stage})")
+        try:
+            self._set_stage(job, stage)
+            job = operation(job)
+        except JobCancelledError:
+            logger.info(f"Job {job.id} was cancelled during {job.stage}")
+            self._settle(job, "cancelled")
+            raise
+        except Exception:
+            self._settle(job, "failed")
+            raise
+        finally:
+            self.cancellation.release(job.id)
+            self.ffmpeg.progress.clear(job.id)
+        self._set_stage(job, "done")
+        return job
+
+    def _settle(self, job: TranscriptionJob, stage: str):
+        # the operation may have stored new paths on the record since: mark that one
+        job = self.job_services.find_one_by_field(field_name="job_id", value=job.id) or job
+        self._set_stage(job, stage)
+
+    def _deliver(self, job: TranscriptionJob, transcriptions: List[Transcription]) -> TranscriptionJob:
+        """Mux the subtitle tracks into the video, or mark sidecar/audio-only jobs as processed as they are."""
+        transcriptions = [t for t in transcriptions if t is not None]
+
+        # the job's subtitle tracks just changed, drop what was rendered from the old ones
+        self.subtitle_renderer.invalidate_job(job.id)
+
+        if job.audio_only or job.delivery_mode == "sidecar":
+            # a remux made on request before this change no longer has all the tracks
+            if self.store.exists(job.processed_video_path):
+                logger.info(f"Removing outdated remux {job.processed_video_path} of job {job.id}")
+                discard_job_artifact(self.store, self.job_services, "processed_video_path", job.processed_video_path, job.id)
+            job.processed = True
+            job.processed_video_path = ""
+            self.job_services.update_by_field(field_name="job_id", value=job.id, entity=job)
+            logger.info(f"Job {job.id} processed without remux ({'audio-only' if job.audio_only else 'sidecar delivery'})")
+            return job
+
+        return self.ffmpeg.mux_subtitles(
+            transcriptions_list=transcriptions,
+            output_dir=self.app_config.PROCESSED_VID_DIR
+        )
 
-        
\ No newline at end of file
+    def _current_transcriptions(self, job: TranscriptionJob) -> List[Transcription]:
+        return [
+            t for t in self.transcription_services.find_by_field(field_name="job_id", value=job.id)
+            if t.version == job.version
+        ]
@@ -0,0 +1,70 @@
+import threading
+from typing import Dict, Optional
+
+import logging
+
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelledError(Exception):
+    """Raised inside a running pipeline once its job has been cancelled."""
+
+
+class CancellationRegistry:
+    """
+    Cancellation flags of the jobs currently running in this process. The pipeline checks
+    its flag between stages and the ffmpeg runner watches it to kill the running process.
+    """
+
+    def __init__(self):
+        self._events: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def register(self, job_id: str) -> threading.Event:
+        with self._lock:
+            event = self._events.get(job_id)
+            if event is None:
+                event = threading.Event()
+                self._events[job_id] = event
+            return event
+
+    def claim(self, job_id: str) -> Optional[threading.Event]:
+        """Register a job that is not running here yet, None if it already is"""
+        with self._lock:
+            if job_id in self._events:
+                return None
+            event = threading.Event()
+            self._events[job_id] = event
+            return event
+
+    def release(self, job_id: str):
+        with self._lock:
+            self._events.pop(job_id, None)
+
+    def is_running(self, job_id: str) -> bool:
+        with self._lock:
+            return job_id in self._events
+
+    def cancel(self, job_id: str) -> bool:
+        """Flag a running job as cancelled, False if the job is not running here"""
+        with self._lock:
+            event = self._events.get(job_id)
+        if event is None:
+            return False
+        logger.info(f"Cancellation requested for job {job_id}")
+        event.set()
+        return True
+
+    def event(self, job_id: str) -> threading.Event:
+        with self._lock:
+            return self._events.get(job_id)
+
+    def is_cancelled(self, job_id: str) -> bool:
+        event = self.event(job_id)
+        return event is not None and event.is_set()
+
+    def check(self, job_id: str):
+        if self.is_cancelled(job_id):
+            raise JobCancelledError(f"Job {job_id} was cancelled")
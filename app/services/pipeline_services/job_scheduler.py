@@ -0,0 +1,119 @@
+import itertools
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import logging
+
+from app.models.transcription_job import TranscriptionJob
+
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+class _QueuedJob:
+    def __init__(self, job: TranscriptionJob, sequence: int):
+        self.job = job
+        self.sequence = sequence
+        self.enqueued_at = time.monotonic()
+
+
+class JobScheduler:
+    """
+    Runs submitted jobs on max_workers threads, so /process can answer with the job id at once.
+
+    Queued jobs are started shortest first, by the processing time estimated from their duration
+    at inspection: a long upload does not hold up the short ones submitted after it. Waiting
+    counts against the estimate (aging_factor estimated seconds per second queued), so long jobs
+    still start under a steady stream of short ones.
+    """
+
+    def __init__(self, run: Callable[[TranscriptionJob], object], max_workers: int = 2, aging_factor: float = 1.0):
+        self.run = run
+        self.max_workers = max(1, max_workers)
+        self.aging_factor = aging_factor
+
+        self._queue: List[_QueuedJob] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._running: Dict[str, TranscriptionJob] = {}
+        self._stopped = False
+        self._completed = 0
+
+    def submit(self, job: TranscriptionJob):
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("The job scheduler is stopped")
+            self._queue.append(_QueuedJob(job, next(self._sequence)))
+            self._start_workers()
+            self._condition.notify()
+        logger.info(f"Job {job.id} queued (estimated {job.estimated_seconds} s, {len(self._queue)} waiting)")
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """0-based rank of a queued job in the current start order, None when it is not queued"""
+        with self._condition:
+            order = sorted(self._queue, key=self._priority)
+        return next((position for position, queued in enumerate(order) if queued.job.id == job_id), None)
+
+    def stats(self) -> Dict:
+        with self._condition:
+            return {
+                "workers": self.max_workers,
+                "queued": len(self._queue),
+                "running": len(self._running),
+                "completed": self._completed,
+            }
+
+    def start(self):
+        """Take jobs again after stop (workers start with the first job)"""
+        with self._condition:
+            self._stopped = False
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop taking jobs; running jobs finish, queued ones stay queued (their records say so)"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.join(timeout=timeout)
+
+    def _priority(self, queued: _QueuedJob):
+        waited = time.monotonic() - queued.enqueued_at
+        return (queued.job.estimated_seconds or 0.0) - self.aging_factor * waited, queued.sequence
+
+    def _start_workers(self):
+        # under the condition
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._loop, name=f"pipeline-worker-{len(self._workers)}", daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _next(self) -> Optional[TranscriptionJob]:
+        with self._condition:
+            while not self._queue and not self._stopped:
+                self._condition.wait()
+            if self._stopped or threading.current_thread() not in self._workers:
+                # a worker of before stop() that finished its job after a restart
+                return None
+            queued = min(self._queue, key=self._priority)
+            self._queue.remove(queued)
+            self._running[queued.job.id] = queued.job
+            return queued.job
+
+    def _loop(self):
+        while True:
+            job = self._next()
+            if job is None:
+                return
+            try:
+                self.run(job)
+            except Exception as e:
+                # the pipeline records the failure on the job, nobody is waiting for the exception
+                logger.error(f"Job {job.id} ended with {type(e).__name__}: {e}")
+            finally:
+                with self._condition:
+                    self._running.pop(job.id, None)
+                    self._completed += 1
@@ -0,0 +1,68 @@
+import mimetypes
+import os
+from typing import Dict, List, Optional
+
+from transformers.models.whisper.tokenization_whisper import LANGUAGES
+
+from app.models.transcription_job import TranscriptionJob
+
+# "english" -> "en", for the srclang of <track>
+LANGUAGE_CODES: Dict[str, str] = {name: code for code, name in LANGUAGES.items()}
+
+
+class ManifestBuilder:
+    """
+    Describes a sidecar-delivered job without touching the upload: a JSON manifest for web
+    players (<video> + <track>) with the progressive video URL and one WebVTT URL per language.
+    No HLS playlists are offered: the upload is not an HLS segment (those are MPEG-TS or
+    fragmented MP4), and a master without a video variant is not a valid one.
+    """
+
+    def language_code(self, language: str) -> str:
+        return LANGUAGE_CODES.get(language.lower(), language.lower())
+
+    def source_media_type(self, job: TranscriptionJob) -> str:
+        media_type, _ = mimetypes.guess_type(job.video_storage_path)
+        return media_type or "application/octet-stream"
+
+    def source_filename(self, job: TranscriptionJob) -> str:
+        # uploads are stored under their digest, offered to the user under the job's name
+        return f"{job.id}{os.path.splitext(job.video_storage_path)[1]}"
+
+    def build_manifest(self, job: TranscriptionJob, languages: List[str], urls: Dict[str, str]) -> Dict:
+        """
+        languages: target language of each subtitle track.
+        urls: "video" -> source video URL and one "subtitles:<language>" entry per subtitle track.
+        """
+        default_language = self._default_language(job, languages)
+        return {
+            "job_id": job.id,
+            "version": job.version,
+            "delivery_mode": job.delivery_mode,
+            "duration": job.media_info.duration if job.media_info else None,
+            "video": {
+                # the untouched upload, over HTTP range requests
+                "delivery": "progressive",
+                "url": urls["video"],
+                "media_type": self.source_media_type(job),
+                "filename": self.source_filename(job),
+            },
+            "subtitles": [
+                {
+                    "language": language,
+                    "srclang": self.language_code(language),
+                    "label": language.capitalize(),
+                    "format": "vtt",
+                    "url": urls[f"subtitles:{language}"],
+                    "default": language == default_language,
+                }
+                for language in languages
+            ],
+        }
+
+    def _default_language(self, job: TranscriptionJob, languages: List[str]) -> Optional[str]:
+        # the first requested target language that was produced, else the first track
+        for language in job.target_languages:
+            if language in languages:
+                return language
+        return languages[0] if languages else None
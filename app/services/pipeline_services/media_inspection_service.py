@@ -0,0 +1,104 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import ffmpeg
+import logging
+
+from app.models.media_info import MediaInfo
+
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+# rough wall-clock seconds of pipeline work per second of media, by Whisper size
+# (ASR dominates, translation/summaries are folded in)
+REAL_TIME_FACTORS: Dict[str, float] = {
+    "tiny": 0.1,
+    "base": 0.15,
+    "small": 0.3,
+    "medium": 0.7,
+    "large": 1.4,
+}
+
+# fixed cost of model loading, extraction and muxing, independent of the duration
+BASE_OVERHEAD_SECONDS = 10.0
+
+
+class UnusableMediaError(ValueError):
+    """The upload cannot go through the pipeline (unreadable, no audio, no duration, too long)."""
+
+
+class MediaInspector:
+    """
+    Runs ffprobe once per upload and turns the result into a MediaInfo.
+    Results are cached by (path, size, mtime) so the pipeline, reprocessing and
+    the status endpoint never probe the same file twice.
+    """
+
+    def __init__(self, max_duration_seconds: int = 0, cache_size: int = 256):
+        self.max_duration_seconds = max_duration_seconds
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, int, int], MediaInfo]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def inspect(self, media_path: str) -> MediaInfo:
+        """Probe the media (or return the cached result) and reject anything the pipeline cannot use."""
+        media_info = self.probe(media_path)
+        self.validate(media_info, media_path)
+        return media_info
+
+    def probe(self, media_path: str) -> MediaInfo:
+        if not os.path.exists(media_path):
+            raise UnusableMediaError(f"Media file {media_path} does not exist")
+
+        key = self._cache_key(media_path)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        try:
+            probe = ffmpeg.probe(media_path)
+        except ffmpeg.Error as e:
+            stderr = e.stderr.decode('utf-8', errors='ignore') if e.stderr else ""
+            logger.error("FFprobe stderr:\n %s", stderr)
+            raise UnusableMediaError(f"Uploaded file {os.path.basename(media_path)} could not be read as media") from e
+
+        media_info = MediaInfo.from_probe(probe)
+        logger.info(
+            f"Probed {media_path}: {media_info.format_name}, {media_info.duration:.1f}s, "
+            f"audio={media_info.audio_codec}, video={media_info.video_codec}"
+        )
+
+        with self._lock:
+            self._cache[key] = media_info
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return media_info
+
+    def validate(self, media_info: MediaInfo, media_path: str = ""):
+        if not media_info.has_audio:
+            raise UnusableMediaError(f"Uploaded file {os.path.basename(media_path)} has no audio stream to transcribe")
+        if media_info.duration <= 0:
+            raise UnusableMediaError(f"Uploaded file {os.path.basename(media_path)} has no playable duration")
+        if self.max_duration_seconds and media_info.duration > self.max_duration_seconds:
+            raise UnusableMediaError(
+                f"Uploaded file is {media_info.duration:.0f}s long, the limit is {self.max_duration_seconds}s"
+            )
+
+    @staticmethod
+    def estimate_processing_seconds(media_info: Optional[MediaInfo], model_size: Optional[str]) -> Optional[float]:
+        """Expected end-to-end processing time, used for the job's ETA"""
+        if media_info is None or media_info.duration <= 0:
+            return None
+        factor = REAL_TIME_FACTORS.get(model_size or "small", REAL_TIME_FACTORS["small"])
+        return round(BASE_OVERHEAD_SECONDS + media_info.duration * factor, 1)
+
+    def _cache_key(self, media_path: str) -> Tuple[str, int, int]:
+        stat = os.stat(media_path)
+        return (os.path.abspath(media_path), stat.st_size, stat.st_mtime_ns)
@@ -0,0 +1,340 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import logging
+
+from app.models.transcription import Transcription
+from app.models.transcription_job import TranscriptionJob
+from app.repositories.chunk_store import ChunkStore
+from app.services.model_services.astract_services import AbstractServices
+from app.services.pipeline_services.artifact_store import ArtifactStore, discard_job_artifact
+
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+# job stages whose artifacts may be deleted, a running job's files are never touched
+SETTLED_STAGES = ("done", "failed", "cancelled")
+
+
+# job fields pointing at its files, cleared when the file is deleted
+JOB_FILE_FIELDS = ("video_storage_path", "audio_path", "processed_video_path")
+
+
+class ArtifactDirectory:
+    """One directory of job artifacts, with the size it is kept under (0: no quota)."""
+
+    def __init__(self, name: str, path: str, quota_bytes: int = 0):
+        self.name = name
+        self.path = os.path.abspath(path)
+        self.quota_bytes = quota_bytes
+
+
+class _Artifact:
+    def __init__(self, path: str, size_bytes: int, last_used: float, modified: float):
+        self.path = path
+        self.size_bytes = size_bytes
+        self.last_used = last_used
+        self.modified = modified
+        # (job id, transcription id) of every record pointing at the file: identical content is stored once
+        self.owners: List[Tuple[str, Optional[str]]] = []
+        self.evictable = True
+
+    @property
+    def job_id(self) -> Optional[str]:
+        return self.owners[0][0] if self.owners else None
+
+
+class RetentionService:
+    """
+    Deletes job artifacts that are no longer needed, and keeps the records pointing at them
+    consistent (the field is cleared, so endpoints answer 404 and reprocessing re-extracts).
+
+    - release_audio: the WAV extracted for ASR, right after ASR (when delete_audio_after_asr).
+    - run: brings every directory with a quota back under it. Files no record points at go first,
+      then whole jobs' files, least recently used first. Files of running jobs, and files younger
+      than min_age_seconds (uploads and extractions in flight), are never deleted. Subtitle files
+      of a job's current version are kept: sidecar tracks and remuxing read them. With a chunk
+      store, the chunk lists of existing transcriptions are record data and are always kept: only
+      the ones no transcription points at can go.
+
+    With dry_run, run only reports what it would delete. A background thread can call run every
+    interval_seconds; the last report is kept for the API.
+    """
+
+    def __init__(self,
+                 job_services: AbstractServices[TranscriptionJob],
+                 transcription_services: AbstractServices[Transcription],
+                 directories: List[ArtifactDirectory],
+                 delete_audio_after_asr: bool = True,
+                 min_age_seconds: float = 3600.0,
+                 interval_seconds: float = 0.0,
+                 dry_run: bool = False,
+                 store: Optional[ArtifactStore] = None,
+                 chunk_store: Optional[ChunkStore] = None):
+        self.job_services = job_services
+        self.transcription_services = transcription_services
+        self.directories = {directory.name: directory for directory in directories}
+        self.delete_audio_after_asr = delete_audio_after_asr
+        self.min_age_seconds = min_age_seconds
+        self.interval_seconds = interval_seconds
+        self.dry_run = dry_run
+        # records hold artifact keys, the directories are scanned for local paths
+        self.store = store or ArtifactStore()
+        # where the transcriptions' chunk lists are stored, if out of line
+        self.chunk_store = chunk_store
+
+        self.last_report: Optional[Dict] = None
+        self._run_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    # -- stage completion ------------------------------------------------------
+
+    def release_audio(self, job: TranscriptionJob) -> bool:
+        """Delete the audio extracted for a job once ASR is done with it. The upload itself is never deleted here."""
+        audio_dir = self.directories.get("audios")
+        if not self.delete_audio_after_asr or audio_dir is None or not job.audio_path:
+            return False
+        path = os.path.abspath(self.store.local_path(job.audio_path))
+        if job.audio_path == job.video_storage_path or not self._inside(path, audio_dir.path):
+            # audio-only uploads are their own audio
+            return False
+
+        audio_path, job.audio_path = job.audio_path, ""
+        self.job_services.update_by_field(field_name="job_id", value=job.id, entity=job)
+        # the same upload processed twice shares its audio, the last job done with it deletes it
+        if discard_job_artifact(self.store, self.job_services, "audio_path", audio_path, job.id):
+            logger.info(f"Deleted extracted audio {audio_path} of job {job.id} after ASR")
+        return True
+
+    # -- quotas ----------------------------------------------------------------
+
+    def run(self, dry_run: Optional[bool] = None) -> Dict:
+        """Enforce the quotas (or only plan it with dry_run) and return the report"""
+        dry_run = self.dry_run if dry_run is None else dry_run
+        with self._run_lock:
+            report = self._enforce(dry_run)
+        if not dry_run or self.dry_run:
+            # a previewed plan is not a run, unless the service only ever previews
+            self.last_report = report
+        return report
+
+    def _enforce(self, dry_run: bool) -> Dict:
+        now = time.time()
+        jobs = {job.id: job for job in self.job_services.find_all()}
+        transcriptions = self.transcription_services.find_all()
+        owners = self._owners(jobs, transcriptions)
+
+        report = {
+            "dry_run": dry_run,
+            "started_at": datetime.now().isoformat(),
+            "directories": {},
+            "deletions": [],
+            "freed_bytes": 0,
+            "errors": [],
+        }
+
+        for name, directory in self.directories.items():
+            artifacts = self._scan(directory.path)
+            usage = sum(artifact.size_bytes for artifact in artifacts)
+            for artifact in artifacts:
+                references = owners.get(artifact.path, [])
+                artifact.owners = [(job_id, transcription_id) for job_id, transcription_id, _ in references]
+                artifact.evictable = now - artifact.modified >= self.min_age_seconds and all(
+                    not current and (job_id not in jobs or jobs[job_id].stage in SETTLED_STAGES)
+                    for job_id, _, current in references
+                )
+
+            selected = self._select(artifacts, usage - directory.quota_bytes) if directory.quota_bytes else []
+            freed = sum(artifact.size_bytes for artifact in selected)
+            report["directories"][name] = {
+                "path": directory.path,
+                "usage_bytes": usage,
+                "quota_bytes": directory.quota_bytes,
+                "usage_after_bytes": usage - freed,
+            }
+            for artifact in selected:
+                report["deletions"].append({
+                    "path": artifact.path,
+                    "directory": name,
+                    "job_id": artifact.job_id,
+                    "size_bytes": artifact.size_bytes,
+                    "reason": "orphan" if artifact.job_id is None else "quota",
+                })
+            report["freed_bytes"] += freed
+
+            if not dry_run:
+                self._delete(selected, report)
+
+        if report["deletions"]:
+            logger.info(
+                f"Retention {'would free' if dry_run else 'freed'} {report['freed_bytes']} bytes "
+                f"in {len(report['deletions'])} files"
+            )
+        return report
+
+    @staticmethod
+    def _select(artifacts: List[_Artifact], excess_bytes: int) -> List[_Artifact]:
+        """Orphans first, then whole jobs least recently used first, until excess_bytes are freed"""
+        if excess_bytes <= 0:
+            return []
+
+        orphans = sorted((a for a in artifacts if a.evictable and a.job_id is None), key=lambda a: a.last_used)
+        by_job: Dict[str, List[_Artifact]] = {}
+        for artifact in artifacts:
+            if artifact.evictable and artifact.job_id is not None:
+                by_job.setdefault(artifact.job_id, []).append(artifact)
+        jobs = sorted(by_job.values(), key=lambda files: max(a.last_used for a in files))
+
+        selected, freed = [], 0
+        for group in [[orphan] for orphan in orphans] + jobs:
+            if freed >= excess_bytes:
+                break
+            selected.extend(group)
+            freed += sum(artifact.size_bytes for artifact in group)
+        return selected
+
+    def _delete(self, artifacts: List[_Artifact], report: Dict):
+        cleared_jobs: List[str] = []
+        cleared_transcriptions: List[str] = []
+
+        for artifact in artifacts:
+            # a job may have been picked up again (reprocess, remux) since the scan
+            running = [
+                job for job in (
+                    self.job_services.find_one_by_field(field_name="job_id", value=job_id)
+                    for job_id in dict.fromkeys(job_id for job_id, _ in artifact.owners)
+                )
+                if job is not None and job.stage not in SETTLED_STAGES
+            ]
+            if running:
+                report["errors"].append(f"Skipped {artifact.path}: job {running[0].id} is running again")
+                continue
+            try:
+                self._remove(artifact.path)
+            except OSError as e:
+                report["errors"].append(f"Could not delete {artifact.path}: {e}")
+                continue
+
+            for job_id, transcription_id in artifact.owners:
+                if transcription_id is not None:
+                    cleared_transcriptions.append(transcription_id)
+                else:
+                    cleared_jobs.append(job_id)
+
+        for job_id in dict.fromkeys(cleared_jobs):
+            job = self.job_services.find_one_by_field(field_name="job_id", value=job_id)
+            if job is not None and self._clear_job_files(job):
+                self.job_services.update_by_field(field_name="job_id", value=job.id, entity=job)
+
+        for transcription_id in dict.fromkeys(cleared_transcriptions):
+            transcription = self.transcription_services.find_one_by_field(field_name="transcription_id", value=transcription_id)
+            if transcription is not None and transcription.filepath and not self.store.exists(transcription.filepath):
+                transcription.filepath = ""
+                self.transcription_services.update_by_field(
+                    field_name="transcription_id", value=transcription.id, entity=transcription
+                )
+
+    def _clear_job_files(self, job: TranscriptionJob) -> bool:
+        """Clear the job's paths to files that are gone (audio-only uploads are their own audio too)"""
+        cleared = False
+        for field in JOB_FILE_FIELDS:
+            path = getattr(job, field)
+            if path and not self.store.exists(path):
+                setattr(job, field, "")
+                cleared = True
+        return cleared
+
+    def _owners(self, jobs: Dict[str, TranscriptionJob],
+                transcriptions: List[Transcription]) -> Dict[str, List[Tuple[str, Optional[str], bool]]]:
+        """absolute path -> [(job id, transcription id, always kept: current subtitles or chunk lists), ...]"""
+        owners: Dict[str, List[Tuple[str, Optional[str], bool]]] = {}
+        for job in jobs.values():
+            for ref in dict.fromkeys(getattr(job, field) for field in JOB_FILE_FIELDS):
+                if ref:
+                    owners.setdefault(self._local(ref), []).append((job.id, None, False))
+
+        for transcription in transcriptions:
+            if not transcription.filepath:
+                continue
+            job = jobs.get(transcription.job_id)
+            current = job is None or (transcription.version or 1) == job.version
+            path = self._local(transcription.filepath)
+            stem = os.path.splitext(path)[0]
+            # the SRT (and other formats) written next to the VTT belong to the same transcription
+            for path in [path] + [f"{stem}.{ext}" for ext in ("srt",)]:
+                owners.setdefault(path, []).append((transcription.job_id, transcription.id, current))
+
+        if self.chunk_store is not None:
+            for transcription in transcriptions:
+                for language in dict.fromkeys(filter(None, (transcription.input_language, transcription.target_language))):
+                    ref = ChunkStore.make_ref(transcription.job_id, transcription.version or 1, language)
+                    owners.setdefault(os.path.abspath(self.chunk_store.path(ref)), []).append(
+                        (transcription.job_id, transcription.id, True)
+                    )
+        return owners
+
+    def _local(self, ref: str) -> str:
+        return os.path.abspath(self.store.local_path(ref))
+
+    @staticmethod
+    def _scan(root: str) -> List[_Artifact]:
+        artifacts = []
+        for directory, _, files in os.walk(root):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                artifacts.append(_Artifact(
+                    path=os.path.abspath(path),
+                    size_bytes=stat.st_size,
+                    last_used=max(stat.st_atime, stat.st_mtime),
+                    modified=stat.st_mtime
+                ))
+        return artifacts
+
+    @staticmethod
+    def _inside(path: str, root: str) -> bool:
+        return os.path.commonpath([path, root]) == root
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    # -- background task -------------------------------------------------------
+
+    def start(self):
+        """Run every interval_seconds on a daemon thread (nothing to do without an interval or quotas)"""
+        if self.interval_seconds <= 0 or not any(d.quota_bytes for d in self.directories.values()):
+            return
+        with self._start_lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._stopped.clear()
+            self._worker = threading.Thread(target=self._loop, name="retention-worker", daemon=True)
+            self._worker.start()
+            logger.info(f"Retention worker started, every {self.interval_seconds} s{' (dry run)' if self.dry_run else ''}")
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopped.set()
+        if self._worker is not None:
+            self._worker.join(timeout=timeout)
+            self._worker = None
+
+    def _loop(self):
+        while not self._stopped.wait(self.interval_seconds):
+            try:
+                self.run()
+            except Exception as e:
+                logger.error(f"Retention run failed: {e}")
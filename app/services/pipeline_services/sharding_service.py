@@ -0,0 +1,240 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import logging
+
+from app.models.transcription import Transcription
+from app.models.transcription_job import TranscriptionJob
+
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+class Shard:
+    """
+    One time range of a long media file. [start, end) is the part this shard owns in the
+    final transcription, [extract_start, extract_end) is what is actually decoded: it is
+    padded by the overlap so words cut at a boundary are heard whole by one of the shards.
+    """
+
+    def __init__(self, index: int, start: float, end: float, extract_start: float, extract_end: float):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.extract_start = extract_start
+        self.extract_end = extract_end
+
+    @property
+    def extract_duration(self) -> float:
+        return self.extract_end - self.extract_start
+
+    def __repr__(self):
+        return f"Shard({self.index}, {self.start:.1f}-{self.end:.1f}s, decoded {self.extract_start:.1f}-{self.extract_end:.1f}s)"
+
+
+def plan_shards(duration: float, max_shards: int, min_shard_seconds: float, overlap_seconds: float) -> List[Shard]:
+    """Split [0, duration) into at most max_shards equal ranges of at least min_shard_seconds each."""
+    if duration <= 0:
+        return []
+
+    count = max(1, min(max_shards, int(duration // max(min_shard_seconds, 1.0))))
+    length = duration / count
+
+    shards = []
+    for i in range(count):
+        start = i * length
+        end = duration if i == count - 1 else (i + 1) * length
+        shards.append(Shard(
+            index=i,
+            start=start,
+            end=end,
+            extract_start=max(0.0, start - overlap_seconds),
+            extract_end=min(duration, end + overlap_seconds)
+        ))
+    return shards
+
+
+def stitch_shard_chunks(shards: List[Shard], shard_chunks: List[List[Dict]]) -> List[Dict]:
+    """
+    Merge per-shard chunk lists into one timeline. Chunk timestamps are shifted by the shard's
+    decoded start; in the overlap a chunk is kept by the shard that owns its midpoint, so every
+    stretch of speech appears exactly once.
+    """
+    merged = []
+
+    for shard, chunks in zip(shards, shard_chunks):
+        for position, chunk in enumerate(chunks):
+            chunk_start, chunk_end = chunk.get("timestamp", (None, None))
+            if chunk_start is None:
+                continue
+
+            # Whisper leaves the end open on the last chunk of a window
+            if chunk_end is None:
+                following = chunks[position + 1].get("timestamp", (None, None))[0] if position + 1 < len(chunks) else None
+                chunk_end = following if following is not None else shard.extract_duration
+
+            start = round(shard.extract_start + chunk_start, 3)
+            end = round(shard.extract_start + chunk_end, 3)
+            midpoint = (start + end) / 2
+
+            first, last = shard.index == 0, shard.index == len(shards) - 1
+            if (first or midpoint >= shard.start) and (last or midpoint < shard.end):
+                merged.append({"timestamp": (start, end), "text": chunk.get("text", "")})
+
+    merged.sort(key=lambda chunk: chunk["timestamp"][0])
+    return merged
+
+
+# one ASR model per worker process, loaded by the first task it handles and kept for the next ones
+_worker_asr_model = None
+
+
+def _worker_model():
+    global _worker_asr_model
+
+    from app.services.pipeline_services.transcription_service import ASRModel
+
+    if _worker_asr_model is None:
+        _worker_asr_model = ASRModel(keep_loaded=True)
+    return _worker_asr_model
+
+
+def _extract_audio(media_path: str, output_path: str, start: float, duration: float, language: str, job_id: str):
+    from app.models.audio import Audio
+    from app.services.pipeline_services.audio_service import AudioUtils
+    from app.services.pipeline_services.ffmpeg_service import FfmpegUtils
+
+    FfmpegUtils.extract_segment(media_path=media_path, output_path=output_path, start=start, duration=duration)
+    try:
+        return AudioUtils.load_resample_audio(Audio(job_id=job_id, audio_filepath=output_path, language=language))
+    finally:
+        os.remove(output_path)
+
+
+def _detect_language(media_path: str, sample_starts: List[float], model_size: str, detection_windows: int,
+                     work_dir: str) -> str:
+    """Worker-process entry point: identify the language from 30 s samples spread over the whole media."""
+    from app.services.pipeline_services.audio_service import AudioUtils
+    from app.services.pipeline_services.transcription_service import ASRModel
+
+    samples = [
+        _extract_audio(
+            media_path, os.path.join(work_dir, f"language_{i:04d}.wav"), start, ASRModel.LANGUAGE_WINDOW_SECONDS,
+            language="auto", job_id="language_detection"
+        )
+        for i, start in enumerate(sample_starts)
+    ]
+    # every sample is one 30 s window of the concatenation, the most energetic ones vote
+    window_size = ASRModel.LANGUAGE_WINDOW_SECONDS * samples[0].sampling_rate
+    array = np.concatenate([np.pad(sample.array[:window_size], (0, max(0, window_size - sample.array.size))) for sample in samples])
+    audio = AudioUtils.from_array(array=array, sampling_rate=samples[0].sampling_rate, language="auto", job_id="language_detection")
+
+    model = _worker_model()
+    model.language_detection_windows = max(1, detection_windows)
+    return model.detect_language(audio=audio, model_size=model_size)
+
+
+def _transcribe_shard(media_path: str, shard: Shard, model_size: str, language: str, work_dir: str) -> Tuple[str, List[Dict], str]:
+    """Worker-process entry point: extract the shard's audio and run Whisper on it."""
+    audio = _extract_audio(
+        media_path, os.path.join(work_dir, f"shard_{shard.index:04d}.wav"), shard.extract_start, shard.extract_duration,
+        language=language, job_id=f"shard_{shard.index}"
+    )
+    transcription = _worker_model().transcribe(audio=audio, model_size=model_size, translate_to_eng=False)
+    return transcription.original_text, transcription.original_chunks, transcription.input_language
+
+
+class ShardedTranscriber:
+    """
+    Transcribes long media as parallel time shards: each worker process extracts its own
+    range with ffmpeg (start/duration) and runs Whisper on it, the chunk lists are stitched
+    back into a single Transcription.
+
+    The worker processes are kept between jobs (each keeps its Whisper model loaded), jobs
+    sharded at the same time queue their shards on the same pool. With input_language="auto",
+    the language is identified once per job, from samples of the whole media, and every shard
+    is decoded in it.
+    """
+
+    def __init__(self, max_workers: int, min_shard_seconds: float = 300, overlap_seconds: float = 5.0,
+                 language_detection_windows: int = 1, executor: Optional[Executor] = None):
+        self.max_workers = max_workers
+        self.min_shard_seconds = min_shard_seconds
+        self.overlap_seconds = overlap_seconds
+        self.language_detection_windows = language_detection_windows
+        self._executor = executor
+        self._executor_lock = threading.Lock()
+
+    def should_shard(self, duration: Optional[float]) -> bool:
+        # sharding pays off only when at least two workers get a full shard
+        return self.max_workers > 1 and duration is not None and duration >= 2 * self.min_shard_seconds
+
+    def _pool(self) -> Executor:
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn: the parent holds threads and possibly CUDA state, neither survives a fork
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def shutdown(self):
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def transcribe(self, job: TranscriptionJob, duration: float, model_size: str,
+                   media_path: Optional[str] = None) -> Transcription:
+        """media_path: local path of the upload, when job.video_storage_path is a store key"""
+        from app.services.pipeline_services.transcription_service import AUTO_LANGUAGE
+
+        media_path = media_path or job.video_storage_path
+        shards = plan_shards(
+            duration=duration,
+            max_shards=self.max_workers,
+            min_shard_seconds=self.min_shard_seconds,
+            overlap_seconds=self.overlap_seconds
+        )
+        logger.info(f"Transcribing job {job.id} as {len(shards)} shards: {shards}")
+
+        executor = self._pool()
+        try:
+            with tempfile.TemporaryDirectory(prefix=f"shards_{job.id}_") as work_dir:
+                language = job.input_language
+                if language == AUTO_LANGUAGE:
+                    # one decision for the whole media: a silent or music-only shard must not pick its own
+                    sample_starts = [max(0.0, (shard.start + shard.end) / 2 - 15.0) for shard in shards]
+                    language = executor.submit(
+                        _detect_language, media_path, sample_starts, model_size, self.language_detection_windows, work_dir
+                    ).result()
+                    logger.info(f"Detected language {language} for job {job.id}, decoding every shard in it")
+
+                futures = [
+                    executor.submit(_transcribe_shard, media_path, shard, model_size, language, work_dir)
+                    for shard in shards
+                ]
+                results = [future.result() for future in futures]
+        except BrokenProcessPool:
+            # a worker died (e.g. out of memory): the next job gets a fresh pool
+            with self._executor_lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+
+        chunks = stitch_shard_chunks(shards, [shard_chunks for _, shard_chunks, _ in results])
+
+        return Transcription(
+            original_text=" ".join(chunk["text"].strip() for chunk in chunks if chunk["text"].strip()),
+            original_chunks=chunks,
+            input_language=language,
+            job_id=job.id
+        )
@@ -1,93 +1,173 @@
-from typing import List, Dict 
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 from app.models.transcription import Transcription
 from app.services.model_services.transcription_services import TranscriptionServices
+from app.services.pipeline_services.artifact_store import ArtifactStore
+import numpy as np
 import logging
 import os
+import tempfile
 
 logging.basicConfig(level=logging.INFO)
 
 logger = logging.getLogger(__name__)
 
+# subtitle files the writer can produce next to each other, the first one is the Transcription.filepath
+SUBTITLE_FILE_FORMATS = ("vtt", "srt")
+
+# zero-padded fields looked up by index instead of being formatted one cue at a time
+_TWO_DIGITS = np.array([f"{i:02}" for i in range(100)])
+_THREE_DIGITS = np.array([f"{i:03}" for i in range(1000)])
+
+
+def _timestamp_pair(chunk) -> Tuple[float, float]:
+    """(start, end) of a chunk as floats, NaN when the chunk cannot be used."""
+    try:
+        timestamp = chunk["timestamp"]
+        if not isinstance(timestamp, (list, tuple)) or "text" not in chunk:
+            return np.nan, np.nan
+        start, end = timestamp
+        return float(start), float(end)
+    except (KeyError, IndexError, TypeError, ValueError):
+        # not a dict, missing fields, wrong timestamp shape or None/non numeric values (Whisper prediction issue)
+        return np.nan, np.nan
+
+
+def validate_cues(chunks: Sequence[Dict]) -> Tuple[np.ndarray, List[str]]:
+    """
+    Valid cues of a chunk list as an (n, 2) array of start/end seconds and their stripped texts.
+    Unusable chunks are dropped and an end not after its start becomes start + 0.1 s.
+    """
+    chunks = chunks or []
+    times = np.array([_timestamp_pair(chunk) for chunk in chunks], dtype=np.float64).reshape(-1, 2)
+
+    valid = np.isfinite(times).all(axis=1)
+    if not valid.all():
+        invalid = np.flatnonzero(~valid)
+        logger.warning(f"Skipping {len(invalid)} invalid chunks (first at index {invalid[0]})")
+
+    times = times[valid]
+    reordered = times[:, 1] <= times[:, 0]
+    if reordered.any():
+        logger.warning(f"Fixing {int(reordered.sum())} chunks whose end is not after their start")
+        times[reordered, 1] = times[reordered, 0] + 0.1
+
+    texts = [str(chunks[i]["text"]).strip() for i in np.flatnonzero(valid).tolist()]
+    return times, texts
+
+
+def _clock_parts(seconds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """HH:MM:SS and mmm strings of an array of seconds, rounded to the millisecond."""
+    millis = np.rint(np.maximum(seconds, 0.0) * 1000).astype(np.int64)
+    hours, rest = np.divmod(millis, 3_600_000)
+    minutes, rest = np.divmod(rest, 60_000)
+    secs, millis = np.divmod(rest, 1000)
+
+    hours_str = _TWO_DIGITS[np.minimum(hours, 99)]
+    if (hours > 99).any():
+        hours_str = np.where(hours > 99, hours.astype(str), hours_str)
+
+    clock = np.char.add(np.char.add(np.char.add(np.char.add(hours_str, ":"), _TWO_DIGITS[minutes]), ":"), _TWO_DIGITS[secs])
+    return clock, _THREE_DIGITS[millis]
+
+
+def format_timestamps(seconds: np.ndarray, separator: str = ".") -> np.ndarray:
+    """HH:MM:SS.mmm (VTT/TTML) or HH:MM:SS,mmm (SRT) for every value of the array"""
+    clock, millis = _clock_parts(np.asarray(seconds, dtype=np.float64))
+    return np.char.add(np.char.add(clock, separator), millis)
+
+
+def render_cues(times: np.ndarray, texts: List[str], formats: Iterable[str] = ("vtt",)) -> Dict[str, str]:
+    """
+    Subtitle documents for validated cues, built in one pass: the timestamps are formatted
+    once for all requested formats, which only differ by the millisecond separator and numbering.
+    """
+    formats = list(formats)
+    unknown = [fmt for fmt in formats if fmt not in SUBTITLE_FILE_FORMATS]
+    if unknown:
+        raise ValueError(f"Unsupported subtitle file formats: {unknown}, expected some of {SUBTITLE_FILE_FORMATS}")
+
+    clock, millis = _clock_parts(times.reshape(-1))
+    clock, millis = clock.reshape(-1, 2), millis.reshape(-1, 2)
+
+    documents = {}
+    for fmt in formats:
+        separator = "," if fmt == "srt" else "."
+        start = np.char.add(np.char.add(clock[:, 0], separator), millis[:, 0])
+        end = np.char.add(np.char.add(clock[:, 1], separator), millis[:, 1])
+        timings = np.char.add(np.char.add(start, " --> "), end).tolist()
+
+        if fmt == "vtt":
+            # VTT format: timestamp line followed by text (no sequence number needed)
+            documents[fmt] = "WEBVTT\n\n" + "".join([f"{timing}\n{text}\n\n" for timing, text in zip(timings, texts)])
+        else:
+            documents[fmt] = "".join([
+                f"{index}\n{timing}\n{text}\n\n" for index, (timing, text) in enumerate(zip(timings, texts), start=1)
+            ])
+    return documents
+
+
+def write_atomically(path: str, content: str):
+    """Write through a temporary file in the same directory so readers never see a partial file."""
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
 class SubtitleWriter:
-    def __init__(self, transcription_service: TranscriptionServices):
+    def __init__(self, transcription_service: TranscriptionServices, formats: Sequence[str] = ("vtt",),
+                 store: Optional[ArtifactStore] = None):
+        if not formats or formats[0] != "vtt" or any(fmt not in SUBTITLE_FILE_FORMATS for fmt in formats):
+            raise ValueError(f"Subtitle file formats must start with 'vtt' and be some of {SUBTITLE_FILE_FORMATS}, got: {formats}")
         self.transcription_service = transcription_service
-        
+        # VTT is always written: it is the Transcription.filepath and what muxing embeds
+        self.formats = tuple(formats)
+        # written files are moved into the store by content, the VTT key is the Transcription.filepath
+        self.store = store or ArtifactStore()
 
     @staticmethod
-    def _format_timestamp(seconds: float) -> str:
-        """Format timestamp for VTT format (HH:MM:SS.mmm)"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        millis = int((seconds - int(seconds)) * 1000)
-        return f"{hours:02}:{minutes:02}:{secs:02}.{millis:03}"
-    
-    def save_chunks(self, chunks: List[Dict], output_path: str):
+    def select_chunks(transcription: Transcription) -> List[Dict]:
+        """The original chunks when nothing was translated, else the translated ones."""
+        if not transcription.translated_text or transcription.input_language.lower() == transcription.target_language.lower():
+            return transcription.original_chunks
+        return transcription.translated_chunks
+
+    def save_chunks(self, chunks: List[Dict], output_path: str, formats: Optional[Sequence[str]] = None) -> Dict[str, str]:
+        """
+        Write the chunks as the VTT file output_path, plus one file per other format with the
+        same name and its own extension. Returns format -> written path.
+        """
         # Validate chunks before processing
         if not chunks:
             logger.warning(f"No chunks to save for {output_path}")
-            return
-        
+            return {}
+
+        formats = tuple(formats or self.formats)
+
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            # Write VTT header
-            f.write("WEBVTT\n\n")
-            
-            valid_chunk_count = 0
-            
-            for i, chunk in enumerate(chunks, start=1):
-                # Validate chunk structure
-                if not isinstance(chunk, dict):
-                    logger.warning(f"Invalid chunk format at index {i-1}: {chunk}")
-                    continue
-                
-                if 'timestamp' not in chunk or 'text' not in chunk:
-                    logger.warning(f"Missing required fields in chunk at index {i-1}: {chunk}")
-                    continue
-                
-                timestamp = chunk['timestamp']
-                text = chunk['text']
-                
-                # Validate timestamp format
-                if not isinstance(timestamp, (list, tuple)) or len(timestamp) != 2:
-                    logger.warning(f"Invalid timestamp format at index {i-1}: {timestamp}")
-                    continue
-                
-                start_time, end_time = timestamp
-                
-                # Handle None or invalid timestamps (Whisper prediction issue)
-                if start_time is None or end_time is None:
-                    logger.warning(f"Missing timestamp data at index {i-1}: start={start_time}, end={end_time}")
-                    continue
-                
-                # Ensure timestamps are valid numbers
-                try:
-                    start_time = float(start_time)
-                    end_time = float(end_time)
-                except (ValueError, TypeError):
-                    logger.warning(f"Invalid timestamp values at index {i-1}: start={start_time}, end={end_time}")
-                    continue
-                
-                # Ensure end time is after start time
-                if end_time <= start_time:
-                    logger.warning(f"Invalid timestamp order at index {i-1}: start={start_time}, end={end_time}")
-                    # Fix by adding a small duration
-                    end_time = start_time + 0.1
-                
-                # Format timestamps and write to file
-                start_ts = self._format_timestamp(start_time)
-                end_ts = self._format_timestamp(end_time)
-                
-                valid_chunk_count += 1
-                # VTT format: timestamp line followed by text (no sequence number needed)
-                f.write(f"{start_ts} --> {end_ts}\n")
-                f.write(f"{text.strip()}\n\n")
-            
-            logger.info(f"Saved {valid_chunk_count} valid chunks out of {len(chunks)} total chunks to {output_path}")
-
-    def save_single_transcription(self, transcription: Transcription, output_dir: str):
+
+        times, texts = validate_cues(chunks)
+        documents = render_cues(times, texts, formats)
+
+        stem = os.path.splitext(output_path)[0]
+        paths = {}
+        for fmt, content in documents.items():
+            path = output_path if fmt == "vtt" else f"{stem}.{fmt}"
+            write_atomically(path, content)
+            paths[fmt] = path
+
+        logger.info(f"Saved {len(texts)} valid chunks out of {len(chunks)} total chunks to {output_path} ({', '.join(formats)})")
+        return paths
+
+    def save_single_transcription(self, transcription: Transcription, output_dir: str, persist: bool = True):
+        """Write the subtitle file(s) of a transcription, persisting its filepath unless the caller batches it."""
         logger.info(f"Saving the transcription {transcription.id} content as vtt file.")
         
         # Validate inputs
@@ -102,35 +182,31 @@ class SubtitleWriter:
         
         # Create the full output path with .vtt extension
         output_path = os.path.join(output_dir, f"{transcription.id}_{transcription.target_language}.vtt")
-        
-        # Set filepath to the complete file path, not just the directory
-        transcription.filepath = output_path 
 
-        # update the transcription in the database
-        self.transcription_service.update_by_field(
-            field_name="transcription_id",
-            value=transcription.id,
-            entity=transcription
-        )
+        chunks = self.select_chunks(transcription)
+        logger.info(f"Using {'original' if chunks is transcription.original_chunks else 'translated'}_chunks: {len(chunks) if chunks else 0} chunks")
 
+        # Save chunks to file(s), then into the store: the filepath is the VTT's key
+        paths = self.save_chunks(chunks, output_path)
+        transcription.filepath = self._put_files(paths) if paths else output_path
 
-        # handling the original transcription
-        if len(transcription.translated_text) < 1  or transcription.input_language.lower() == transcription.target_language.lower() :
-            chunks = transcription.original_chunks
-            logger.info(f"Using original_chunks: {len(chunks) if chunks else 0} chunks")
-            logger.debug(f"Original chunks content: {chunks}")
-        else : 
-            chunks = transcription.translated_chunks
-            logger.info(f"Using translated_chunks: {len(chunks) if chunks else 0} chunks")
-            logger.debug(f"Translated chunks content: {chunks}")
-
+        # update the transcription in the database
+        if persist:
+            self.transcription_service.update_by_field(
+                field_name="transcription_id",
+                value=transcription.id,
+                entity=transcription
+            )
 
-        
+        logger.info(f"Transcription {transcription.id} saved successfully to {transcription.filepath}")
 
-        # Save chunks to file
-        self.save_chunks(chunks, output_path)
-        
-        logger.info(f"Transcription {transcription.id} saved successfully to {output_path}")
+    def _put_files(self, paths: Dict[str, str]) -> str:
+        """Store the VTT by content and the other formats next to it, under the same digest"""
+        key = self.store.put_file(paths["vtt"], kind="transcriptions")
+        for fmt, path in paths.items():
+            if fmt != "vtt":
+                self.store.put_sibling(path, key, f".{fmt}")
+        return key
 
     def batch_save(self, transcription_list: List[Transcription], output_dir: str) -> List[Transcription]:
         """Save multiple transcriptions and return list of file paths"""
@@ -141,10 +217,14 @@ class SubtitleWriter:
         results = []
         for transcription in transcription_list:
             try:
-                self.save_single_transcription(transcription, output_dir)
+                self.save_single_transcription(transcription, output_dir, persist=False)
                 results.append(transcription)
             except Exception as e:
                 logger.error(f"Failed to save transcription {transcription.id}: {e}")
                 results.append(None)
-        
-        return results
\ No newline at end of file
+
+        # one database write for all the new filepaths
+        saved = [t for t in results if t is not None]
+        self.transcription_service.update_many(field_name="transcription_id", entities=saved)
+
+        return results
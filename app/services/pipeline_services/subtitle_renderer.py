@@ -0,0 +1,173 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+import logging
+import numpy as np
+
+from app.models.transcription import Transcription
+from app.services.pipeline_services.manifest_service import LANGUAGE_CODES
+from app.services.pipeline_services.subtitle_formatter_service import (
+    SubtitleWriter, format_timestamps, render_cues, validate_cues
+)
+
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+# format -> media type
+SUBTITLE_MEDIA_TYPES: Dict[str, str] = {
+    "vtt": "text/vtt; charset=utf-8",
+    "srt": "application/x-subrip; charset=utf-8",
+    "ttml": "application/ttml+xml; charset=utf-8",
+    "json": "application/json",
+}
+
+# bodies smaller than this are not worth a gzip variant
+GZIP_MIN_BYTES = 512
+
+# (n, 2) start/end seconds and the n cue texts
+Cues = Tuple[np.ndarray, List[str]]
+
+
+class RenderedSubtitle:
+    """One rendered subtitle body, with its strong ETag and a precompressed gzip variant."""
+
+    def __init__(self, body: bytes, media_type: str):
+        self.body = body
+        self.media_type = media_type
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        # mtime=0 keeps the gzip bytes (and so their ETag) deterministic
+        self.gzip_body = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_BYTES else None
+        self.gzip_etag = self.etag[:-1] + '-gz"'
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.body) + (len(self.gzip_body) if self.gzip_body else 0)
+
+
+class SubtitleRenderer:
+    """
+    Renders the stored Transcription chunks as VTT, SRT, TTML or JSON cues on request, and keeps
+    the rendered bodies in a small LRU so polling players are answered without disk or DB access.
+    Entries are keyed by (job, language, resolved version, format), whose body never changes, and
+    dropped when the job's results change.
+    """
+
+    FORMATS = tuple(SUBTITLE_MEDIA_TYPES)
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._cache: "OrderedDict[Tuple[str, str, int, str], RenderedSubtitle]" = OrderedDict()
+        self._size_bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        # bumped by every invalidation: a body rendered from records read before it must not be cached after it
+        self._generation = 0
+
+    # -- cache -------------------------------------------------------------
+
+    def generation(self) -> int:
+        """Taken before reading the records to render, and handed to render_cached"""
+        with self._lock:
+            return self._generation
+
+    def cached(self, job_id: str, language: str, version: int, fmt: str) -> Optional[RenderedSubtitle]:
+        """Look up by the resolved version (the job's current one when none is requested), never by None"""
+        with self._lock:
+            rendered = self._cache.get((job_id, language, version, fmt))
+            if rendered is None:
+                self._misses += 1
+                return None
+            self._cache.move_to_end((job_id, language, version, fmt))
+            self._hits += 1
+            return rendered
+
+    def render_cached(self, transcription: Transcription, fmt: str, generation: Optional[int] = None) -> RenderedSubtitle:
+        """
+        Render and remember under the transcription's own version, so a worker that has not seen
+        another one's reprocess still resolves the job's new version and misses. With the generation
+        taken before the transcription was read, a body rendered from records an invalidation has
+        since made stale is returned but not cached.
+        """
+        rendered = self.render(transcription, fmt)
+        key = (transcription.job_id, transcription.target_language, transcription.version or 1, fmt)
+
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return rendered
+            previous = self._cache.pop(key, None)
+            if previous is not None:
+                self._size_bytes -= previous.size_bytes
+            self._cache[key] = rendered
+            self._size_bytes += rendered.size_bytes
+            while self._cache and (len(self._cache) > self.max_entries or self._size_bytes > self.max_bytes):
+                _, evicted = self._cache.popitem(last=False)
+                self._size_bytes -= evicted.size_bytes
+
+        return rendered
+
+    def invalidate_job(self, job_id: str):
+        """Forget everything rendered for a job, called whenever its transcriptions change."""
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._cache if key[0] == job_id]:
+                self._size_bytes -= self._cache.pop(key).size_bytes
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._cache), "size_bytes": self._size_bytes, "hits": self._hits, "misses": self._misses}
+
+    # -- rendering ---------------------------------------------------------
+
+    def render(self, transcription: Transcription, fmt: str) -> RenderedSubtitle:
+        if fmt not in SUBTITLE_MEDIA_TYPES:
+            raise ValueError(f"Unsupported subtitle format: {fmt}, expected one of {self.FORMATS}")
+
+        cues = self.cues(transcription)
+        renderer = getattr(self, f"_render_{fmt}")
+        return RenderedSubtitle(body=renderer(transcription, cues).encode("utf-8"), media_type=SUBTITLE_MEDIA_TYPES[fmt])
+
+    @staticmethod
+    def cues(transcription: Transcription) -> Cues:
+        """Valid cue times and texts of the chunks the subtitle file is written from."""
+        return validate_cues(SubtitleWriter.select_chunks(transcription))
+
+    def _render_vtt(self, transcription: Transcription, cues: Cues) -> str:
+        return render_cues(*cues, formats=("vtt",))["vtt"]
+
+    def _render_srt(self, transcription: Transcription, cues: Cues) -> str:
+        return render_cues(*cues, formats=("srt",))["srt"]
+
+    def _render_ttml(self, transcription: Transcription, cues: Cues) -> str:
+        language = LANGUAGE_CODES.get(transcription.target_language.lower(), transcription.target_language.lower())
+        parts = [
+            '<?xml version="1.0" encoding="utf-8"?>\n',
+            f'<tt xmlns="http://www.w3.org/ns/ttml" xml:lang="{escape(language)}">\n',
+            "  <body>\n    <div>\n",
+        ]
+        times, texts = cues
+        begins, ends = format_timestamps(times[:, 0]).tolist(), format_timestamps(times[:, 1]).tolist()
+        for begin, end, text in zip(begins, ends, texts):
+            parts.append(f'      <p begin="{begin}" end="{end}">{escape(text)}</p>\n')
+        parts.append("    </div>\n  </body>\n</tt>\n")
+        return "".join(parts)
+
+    def _render_json(self, transcription: Transcription, cues: Cues) -> str:
+        times, texts = cues
+        return json.dumps({
+            "job_id": transcription.job_id,
+            "language": transcription.target_language,
+            "version": transcription.version,
+            "cues": [
+                {"start": start, "end": end, "text": text}
+                for (start, end), text in zip(np.round(times, 3).tolist(), texts)
+            ],
+        }, ensure_ascii=False)
@@ -93,7 +93,10 @@ class SummarizationModel:
 
     def _get_transcription(self, job: TranscriptionJob) -> Optional[Transcription]:
         """Get the English transcription for the job"""
-        transcriptions = self.transcription_services.find_by_field("job_id", job.id)
+        transcriptions = [
+            t for t in self.transcription_services.find_by_field("job_id", job.id)
+            if t.version == job.version
+        ]
         
         # Look for English transcription first
         for transcription in transcriptions:
@@ -200,7 +203,8 @@ class SummarizationModel:
         base_summary_obj = Summary(
             job_id=job.id, 
             text_content=base_summary, 
-            language=source_language
+            language=source_language,
+            version=job.version
         )
         summaries.append(base_summary_obj)
         logger.info(f"Created base summary in {source_language}")
@@ -222,7 +226,8 @@ class SummarizationModel:
             summary = Summary(
                 job_id=job.id, 
                 text_content=translated_summary, 
-                language=lang
+                language=lang,
+                version=job.version
             )
             summaries.append(summary)
             logger.info(f"Created translated summary in {lang}")
@@ -232,6 +237,47 @@ class SummarizationModel:
         
         return job
 
+    def summarize_languages(self, job: TranscriptionJob, languages: List[str]) -> TranscriptionJob:
+        """
+        Add summaries for extra languages of an already summarized job by translating
+        its existing base summary. Falls back to a full summarize() if the job has none.
+        """
+        existing: List[Summary] = [
+            summary for summary in self.summary_services.find_by_field("job_id", job.id)
+            if summary.version == job.version
+        ]
+
+        if not existing:
+            logger.info(f"No summaries stored for job {job.id}, running full summarization")
+            return self.summarize(job)
+
+        existing_languages = {summary.language.lower() for summary in existing}
+        base = next((summary for summary in existing if summary.language.lower() == "english"), existing[0])
+
+        summaries: List[Summary] = []
+        for lang in languages:
+            if lang.lower() in existing_languages:
+                logger.info(f"Skipping {lang} as a summary already exists")
+                continue
+
+            translated_summary = self._translate_summary(
+                summary_text=base.text_content,
+                source_lang=base.language,
+                target_lang=lang
+            )
+            summaries.append(Summary(
+                job_id=job.id,
+                text_content=translated_summary,
+                language=lang,
+                version=job.version
+            ))
+            logger.info(f"Created translated summary in {lang}")
+
+        if summaries:
+            self.summary_services.create_many(entities=summaries)
+
+        return job
+
     def _translate_summary(self, summary_text: str, source_lang: str, target_lang: str) -> str:
         """
         Translate a summary from source language to target language using the translation service.
@@ -0,0 +1,92 @@
+import copy
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import logging
+
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+# (sha256 of the 16 kHz PCM, model size, language, task)
+CacheKey = Tuple[str, str, str, str]
+
+
+class TranscriptionCache:
+    """
+    In-process LRU cache of ASR results keyed by audio fingerprint, model size, language and task.
+    Bounded both by entry count and by the approximate size of the stored text/chunks.
+    """
+
+    # rough per-chunk overhead of the dict/tuple containers
+    CHUNK_OVERHEAD_BYTES = 96
+
+    def __init__(self, max_entries: int = 64, max_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, Tuple[str, List[Dict], int]]" = OrderedDict()
+        self._size_bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def make_key(fingerprint: str, model_size: str, language: str, task: str) -> CacheKey:
+        return (fingerprint, model_size, language.lower(), task)
+
+    def get(self, key: CacheKey) -> Optional[Tuple[str, List[Dict]]]:
+        """Return (original_text, original_chunks) or None. Chunks are copied so callers may mutate them."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            text, chunks, _ = entry
+        return text, copy.deepcopy(chunks)
+
+    def put(self, key: CacheKey, text: str, chunks: List[Dict]):
+        size = self._estimate_size(text, chunks)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size_bytes -= previous[2]
+
+            self._entries[key] = (text, copy.deepcopy(chunks), size)
+            self._size_bytes += size
+
+            while len(self._entries) > self.max_entries or self._size_bytes > self.max_bytes:
+                evicted_key, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._size_bytes -= evicted_size
+                self._evictions += 1
+                logger.debug(f"Evicted transcription cache entry {evicted_key[0][:12]}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size_bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self._size_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+    def _estimate_size(self, text: str, chunks: List[Dict]) -> int:
+        size = len(text.encode("utf-8"))
+        for chunk in chunks:
+            size += len(str(chunk.get("text", "")).encode("utf-8")) + self.CHUNK_OVERHEAD_BYTES
+        return size
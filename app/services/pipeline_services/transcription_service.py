@@ -5,29 +5,52 @@ import librosa
 import matplotlib.pyplot as plt
 from app.models.transcription import Transcription
 from app.services.pipeline_services.audio_service import AudioUtils
+from app.services.pipeline_services.transcription_cache import TranscriptionCache
 
 from transformers import (
     AutoModelForSpeechSeq2Seq,
     AutoProcessor,
     pipeline
 )
+from transformers.models.whisper.tokenization_whisper import LANGUAGES
 import logging
 import os
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
 logging.basicConfig(level=logging.INFO) 
 
 logger = logging.getLogger(__name__)
 
+# input_language value that asks Whisper to identify the spoken language itself
+AUTO_LANGUAGE = "auto"
+
 class ASRModel:
     """
     Automatic Speech Recognition Model wrapper for OpenAI Whisper.
     Handles loading, transcribing, and feature visualization.
     """
 
-    def __init__(self):
+    LANGUAGE_WINDOW_SECONDS = 30
+
+    def __init__(self,
+                 language_detection_windows: int = 1,
+                 language_cache_size: int = 256,
+                 cache: Optional[TranscriptionCache] = None,
+                 keep_loaded: bool = False):
 
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.dtype = torch.float16 if torch.cuda.is_available() else torch.float32
         self.pipeline = None
+        self.model_size: Optional[str] = None
+        # guards load/unload/decode when the model is shared between job threads
+        self._lock = threading.RLock()
+        self.language_detection_windows = max(1, language_detection_windows)
+        self.language_cache_size = language_cache_size
+        self._language_cache: "OrderedDict[tuple, str]" = OrderedDict()
+        self.cache = cache
+        # a worker process transcribing one shard after the other keeps its model between them
+        self.keep_loaded = keep_loaded
         logger.info(f"ASRModel initialized device={self.device}, dtype={self.dtype}")
 
     
@@ -51,6 +74,15 @@ class ASRModel:
 
     def load(self , model_size : str):
         """Load ASR pipeline and save model/processor."""
+        with self._lock:
+            if self.pipeline is not None and self.model_size == model_size:
+                logger.info(f"ASR pipeline for '{model_size}' already loaded.")
+                return
+            if self.pipeline is not None:
+                self.unload()
+            self._load(model_size)
+
+    def _load(self, model_size: str):
         model_id = self._get_model(model_size)
         logger.info(f"Loading processor for model_id: {model_id}")
         processor = AutoProcessor.from_pretrained(model_id)
@@ -84,12 +116,15 @@ class ASRModel:
             feature_extractor=processor.feature_extractor,
             device=device_idx
         )
+        self.model_size = model_size
         logger.info("ASR pipeline loaded successfully.")
 
     def unload(self):
         """Release pipeline and free memory."""
         logger.info("Unloading ASR pipeline and freeing memory.")
-        self.pipeline = None
+        with self._lock:
+            self.pipeline = None
+            self.model_size = None
         gc.collect()
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
@@ -105,6 +140,140 @@ class ASRModel:
             Transcription object
         """
         logger.info(f"Starting transcription for job_id: {getattr(audio, 'job_id', None)}")
+        self.validate_audio(audio)
+
+        if audio.language == AUTO_LANGUAGE:
+            audio.language = self.detect_language(audio=audio, model_size=model_size)
+
+        task = "translate" if translate_to_eng else "transcribe"
+        cached = self.cache_lookup(audio=audio, model_size=model_size, task=task)
+
+        if cached is not None:
+            text, chunks = cached
+            logger.info(f"Transcription cache hit for job_id: {audio.job_id}, skipping ASR")
+        else:
+            with self._lock:
+                self.load(model_size=model_size)
+
+                logger.info(f"Transcribing audio (language={audio.language}, translate_to_eng={translate_to_eng})")
+                kwargs = {"language": audio.language}
+                if translate_to_eng:
+                    kwargs["task"] = "translate"
+                result = self.pipeline(
+                    audio.array,
+                    return_timestamps=True,
+                    generate_kwargs=kwargs
+                )
+            text = result.get("text", "")
+            chunks = result.get("chunks", [])
+            self.cache_store(audio=audio, model_size=model_size, task=task, text=text, chunks=chunks)
+
+        if self.pipeline is not None and not self.keep_loaded:
+            logger.info("Transcription complete. Unloading pipeline.")
+            self.unload()
+        logger.info(f"Transcription result: text length={len(text)}, chunks={len(chunks)}")
+        return Transcription(
+            original_text=text,
+            original_chunks=chunks,
+            input_language=audio.language,
+            job_id=audio.job_id
+        )
+
+    def cache_lookup(self, audio: AudioUtils, model_size: str, task: str) -> Optional[tuple]:
+        """Return cached (text, chunks) for this exact audio/model/language/task, if any."""
+        if self.cache is None:
+            return None
+        key = TranscriptionCache.make_key(audio.fingerprint(), model_size, audio.language, task)
+        return self.cache.get(key)
+
+    def cache_store(self, audio: AudioUtils, model_size: str, task: str, text: str, chunks: List[Dict]):
+        if self.cache is None:
+            return
+        key = TranscriptionCache.make_key(audio.fingerprint(), model_size, audio.language, task)
+        self.cache.put(key, text, chunks)
+
+    def transcribe_windows(self, windows: List[np.ndarray], model_size: str, language: str, task: Optional[str] = None) -> List[Dict]:
+        """
+        Decode several <=30 s windows in a single batched forward pass.
+        The pipeline is kept loaded between calls; the caller owns unload().
+        Args:
+            windows: list of 1D 16 kHz numpy arrays
+            model_size: Whisper model size
+            language: decoding language
+            task: None/"transcribe" or "translate"
+        Returns:
+            One {"text", "chunks"} dict per window, timestamps relative to the window start
+        """
+        if not windows:
+            return []
+        kwargs = {"language": language}
+        if task == "translate":
+            kwargs["task"] = "translate"
+        with self._lock:
+            self.load(model_size=model_size)
+            logger.info(f"Decoding batch of {len(windows)} windows (language={language}, task={task})")
+            results = self.pipeline(
+                list(windows),
+                batch_size=len(windows),
+                return_timestamps=True,
+                generate_kwargs=kwargs
+            )
+        if isinstance(results, dict):
+            results = [results]
+        return [{"text": r.get("text", ""), "chunks": r.get("chunks", [])} for r in results]
+
+    def detect_language(self, audio: AudioUtils, model_size: str) -> str:
+        """
+        Identify the spoken language from the most energetic 30 s window(s) only,
+        before committing to a full decode. Results are cached per audio fingerprint.
+        Returns:
+            Whisper language name (e.g. "french")
+        """
+        key = (audio.fingerprint(), model_size)
+        cached = self._language_cache.get(key)
+        if cached is not None:
+            self._language_cache.move_to_end(key)
+            logger.info(f"Language detection cache hit: {cached}")
+            return cached
+
+        windows = self._select_speech_windows(audio.array, audio.sampling_rate)
+
+        with self._lock:
+            self.load(model_size=model_size)
+            features = self.pipeline.feature_extractor(
+                windows,
+                sampling_rate=audio.sampling_rate,
+                return_tensors="pt"
+            ).input_features.to(self.device, dtype=self.dtype)
+            with torch.no_grad():
+                lang_token_ids = self.pipeline.model.detect_language(features)
+            tokens = self.pipeline.tokenizer.convert_ids_to_tokens(lang_token_ids.tolist())
+
+        codes = [token.strip("<|>") for token in tokens]
+        code, votes = Counter(codes).most_common(1)[0]
+        language = LANGUAGES.get(code)
+        if language is None:
+            logger.error(f"Whisper returned an unknown language token: {code}")
+            raise ValueError(f"Could not identify the spoken language (token={code})")
+
+        logger.info(f"Detected language: {language} ({votes}/{len(codes)} windows)")
+        self._language_cache[key] = language
+        if len(self._language_cache) > self.language_cache_size:
+            self._language_cache.popitem(last=False)
+        return language
+
+    def _select_speech_windows(self, array: np.ndarray, sampling_rate: int) -> List[np.ndarray]:
+        """Pick the highest-energy 30 s windows, returned in time order."""
+        window_size = self.LANGUAGE_WINDOW_SECONDS * sampling_rate
+        windows = [array[i:i + window_size] for i in range(0, array.size, window_size)]
+        if len(windows) <= self.language_detection_windows:
+            return windows
+        energies = [float(np.sqrt(np.mean(np.square(w)))) for w in windows]
+        top = sorted(np.argsort(energies)[-self.language_detection_windows:])
+        return [windows[i] for i in top]
+
+    def validate_audio(self, audio: AudioUtils):
+        """Raise ValueError if audio cannot be transcribed."""
         if not isinstance(audio, AudioUtils):
             logger.error("audio must be AudioUtils instance")
             raise ValueError("audio must be AudioUtils instance")
@@ -119,29 +288,6 @@ class ASRModel:
             logger.error("audio.job_id missing")
             raise ValueError("audio.job_id missing")
 
-        self.load(model_size=model_size)
-
-        logger.info(f"Transcribing audio (language={audio.language}, translate_to_eng={translate_to_eng})")
-        kwargs = {"language": audio.language}
-        if translate_to_eng:
-            kwargs["task"] = "translate"
-        result = self.pipeline(
-            audio.array,
-            return_timestamps=True,
-            generate_kwargs=kwargs
-        )
-        logger.info("Transcription complete. Unloading pipeline.")
-        self.unload()
-        text = result.get("text", "")
-        chunks = result.get("chunks", [])
-        logger.info(f"Transcription result: text length={len(text)}, chunks={len(chunks)}")
-        return Transcription(
-            original_text=text,
-            original_chunks=chunks,
-            input_language=audio.language,
-            job_id=audio.job_id
-        )
-
     def visualize_features(self, output_path: str, audio: np.ndarray):
         """
         Save log-mel spectrogram of audio to output_path.
@@ -1,5 +1,5 @@
 from transformers import MarianMTModel, MarianTokenizer 
-from typing import Tuple
+from typing import Dict, Optional, Tuple
 from app.models.transcription import Transcription
 from app.models.transcription_job import TranscriptionJob
 from typing import  List
@@ -64,13 +64,56 @@ class TranslationModel:
         transcription.translated_chunks = []
         transcription.target_language = src
         result.append(transcription)
+        result.extend(self._translate_to_targets(transcription, targets))
+        self.transcription_service.create_many(result)
+        logger.info(f"Translation process finished. Total transcriptions: {len(result)}")
+        return result
+
+    def translate_to_additional_languages(self, transcription: Transcription, target_languages: List[str]) -> List[Transcription]:
+        """Translate an already stored source transcription into extra languages and persist only the new ones."""
+        logger.info(f"Translating transcription {transcription.id} to additional languages: {target_languages}")
+        result = self._translate_to_targets(transcription, target_languages)
+        if result:
+            self.transcription_service.create_many(result)
+        logger.info(f"Additional translation finished. New transcriptions: {len(result)}")
+        return result
+
+    def retranslate_transcription(self, transcription: Transcription, previous: List[Transcription], target_languages: List[str]) -> List[Transcription]:
+        """
+        Translate a new version of a job's source transcription, reusing the previous version's
+        chunk translations wherever the source chunk text did not change.
+        """
+        logger.info(f"Re-translating transcription {transcription.id} (version {transcription.version})")
+        src = transcription.input_language
+        memos: Dict[str, Dict[str, str]] = {}
+        for old in previous:
+            if not old.target_language or old.target_language.lower() == src.lower():
+                continue
+            memo = memos.setdefault(old.target_language.lower(), {})
+            for original, translated in zip(old.original_chunks or [], old.translated_chunks or []):
+                if isinstance(original, dict) and isinstance(translated, dict) and original.get("text"):
+                    memo[original["text"]] = translated.get("text", "")
+
+        transcription.translated_text = ""
+        transcription.translated_chunks = []
+        transcription.target_language = src
+        result = [transcription]
+        result.extend(self._translate_to_targets(transcription, target_languages, memos=memos))
+        self.transcription_service.create_many(result)
+        logger.info(f"Re-translation finished. Total transcriptions: {len(result)}")
+        return result
+
+    def _translate_to_targets(self, transcription: Transcription, targets: List[str], memos: Optional[Dict[str, Dict[str, str]]] = None) -> List[Transcription]:
+        src = transcription.input_language
+        memos = memos or {}
+        result = []
         for tgt in targets:
             if tgt.lower() == src.lower():
                 logger.info(f"Skipping translation to same language: {tgt}")
                 continue
             logger.info(f"Translating from {src} to {tgt}")
             tr_text = self._translate_text(transcription.original_text, src, tgt) if transcription.original_text else ""
-            tr_chunks = self._translate_chunks(transcription.original_chunks, src, tgt) if transcription.original_chunks else []
+            tr_chunks = self._translate_chunks(transcription.original_chunks, src, tgt, memo=memos.get(tgt.lower())) if transcription.original_chunks else []
             result.append(Transcription(
                 original_text=transcription.original_text,
                 original_chunks=transcription.original_chunks,
@@ -80,10 +123,9 @@ class TranslationModel:
                 input_language=src,
                 target_language=tgt,
                 filepath=transcription.filepath,
+                version=transcription.version,
             ))
             logger.info(f"Translation to {tgt} complete.")
-        self.transcription_service.create_many(result)
-        logger.info(f"Translation process finished. Total transcriptions: {len(result)}")
         return result
 
     def _translate_text(self, text: str, src: str, tgt: str) -> str:
@@ -102,17 +144,23 @@ class TranslationModel:
         logger.info(f"Text translation complete. Segments: {len(segments)}")
         return " ".join(out)
 
-    def _translate_chunks(self, chunks: List, src: str, tgt: str) -> List:
+    def _translate_chunks(self, chunks: List, src: str, tgt: str, memo: Optional[Dict[str, str]] = None) -> List:
         logger.info(f"Translating {len(chunks)} chunks from {src} to {tgt}")
+        memo = memo or {}
         result = []
+        reused = 0
         for chunk in chunks:
             if not isinstance(chunk, dict) or "timestamp" not in chunk or "text" not in chunk:
                 logger.warning(f"Skipping invalid chunk: {chunk}")
                 continue
             text = chunk["text"]
-            tr_text = self._translate_text(text, src, tgt) if text and isinstance(text, str) else ""
+            if text in memo:
+                tr_text = memo[text]
+                reused += 1
+            else:
+                tr_text = self._translate_text(text, src, tgt) if text and isinstance(text, str) else ""
             result.append({"timestamp": chunk["timestamp"], "text": tr_text})
-        logger.info(f"Chunk translation complete. Translated: {len(result)}")
+        logger.info(f"Chunk translation complete. Translated: {len(result)}, reused from previous version: {reused}")
         return result
 
     def clear_models_cache(self):
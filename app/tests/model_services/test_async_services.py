@@ -0,0 +1,94 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from app.models.transcription_job import TranscriptionJob
+from app.repositories.io_executor import create_io_executor
+from app.repositories.transcription_job_repository import TranscriptionJobRepository
+from app.services.model_services.entity_cache import EntityCache
+from app.services.model_services.transcription_job_services import TranscriptionJobServices
+
+
+class TestAsyncServices(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = create_io_executor(2)
+        self.repository = TranscriptionJobRepository(
+            db_path=os.path.join(tempfile.mkdtemp(), "db.json"), io_executor=self.executor
+        )
+        self.services = TranscriptionJobServices(repository=self.repository, cache=EntityCache(ttl_seconds=60))
+
+    def tearDown(self):
+        self.repository.close()
+        self.executor.shutdown()
+
+    def _job(self, job_id: str) -> TranscriptionJob:
+        return TranscriptionJob(job_id=job_id, video_storage_path="/videos/a.mp4", input_language="english",
+                                target_languages=["french"])
+
+    def test_async_round_trip(self):
+        async def scenario():
+            await self.services.create_async(self._job("job_1"))
+            job = await self.services.find_one_by_field_async("job_id", "job_1")
+            job.processed = True
+            await self.services.update_by_field_async("job_id", "job_1", job)
+            return await self.services.find_one_by_field_async("job_id", "job_1"), await self.services.find_all_async()
+
+        job, jobs = asyncio.run(scenario())
+
+        self.assertTrue(job.processed)
+        self.assertEqual([job.id for job in jobs], ["job_1"])
+
+    def test_storage_calls_run_on_the_io_pool(self):
+        threads = []
+        find = self.repository.find_one_by_field
+
+        def recording_find(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return find(*args, **kwargs)
+
+        self.services.create(self._job("job_1"))
+        with patch.object(self.repository, "find_one_by_field", side_effect=recording_find):
+            asyncio.run(self.services.find_one_by_field_async("job_id", "job_1"))
+            # a cache hit is answered without going to the pool
+            asyncio.run(self.services.find_one_by_field_async("job_id", "job_1"))
+
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith("repository-io"))
+
+    def test_slow_storage_does_not_block_the_event_loop(self):
+        self.services.create(self._job("job_1"))
+        find = self.repository.find_one_by_field
+
+        def slow_find(*args, **kwargs):
+            time.sleep(0.3)
+            return find(*args, **kwargs)
+
+        async def scenario():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.ensure_future(ticker())
+            job = await self.services.find_one_by_field_async("job_id", "job_1")
+            task.cancel()
+            return job, ticks
+
+        with patch.object(self.repository, "find_one_by_field", side_effect=slow_find):
+            job, ticks = asyncio.run(scenario())
+
+        self.assertEqual(job.id, "job_1")
+        # the loop kept running other work while the lookup waited on storage
+        self.assertGreater(ticks, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from app.models.transcription_job import TranscriptionJob
+from app.repositories.transcription_job_repository import TranscriptionJobRepository
+from app.services.model_services.entity_cache import EntityCache
+from app.services.model_services.transcription_job_services import TranscriptionJobServices
+
+
+class TestEntityCache(unittest.TestCase):
+
+    def setUp(self):
+        self.repository = TranscriptionJobRepository(db_path=os.path.join(tempfile.mkdtemp(), "db.json"))
+        self.cache = EntityCache(max_entries=2, ttl_seconds=60)
+        self.services = TranscriptionJobServices(repository=self.repository, cache=self.cache)
+        self.job = TranscriptionJob(job_id="job_1", video_storage_path="/videos/a.mp4", input_language="english",
+                                    target_languages=["french"])
+        self.services.create(self.job)
+
+    def tearDown(self):
+        self.repository.close()
+
+    def test_hot_lookups_do_not_touch_storage(self):
+        self.services.find_one_by_field("job_id", "job_1")
+
+        with patch.object(self.repository, "find_one_by_field", side_effect=AssertionError("storage read")):
+            job = self.services.find_one_by_field("job_id", "job_1")
+
+        self.assertEqual(job.id, "job_1")
+        self.assertEqual(self.services.cache_stats()["hits"], 1)
+
+    def test_returned_entities_are_copies(self):
+        self.services.find_one_by_field("job_id", "job_1").target_languages.append("german")
+
+        self.assertEqual(self.services.find_one_by_field("job_id", "job_1").target_languages, ["french"])
+
+    def test_writes_through_the_services_invalidate(self):
+        self.assertIsNone(self.services.find_one_by_field("job_id", "job_2"))
+        self.services.find_one_by_field("job_id", "job_1")
+
+        self.job.stage = "transcribing"
+        self.services.update_by_field("job_id", "job_1", self.job)
+        self.services.create(TranscriptionJob(job_id="job_2", video_storage_path="/videos/b.mp4",
+                                              input_language="english", target_languages=[]))
+
+        self.assertEqual(self.services.find_one_by_field("job_id", "job_1").stage, "transcribing")
+        self.assertIsNotNone(self.services.find_one_by_field("job_id", "job_2"))
+
+    def test_ttl_and_lru_bounds(self):
+        cache = EntityCache(max_entries=2, ttl_seconds=0.05)
+        for value in ["a", "b", "c"]:
+            cache.put(("Services.one", "job_id", value), value, [value])
+
+        self.assertEqual(cache.get(("Services.one", "job_id", "a")), (False, None))
+        self.assertEqual(cache.get(("Services.one", "job_id", "c")), (True, "c"))
+        time.sleep(0.06)
+        self.assertEqual(cache.get(("Services.one", "job_id", "c")), (False, None))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_a_result_loaded_before_a_write_is_not_cached(self):
+        generation = self.cache.generation()
+        stale = self.repository.find_one_by_field("job_id", "job_1")
+        self.services.update_by_field("job_id", "job_1", self.job)
+
+        self.cache.put(("TranscriptionJobServices.one", "job_id", "job_1"), stale, ["job_1"], generation=generation)
+
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
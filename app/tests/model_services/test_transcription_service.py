@@ -1,4 +1,5 @@
 import unittest
+import unittest.mock
 import os
 import json
 from app.repositories.transcription_repository import TranscriptionRepository
@@ -67,3 +68,61 @@ class TranscriptionServicesTests(unittest.TestCase):
             value=transcription.job_id
         )
         self.assertEqual(found.translated_text, "Bonjour le monde")
+
+    def _count_writes(self):
+        storage = self.repository.db.storage
+        writes = []
+        original_write = storage.write
+        storage.write = lambda data: (writes.append(1), original_write(data))
+        return writes
+
+    def test_create_many_is_a_single_write(self):
+        transcriptions = [
+            Transcription(original_text="Hello world", job_id="job123", original_chunks=[], input_language="en", target_language=language)
+            for language in ["en", "fr", "de", "es"]
+        ]
+        writes = self._count_writes()
+
+        created = self.services.create_many(transcriptions)
+
+        self.assertEqual(created, 4)
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(len(self.services.find_all()), 4)
+
+    def test_update_many_is_a_single_write(self):
+        transcriptions = [
+            Transcription(original_text="Hello world", job_id="job123", original_chunks=[], input_language="en", target_language=language)
+            for language in ["en", "fr", "de"]
+        ]
+        self.services.create_many(transcriptions)
+        for t in transcriptions:
+            t.filepath = f"/subs/{t.target_language}.vtt"
+        writes = self._count_writes()
+
+        updated = self.services.update_many(field_name="transcription_id", entities=transcriptions)
+
+        self.assertEqual(updated, 3)
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(
+            sorted(t.filepath for t in self.services.find_all()),
+            ["/subs/de.vtt", "/subs/en.vtt", "/subs/fr.vtt"]
+        )
+        self.assertEqual(self.services.update_many(field_name="transcription_id", entities=[]), 0)
+
+    def test_project_by_field_returns_only_requested_fields(self):
+        transcriptions = [
+            Transcription(original_text="Hello world", job_id="job123", original_chunks=[], input_language="en",
+                          target_language=language, filepath=f"/subs/{language}.vtt")
+            for language in ["en", "fr"]
+        ]
+        self.services.create_many(transcriptions)
+
+        with unittest.mock.patch.object(self.repository, "from_dict", side_effect=AssertionError("entity built")):
+            rows = self.services.project_by_field(
+                field_name="job_id", value="job123", fields=["target_language", "filepath", "missing"]
+            )
+
+        self.assertEqual(rows, [
+            {"target_language": "en", "filepath": "/subs/en.vtt", "missing": None},
+            {"target_language": "fr", "filepath": "/subs/fr.vtt", "missing": None},
+        ])
@@ -0,0 +1,183 @@
+import hashlib
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from app.models.transcription import Transcription
+from app.models.transcription_job import TranscriptionJob
+from app.services.pipeline_services.artifact_store import (
+    ArtifactBackend, ArtifactStore, LocalFileBackend, discard_job_artifact
+)
+from app.services.pipeline_services.subtitle_formatter_service import SubtitleWriter
+
+
+class InMemoryObjectBackend(ArtifactBackend):
+    """Stand-in for an object store: blobs live in a dict, local_path downloads them to a cache dir."""
+
+    def __init__(self, cache_dir: str):
+        self.objects = {}
+        self.cache_dir = cache_dir
+        self.downloads = 0
+
+    def manages(self, kind):
+        return True
+
+    def exists(self, key):
+        return key in self.objects
+
+    def put_file(self, key, source_path):
+        with open(source_path, "rb") as f:
+            self.objects[key] = f.read()
+        os.remove(source_path)
+
+    def local_path(self, key):
+        path = os.path.join(self.cache_dir, key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(self.objects[key])
+            self.downloads += 1
+        return path
+
+    def delete(self, key):
+        return self.objects.pop(key, None) is not None
+
+
+class TestArtifactStore(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.roots = {kind: os.path.join(self.root, kind) for kind in ("uploads", "audios", "transcriptions")}
+        self.store = ArtifactStore(backend=LocalFileBackend(self.roots), legacy_dirs=list(self.roots.values()))
+
+    def _staged(self, content: bytes, suffix: str = ".mp4") -> str:
+        path = self.store.staging_path("uploads", suffix)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def test_files_are_stored_under_relative_content_keys(self):
+        key = self.store.put_file(self._staged(b"video bytes", ".MP4"), kind="uploads")
+        digest = hashlib.sha256(b"video bytes").hexdigest()
+
+        self.assertEqual(key, f"uploads/{digest[:2]}/{digest}.mp4")
+        self.assertEqual(self.store.local_path(key), os.path.join(self.roots["uploads"], digest[:2], f"{digest}.mp4"))
+        self.assertTrue(self.store.exists(key))
+        self.assertEqual(os.listdir(os.path.join(self.roots["uploads"], ".staging")), [])
+
+    def test_identical_content_is_stored_once(self):
+        first = self.store.put_file(self._staged(b"same"), kind="uploads")
+        second = self.store.put_file(self._staged(b"same"), kind="uploads")
+        other = self.store.put_file(self._staged(b"other"), kind="uploads")
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        stored = [name for _, _, files in os.walk(self.roots["uploads"]) for name in files]
+        self.assertEqual(len(stored), 2)
+
+    def test_sibling_shares_the_digest(self):
+        vtt = os.path.join(self.root, "t.vtt")
+        srt = os.path.join(self.root, "t.srt")
+        for path in (vtt, srt):
+            with open(path, "w") as f:
+                f.write(path)
+
+        key = self.store.put_file(vtt, kind="transcriptions")
+        sibling = self.store.put_sibling(srt, key, ".srt")
+
+        self.assertEqual(sibling, key[:-len(".vtt")] + ".srt")
+        self.assertTrue(self.store.exists(sibling))
+
+    def test_legacy_paths(self):
+        # stored by another checkout: found again by name in the configured directories
+        os.makedirs(self.roots["uploads"])
+        moved = os.path.join(self.roots["uploads"], "uploaded_video_1234abcd.mp4")
+        with open(moved, "wb") as f:
+            f.write(b"old upload")
+
+        self.assertEqual(self.store.local_path("/home/someone/app/uploads/uploaded_video_1234abcd.mp4"), moved)
+        self.assertTrue(self.store.exists("/home/someone/app/uploads/uploaded_video_1234abcd.mp4"))
+        self.assertFalse(self.store.exists("/home/someone/app/uploads/missing.mp4"))
+
+        # kinds the backend does not manage keep plain paths
+        unmanaged = ArtifactStore()
+        self.assertEqual(unmanaged.put_file(moved, kind="uploads"), moved)
+        self.assertEqual(unmanaged.local_path("uploads/interview.mp3"), "uploads/interview.mp3")
+
+    def test_keys_cannot_escape_the_roots(self):
+        with self.assertRaises(ValueError):
+            self.store.local_path("uploads/../../etc/passwd")
+
+    def test_pluggable_backend(self):
+        backend = InMemoryObjectBackend(cache_dir=os.path.join(self.root, "cache"))
+        store = ArtifactStore(backend=backend)
+
+        key = store.put_file(self._staged(b"remote"), kind="uploads")
+        self.assertTrue(key.startswith("uploads/"))
+        self.assertEqual(list(backend.objects), [key])
+
+        with open(store.local_path(key), "rb") as f:
+            self.assertEqual(f.read(), b"remote")
+        store.local_path(key)
+        self.assertEqual(backend.downloads, 1)
+
+        self.assertTrue(store.delete(key))
+        self.assertFalse(store.exists(key))
+
+    def test_shared_artifacts_are_kept_while_referenced(self):
+        key = self.store.put_file(self._staged(b"audio", ".wav"), kind="audios")
+        other_job = TranscriptionJob(video_storage_path="", input_language="english", target_languages=[],
+                                     job_id="job_2", audio_path=key)
+        job_services = Mock()
+        job_services.find_by_field.return_value = [other_job]
+
+        self.assertFalse(discard_job_artifact(self.store, job_services, "audio_path", key, "job_1"))
+        self.assertTrue(self.store.exists(key))
+        job_services.find_by_field.assert_called_once_with(field_name="audio_path", value=key)
+
+        job_services.find_by_field.return_value = []
+        self.assertTrue(discard_job_artifact(self.store, job_services, "audio_path", key, "job_1"))
+        self.assertFalse(self.store.exists(key))
+
+    def test_content_being_stored_again_is_kept_until_referenced(self):
+        key = self.store.put_file(self._staged(b"audio", ".wav"), kind="audios")
+        job_services = Mock()
+        job_services.find_by_field.return_value = []
+
+        # job_2 extracted the same audio and has not saved its record yet while job_1 gives it up
+        with self.store.storing(self._staged(b"audio", ".wav"), kind="audios") as reused:
+            self.assertEqual(reused, key)
+            self.assertFalse(discard_job_artifact(self.store, job_services, "audio_path", key, "job_1"))
+            self.assertTrue(self.store.exists(key))
+
+        self.assertFalse(self.store.is_pinned(key))
+        self.assertTrue(discard_job_artifact(self.store, job_services, "audio_path", key, "job_1"))
+
+    def test_backends_implement_the_whole_interface(self):
+        class PartialBackend(ArtifactBackend):
+            def manages(self, kind):
+                return True
+
+        with self.assertRaises(TypeError):
+            PartialBackend()
+
+    def test_subtitle_writer_records_keys(self):
+        writer = SubtitleWriter(transcription_service=Mock(), formats=("vtt", "srt"), store=self.store)
+        transcription = Transcription(
+            original_text="Hello.", job_id="job_1", input_language="english", target_language="english",
+            original_chunks=[{"timestamp": [0.0, 1.0], "text": "Hello."}]
+        )
+
+        writer.batch_save([transcription], output_dir=self.roots["transcriptions"])
+
+        self.assertTrue(ArtifactStore.is_key(transcription.filepath))
+        self.assertTrue(self.store.exists(transcription.filepath[:-len(".vtt")] + ".srt"))
+        with open(self.store.local_path(transcription.filepath), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "WEBVTT\n\n00:00:00.000 --> 00:00:01.000\nHello.\n\n")
+        # nothing is left under the per-transcription names
+        self.assertEqual(sorted(os.listdir(self.roots["transcriptions"])), [transcription.filepath.split("/")[1]])
+
+
+if __name__ == "__main__":
+    unittest.main()
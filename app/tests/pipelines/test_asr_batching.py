@@ -0,0 +1,118 @@
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+
+import numpy as np
+
+from app.services.pipeline_services.asr_batching_service import ASRBatchingServer, ASRBatchingStoppedError
+from app.services.pipeline_services.audio_service import AudioUtils
+
+
+class TestASRBatchingServer(unittest.TestCase):
+
+    def setUp(self):
+        self.asr_model = Mock()
+        self.asr_model.pipeline = None
+        self.asr_model.cache_lookup.return_value = None
+        self.asr_model.transcribe_windows.side_effect = lambda windows, model_size, language, task: [
+            {"text": f"w{int(w[0])}", "chunks": [{"timestamp": (0.0, None), "text": f"w{int(w[0])}"}]}
+            for w in windows
+        ]
+        self.server = ASRBatchingServer(asr_model=self.asr_model, max_batch_size=8, max_wait_ms=200)
+
+    def tearDown(self):
+        self.server.stop(timeout=2)
+
+    def _audio(self, job_id: str, marker: float, seconds: int) -> AudioUtils:
+        array = np.full(seconds * 16_000, marker, dtype=np.float32)
+        return AudioUtils(array=array, sampling_rate=16_000, language="english", job_id=job_id)
+
+    def test_windows_from_concurrent_jobs_share_batches(self):
+        results = {}
+
+        def run(job_id, marker):
+            results[job_id] = self.server.transcribe(audio=self._audio(job_id, marker, 65), model_size="tiny")
+
+        threads = [threading.Thread(target=run, args=(f"job_{i}", i + 1)) for i in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=10)
+
+        # 2 jobs x 3 windows, all decoded in fewer forward passes than windows
+        stats = self.server.stats()
+        self.assertEqual(stats["windows"], 6)
+        self.assertLess(stats["batches"], 6)
+
+        # results are routed back to the job that submitted them
+        self.assertEqual(results["job_0"].original_text, "w1 w1 w1")
+        self.assertEqual(results["job_1"].original_text, "w2 w2 w2")
+        self.assertEqual(results["job_1"].job_id, "job_1")
+
+    def test_overlapping_windows_keep_each_word_once(self):
+        # every sample holds its absolute time; a word is spoken from each odd second for 1.5 s
+        def transcribe_windows(windows, model_size, language, task):
+            results = []
+            for w in windows:
+                offset, duration = float(w[0]), w.size / 16_000
+                chunks = []
+                for start in np.arange(1.0, 65.0, 2.0):
+                    if start < offset or start >= offset + duration:
+                        continue
+                    end = start + 1.5 - offset
+                    chunks.append({"timestamp": (start - offset, end if end <= duration else None), "text": f"{start:g}"})
+                results.append({"text": "", "chunks": chunks})
+            return results
+
+        self.asr_model.transcribe_windows.side_effect = transcribe_windows
+        audio = AudioUtils(array=np.arange(65 * 16_000, dtype=np.float64) / 16_000, sampling_rate=16_000,
+                           language="english", job_id="job_x")
+
+        transcription = self.server.transcribe(audio=audio, model_size="tiny")
+
+        # windows [0, 30), [25, 55), [50, 65); the word at 29 s is cut by the first and whole in the second
+        timestamps = [chunk["timestamp"] for chunk in transcription.original_chunks]
+        expected = [(float(start), start + 1.5) for start in range(1, 63, 2)] + [(63.0, 64.5)]
+        self.assertEqual(timestamps, expected)
+        self.assertEqual(self.server.stats()["windows"], 3)
+        self.assertEqual(self.server.stats()["audio_seconds"], 75.0)
+
+    def test_stop_fails_the_windows_still_queued(self):
+        release = threading.Event()
+
+        def transcribe_windows(windows, model_size, language, task):
+            release.wait(timeout=5)
+            return [{"text": "w", "chunks": []} for _ in windows]
+
+        self.asr_model.transcribe_windows.side_effect = transcribe_windows
+        server = ASRBatchingServer(asr_model=self.asr_model, max_batch_size=1, max_wait_ms=0)
+        errors = []
+
+        def run():
+            try:
+                server.transcribe(audio=self._audio("job_x", 1, 65), model_size="tiny")
+            except Exception as e:
+                errors.append(e)
+
+        caller = threading.Thread(target=run)
+        caller.start()
+        while server._queue.qsize() < 2:
+            time.sleep(0.01)
+        threading.Timer(0.1, release.set).start()
+        server.stop(timeout=5)
+        caller.join(timeout=5)
+
+        self.assertFalse(caller.is_alive())
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0], ASRBatchingStoppedError)
+
+    def test_decode_errors_are_routed_to_the_job(self):
+        self.asr_model.transcribe_windows.side_effect = RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            self.server.transcribe(audio=self._audio("job_x", 1, 10), model_size="tiny")
+
+
+if __name__ == "__main__":
+    unittest.main()
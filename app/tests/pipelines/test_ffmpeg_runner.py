@@ -0,0 +1,128 @@
+import os
+import stat
+import sys
+import tempfile
+import threading
+import unittest
+
+import ffmpeg
+import numpy as np
+from unittest.mock import Mock
+
+from app.models.media_info import MediaInfo
+from app.models.transcription_job import TranscriptionJob
+
+from app.services.pipeline_services.ffmpeg_runner import FfmpegRunner, parse_progress_block
+from app.services.pipeline_services.ffmpeg_service import FfmpegUtils, PcmBuffer
+from app.services.pipeline_services.job_cancellation import CancellationRegistry, JobCancelledError
+
+
+# stands in for the ffmpeg binary: ignores its arguments, reports progress like `-progress pipe:1`
+FAKE_FFMPEG = """#!{python}
+import sys, time
+print("Input #0, wav", file=sys.stderr, flush=True)
+for us in (1000000, 2000000):
+    print(f"out_time_us={{us}}\\nspeed=2.0x\\nprogress=continue", flush=True)
+    time.sleep({pause})
+print("out_time_us=4000000\\nspeed=2.0x\\nprogress=end", flush=True)
+print("{last_line}", file=sys.stderr, flush=True)
+sys.exit({exit_code})
+"""
+
+# stands in for ffmpeg writing its output to stdout: progress goes to the fd named by `-progress pipe:N`
+FAKE_PIPING_FFMPEG = """#!{python}
+import os, struct, sys
+progress = os.fdopen(int(sys.argv[sys.argv.index("-progress") + 1].split(":")[1]), "w")
+for i in range(4):
+    sys.stdout.buffer.write(struct.pack("<1000f", *([float(i)] * 1000)))
+    sys.stdout.buffer.flush()
+    print(f"out_time_us={{(i + 1) * 1000000}}\\nprogress={{'end' if i == 3 else 'continue'}}", file=progress, flush=True)
+"""
+
+
+class TestFfmpegRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _fake_ffmpeg(self, pause: float = 0.0, exit_code: int = 0, last_line: str = "done") -> list:
+        path = os.path.join(self.tmp_dir.name, "ffmpeg")
+        with open(path, "w") as f:
+            f.write(FAKE_FFMPEG.format(python=sys.executable, pause=pause, exit_code=exit_code, last_line=last_line))
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        return [path, "-i", "in.mp4", "out.wav"]
+
+    def test_progress_events_are_reported(self):
+        events = []
+
+        FfmpegRunner().run_blocking(self._fake_ffmpeg(), duration=4.0, on_progress=events.append)
+
+        self.assertEqual([e.percent for e in events], [25.0, 50.0, 100.0])
+        self.assertEqual(events[0].eta_seconds, 1.5)
+        self.assertTrue(events[-1].done)
+
+    def test_failure_raises_ffmpeg_error_with_stderr_tail(self):
+        with self.assertRaises(ffmpeg.Error) as context:
+            FfmpegRunner().run_blocking(self._fake_ffmpeg(exit_code=1, last_line="Invalid data found"))
+
+        self.assertIn(b"Invalid data found", context.exception.stderr)
+
+    def test_timeout_kills_the_process(self):
+        with self.assertRaises(TimeoutError):
+            FfmpegRunner(timeout_seconds=0.5).run_blocking(self._fake_ffmpeg(pause=5))
+
+    def test_cancel_event_kills_the_process(self):
+        cancel_event = threading.Event()
+        threading.Timer(0.3, cancel_event.set).start()
+
+        with self.assertRaises(JobCancelledError):
+            FfmpegRunner(cancel_poll_seconds=0.05).run_blocking(self._fake_ffmpeg(pause=5), cancel_event=cancel_event)
+
+    def test_piped_output_is_streamed_next_to_progress(self):
+        path = os.path.join(self.tmp_dir.name, "ffmpeg")
+        with open(path, "w") as f:
+            f.write(FAKE_PIPING_FFMPEG.format(python=sys.executable))
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        buffer, events = PcmBuffer(expected_samples=1500), []
+
+        # odd chunk sizes split samples across chunks
+        runner = FfmpegRunner()
+        runner.OUTPUT_CHUNK_BYTES = 999
+        runner.run_blocking([path, "-i", "in.mp3", "pipe:"], duration=4.0, on_progress=events.append, on_output=buffer.write)
+
+        samples = buffer.array()
+        self.assertEqual(samples.size, 4000)
+        self.assertEqual(samples[::1000].tolist(), [0.0, 1.0, 2.0, 3.0])
+        self.assertEqual([e.percent for e in events], [25.0, 50.0, 75.0, 100.0])
+
+    def test_decode_audio_runs_through_the_runner(self):
+        pcm = np.arange(6, dtype=np.float32).tobytes()
+        runner = Mock()
+        # a sample split across two chunks
+        runner.run_blocking.side_effect = lambda cmd, on_output, **kwargs: [on_output(pcm[:10]), on_output(pcm[10:])]
+        cancellation = CancellationRegistry()
+        job = TranscriptionJob(job_id="job_x", video_storage_path="uploads/a.mp3", input_language="english",
+                               target_languages=[], media_info=MediaInfo(format_name="mp3", duration=2.0))
+        cancellation.register(job.id)
+
+        samples = FfmpegUtils(job_service=Mock(), runner=runner, cancellation=cancellation).decode_audio("a.mp3", job=job)
+
+        self.assertEqual(samples.tolist(), [0.0, 1.0, 2.0, 3.0, 4.0, 5.0])
+        kwargs = runner.run_blocking.call_args.kwargs
+        self.assertIs(kwargs["cancel_event"], cancellation.event(job.id))
+        self.assertEqual(kwargs["duration"], 2.0)
+        self.assertIn("pipe:", runner.run_blocking.call_args.args[0])
+
+    def test_parse_progress_without_duration(self):
+        progress = parse_progress_block({"out_time_us": "1500000", "speed": "N/A", "progress": "continue"}, None)
+
+        self.assertEqual(progress.out_time, 1.5)
+        self.assertIsNone(progress.percent)
+        self.assertIsNone(progress.speed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,398 @@
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from app.models.media_info import MediaInfo
+from app.models.transcription import Transcription
+from app.models.transcription_job import TranscriptionJob
+from app.repositories.chunk_store import ChunkStore
+from app.repositories.transcription_repository import TranscriptionRepository
+from app.services.model_services.transcription_services import TranscriptionServices
+from app.services.pipeline_services.integration_service import IntegrationService, current_worker
+from app.services.pipeline_services.media_inspection_service import MediaInspector, UnusableMediaError
+from app.services.pipeline_services.job_cancellation import CancellationRegistry, JobCancelledError
+
+
+class TestIntegrationService(unittest.TestCase):
+
+    def setUp(self):
+        self.job = TranscriptionJob(
+            job_id="job_814bdfe3e0b640779939d0522aa08a0e",
+            video_storage_path="app/tests/test_data/videos/news_french.mp4",
+            input_language="french",
+            target_languages=["arabic", "english"],
+            processed=True
+        )
+
+        chunks = [{"timestamp": [0.0, 5.0], "text": "Bonjour, bienvenu."}]
+        self.source = Transcription(
+            job_id=self.job.id, original_text="Bonjour, bienvenu.", original_chunks=chunks,
+            input_language="french", tr_text="", tr_chunks=[], target_language="french",
+            filepath="french.vtt"
+        )
+        self.english = Transcription(
+            job_id=self.job.id, original_text="Bonjour, bienvenu.", original_chunks=chunks,
+            input_language="french", tr_text="Hello, welcome.",
+            tr_chunks=[{"timestamp": [0.0, 5.0], "text": "Hello, welcome."}],
+            target_language="english", filepath="english.vtt"
+        )
+
+        self.job_services = Mock()
+        self.job_services.find_one_by_field.return_value = self.job
+        self.transcription_services = Mock()
+        self.transcription_services.find_by_field.return_value = [self.source, self.english]
+
+        self.translator = Mock()
+        self.translator.translate_to_additional_languages.side_effect = lambda transcription, target_languages: [
+            Transcription(
+                job_id=transcription.job_id, original_text=transcription.original_text,
+                original_chunks=transcription.original_chunks, input_language="french",
+                tr_text="hola", tr_chunks=[], target_language=lang
+            )
+            for lang in target_languages
+        ]
+        self.writer = Mock()
+        self.writer.batch_save.side_effect = lambda transcription_list, output_dir: transcription_list
+        self.ffmpeg = Mock()
+        self.ffmpeg.mux_subtitles.side_effect = lambda transcriptions_list, output_dir: self.job
+        self.summarization_model = Mock()
+        self.summarization_model.summarize_languages.side_effect = lambda job, languages: job
+        self.summarization_model.summarize.side_effect = lambda job: job
+        self.asr_model = Mock()
+        self.audio_utils = Mock()
+        self.media_inspector = Mock()
+        self.sharded_transcriber = Mock()
+        self.sharded_transcriber.should_shard.return_value = False
+        self.media_inspector.estimate_processing_seconds.side_effect = MediaInspector.estimate_processing_seconds
+
+        self.service = IntegrationService(
+            ffmpeg=self.ffmpeg,
+            media_inspector=self.media_inspector,
+            audio_utils=self.audio_utils,
+            asr_model=self.asr_model,
+            sharded_transcriber=self.sharded_transcriber,
+            translator=self.translator,
+            writer=self.writer,
+            summarization_model=self.summarization_model,
+            job_services=self.job_services,
+            transcription_services=self.transcription_services,
+            app_config=Mock(TRANSCRIPTIONS_DIR="tr", PROCESSED_VID_DIR="processed", AUDIOS_DIR="audios"),
+            cancellation=CancellationRegistry(),
+            subtitle_renderer=Mock()
+        )
+
+    def test_add_languages_translates_only_new_languages(self):
+        job = self.service.add_languages(job_id=self.job.id, target_languages=["english", "spanish"])
+
+        self.translator.translate_to_additional_languages.assert_called_once_with(
+            transcription=self.source, target_languages=["spanish"]
+        )
+        self.asr_model.transcribe.assert_not_called()
+        self.assertEqual(job.target_languages, ["arabic", "english", "spanish"])
+
+        # all subtitle tracks are remuxed, the summaries only for the new language
+        muxed = self.ffmpeg.mux_subtitles.call_args.kwargs["transcriptions_list"]
+        self.assertEqual([t.target_language for t in muxed], ["french", "english", "spanish"])
+        self.summarization_model.summarize_languages.assert_called_once_with(self.job, ["spanish"])
+
+    def test_add_languages_is_a_noop_for_existing_languages(self):
+        self.service.add_languages(job_id=self.job.id, target_languages=["english"])
+
+        self.translator.translate_to_additional_languages.assert_not_called()
+        self.ffmpeg.mux_subtitles.assert_not_called()
+
+    def test_add_languages_requires_an_existing_job(self):
+        self.job_services.find_one_by_field.return_value = None
+
+        with self.assertRaises(ValueError):
+            self.service.add_languages(job_id="missing", target_languages=["spanish"])
+
+    def test_reprocess_creates_a_new_version_without_extraction(self):
+        self.job.audio_path = "app/tests/test_data/videos/news_french.mp4"  # any existing file
+        self.asr_model.transcribe.return_value = Transcription(
+            job_id=self.job.id, original_text="Bonjour, bienvenue.",
+            original_chunks=[{"timestamp": [0.0, 5.0], "text": "Bonjour, bienvenue."}],
+            input_language="french"
+        )
+        self.translator.retranslate_transcription.side_effect = lambda transcription, previous, target_languages: [transcription]
+
+        job = self.service.reprocess(job_id=self.job.id, asr_model_size="medium")
+
+        self.ffmpeg.extract_audio.assert_not_called()
+        self.assertEqual(self.asr_model.transcribe.call_args.kwargs["model_size"], "medium")
+        self.assertEqual(job.version, 2)
+        self.assertEqual(job.asr_model_size, "medium")
+
+        # previous version's results are handed over for chunk reuse, not deleted
+        kwargs = self.translator.retranslate_transcription.call_args.kwargs
+        self.assertEqual(kwargs["transcription"].version, 2)
+        self.assertEqual(kwargs["previous"], [self.source, self.english])
+
+    def test_reprocess_keeps_version_when_asr_output_is_unchanged(self):
+        self.job.audio_path = "app/tests/test_data/videos/news_french.mp4"
+        self.asr_model.transcribe.return_value = Transcription(
+            job_id=self.job.id, original_text=self.source.original_text,
+            original_chunks=self.source.original_chunks, input_language="french"
+        )
+
+        job = self.service.reprocess(job_id=self.job.id, asr_model_size="medium")
+
+        self.assertEqual(job.version, 1)
+        self.translator.retranslate_transcription.assert_not_called()
+        self.ffmpeg.mux_subtitles.assert_not_called()
+
+    def test_unchanged_asr_output_is_recognized_against_stored_chunks(self):
+        with tempfile.TemporaryDirectory() as root:
+            repository = TranscriptionRepository(
+                db_path=os.path.join(root, "db.json"), chunk_store=ChunkStore(os.path.join(root, "chunks"))
+            )
+            self.addCleanup(repository.close)
+            self.service.transcription_services = TranscriptionServices(repository=repository)
+            stored_chunks = [{"timestamp": (0.0, 5.2), "text": "Bonjour,"}, {"timestamp": (5.2, 7.36), "text": " bienvenu."}]
+            self.service.transcription_services.create(Transcription(
+                job_id=self.job.id, original_text="Bonjour, bienvenu.", original_chunks=stored_chunks,
+                input_language="french", tr_text="", tr_chunks=[], target_language="french", filepath="french.vtt"
+            ))
+
+            self.job.audio_path = "app/tests/test_data/videos/news_french.mp4"
+            # fresh Whisper output: tuple timestamps, the stored ones come back as lists
+            self.asr_model.transcribe.return_value = Transcription(
+                job_id=self.job.id, original_text="Bonjour, bienvenu.", input_language="french",
+                original_chunks=[{"timestamp": (0.0, 5.2), "text": "Bonjour,"}, {"timestamp": (5.2, 7.36), "text": " bienvenu."}]
+            )
+
+            job = self.service.reprocess(job_id=self.job.id, asr_model_size="medium")
+
+            self.assertEqual(job.version, 1)
+            self.translator.retranslate_transcription.assert_not_called()
+
+            # a moved cue is a change
+            self.asr_model.transcribe.return_value.original_chunks[1]["timestamp"] = (5.3, 7.36)
+            self.translator.retranslate_transcription.side_effect = lambda transcription, previous, target_languages: [transcription]
+            self.assertEqual(self.service.reprocess(job_id=self.job.id, asr_model_size="large").version, 2)
+
+    def _audio_only_setup(self):
+        self.job.processed = False
+        self.job.video_storage_path = "uploads/interview.mp3"
+        self.media_inspector.inspect.return_value = MediaInfo(
+            format_name="mp3", duration=60.0, streams=[{"codec_type": "audio", "codec_name": "mp3"}]
+        )
+        self.asr_model.transcribe.return_value = self.source
+        self.translator.translate_transcription_to_multiple_languages.side_effect = lambda transcription: [transcription]
+
+    def test_audio_only_upload_skips_extraction_and_muxing(self):
+        self._audio_only_setup()
+
+        job = self.service.process(job=self.job, asr_model_size="small")
+
+        self.ffmpeg.extract_audio.assert_not_called()
+        self.ffmpeg.mux_subtitles.assert_not_called()
+        self.ffmpeg.decode_audio.assert_called_once_with("uploads/interview.mp3", sampling_rate=16000, job=job)
+        self.audio_utils.from_array.assert_called_once()
+        self.writer.batch_save.assert_called_once()
+        self.summarization_model.summarize.assert_called_once()
+        self.assertTrue(job.audio_only)
+        self.assertTrue(job.processed)
+        self.assertEqual(job.processed_video_path, "")
+        self.assertEqual(job.audio_path, "uploads/interview.mp3")
+
+    def test_pcm_wav_upload_is_read_without_decoding(self):
+        self._audio_only_setup()
+        self.media_inspector.inspect.return_value = MediaInfo(
+            format_name="wav", duration=60.0,
+            streams=[{"codec_type": "audio", "codec_name": "pcm_s16le", "sample_rate": 16000, "channels": 1}]
+        )
+
+        self.service.process(job=self.job, asr_model_size="small")
+
+        self.ffmpeg.decode_audio.assert_not_called()
+        audio = self.audio_utils.load_resample_audio.call_args.kwargs["audio"]
+        self.assertEqual(audio.audio_filepath, "uploads/interview.mp3")
+
+    def test_unusable_media_is_rejected_before_any_work(self):
+        self.media_inspector.inspect.side_effect = UnusableMediaError("no audio stream")
+
+        with self.assertRaises(UnusableMediaError):
+            self.service.process(job=self.job, asr_model_size="small")
+
+        self.ffmpeg.register_job.assert_not_called()
+        self.ffmpeg.extract_audio.assert_not_called()
+        self.asr_model.transcribe.assert_not_called()
+
+    def test_process_records_media_info_stages_and_estimate(self):
+        self._audio_only_setup()
+        stages = []
+        self.job_services.update_by_field.side_effect = lambda field_name, value, entity: stages.append(entity.stage)
+
+        job = self.service.process(job=self.job, asr_model_size="small")
+
+        self.assertEqual(job.media_info.duration, 60.0)
+        self.assertEqual(job.estimated_seconds, MediaInspector.estimate_processing_seconds(job.media_info, "small"))
+        self.assertEqual(stages[0], "transcribing")
+        self.assertEqual(stages[-1], "done")
+        self.assertEqual(job.progress, 1.0)
+
+    def test_long_media_is_transcribed_in_shards(self):
+        self._audio_only_setup()
+        self.sharded_transcriber.should_shard.return_value = True
+        self.sharded_transcriber.transcribe.return_value = self.source
+
+        self.service.process(job=self.job, asr_model_size="small")
+
+        self.sharded_transcriber.transcribe.assert_called_once_with(
+            job=self.job, duration=60.0, model_size="small", media_path="uploads/interview.mp3"
+        )
+        self.asr_model.transcribe.assert_not_called()
+        self.writer.batch_save.assert_called_once()
+
+    def test_cancelled_job_stops_at_the_next_stage(self):
+        self._audio_only_setup()
+
+        def transcribe(**kwargs):
+            self.assertTrue(self.service.cancel(self.job.id))
+            return self.source
+        self.asr_model.transcribe.side_effect = transcribe
+
+        with self.assertRaises(JobCancelledError):
+            self.service.process(job=self.job, asr_model_size="small")
+
+        self.translator.translate_transcription_to_multiple_languages.assert_not_called()
+        self.assertEqual(self.job.stage, "cancelled")
+        self.assertEqual(self.job.progress, IntegrationService.STAGES["transcribing"])
+        self.assertFalse(self.service.cancel(self.job.id))
+
+    def test_sidecar_delivery_skips_muxing(self):
+        self._audio_only_setup()
+        self.media_inspector.inspect.return_value = MediaInfo(
+            format_name="mp4", duration=60.0, streams=[{"codec_type": "video"}, {"codec_type": "audio"}]
+        )
+        self.job.delivery_mode = "sidecar"
+
+        job = self.service.process(job=self.job, asr_model_size="small")
+
+        self.ffmpeg.extract_audio.assert_called_once()
+        self.ffmpeg.mux_subtitles.assert_not_called()
+        self.assertTrue(job.processed)
+        self.assertEqual(job.processed_video_path, "")
+
+    def test_remux_on_request_uses_current_tracks(self):
+        self.job.delivery_mode = "sidecar"
+
+        self.service.remux(job_id=self.job.id)
+
+        muxed = self.ffmpeg.mux_subtitles.call_args.kwargs["transcriptions_list"]
+        self.assertEqual([t.target_language for t in muxed], ["french", "english"])
+
+    def test_add_languages_does_not_remux_audio_only_jobs(self):
+        self.job.audio_only = True
+
+        self.service.add_languages(job_id=self.job.id, target_languages=["spanish"])
+
+        self.ffmpeg.mux_subtitles.assert_not_called()
+        self.summarization_model.summarize_languages.assert_called_once_with(self.job, ["spanish"])
+
+    def test_reprocess_can_be_cancelled(self):
+        self.job.audio_path = "app/tests/test_data/videos/news_french.mp4"
+
+        def transcribe(**kwargs):
+            self.assertTrue(self.service.cancel(self.job.id))
+            return Transcription(job_id=self.job.id, original_text="Bonjour.", original_chunks=[], input_language="french")
+        self.asr_model.transcribe.side_effect = transcribe
+
+        with self.assertRaises(JobCancelledError):
+            self.service.reprocess(job_id=self.job.id, asr_model_size="medium")
+
+        self.translator.retranslate_transcription.assert_not_called()
+        self.assertEqual(self.job.stage, "cancelled")
+        self.assertFalse(self.service.cancel(self.job.id))
+
+    def test_add_languages_and_remux_register_for_cancellation(self):
+        def translate(transcription, target_languages):
+            # a second operation on the running job is refused
+            with self.assertRaises(ValueError):
+                self.service.remux(job_id=self.job.id)
+            self.assertTrue(self.service.cancel(self.job.id))
+            return []
+        self.translator.translate_to_additional_languages.side_effect = translate
+
+        with self.assertRaises(JobCancelledError):
+            self.service.add_languages(job_id=self.job.id, target_languages=["spanish"])
+        self.writer.batch_save.assert_not_called()
+        self.assertEqual(self.job.stage, "cancelled")
+
+        # the mux run is given the remux's cancellation event
+        def mux(transcriptions_list, output_dir):
+            self.assertTrue(self.service.cancellation.is_running(self.job.id))
+            return self.job
+        self.ffmpeg.mux_subtitles.side_effect = mux
+        self.service.remux(job_id=self.job.id)
+        self.assertEqual(self.job.stage, "done")
+        self.assertFalse(self.service.cancellation.is_running(self.job.id))
+
+    def test_submit_records_the_queued_job_before_it_runs(self):
+        self._audio_only_setup()
+        self.job.target_languages = ["arabic"]
+
+        job = self.service.submit(job=self.job, asr_model_size="small")
+
+        self.assertEqual(job.stage, "queued")
+        self.ffmpeg.register_job.assert_called_once_with(self.job)
+        self.asr_model.transcribe.assert_not_called()
+
+        # cancelled while queued: the pipeline does not start
+        self.assertTrue(self.service.cancel(job.id))
+        with self.assertRaises(JobCancelledError):
+            self.service.execute(job)
+        self.audio_utils.from_array.assert_not_called()
+        self.assertEqual(job.stage, "cancelled")
+
+    def test_job_is_registered_once(self):
+        self._audio_only_setup()
+        self.media_inspector.inspect.return_value = MediaInfo(
+            format_name="mp4", duration=60.0, streams=[{"codec_type": "video"}, {"codec_type": "audio"}]
+        )
+
+        self.service.process(job=self.job, asr_model_size="small")
+
+        self.ffmpeg.extract_audio.assert_called_once()
+        self.ffmpeg.register_job.assert_called_once()
+
+    def test_recover_jobs_after_a_restart(self):
+        # a process that has exited, its jobs are settled at startup
+        exited = subprocess.Popen([sys.executable, "-c", ""])
+        exited.wait()
+        stopped = f"{socket.gethostname()}:{exited.pid}"
+        media_info = MediaInfo(format_name="mp4", duration=60.0, streams=[{"codec_type": "audio"}])
+
+        def job(job_id, stage, worker, **fields):
+            return TranscriptionJob(job_id=job_id, video_storage_path="upload.mp4", input_language="french",
+                                    target_languages=["english"], stage=stage, worker=worker, **fields)
+
+        queued = job("queued", "queued", stopped, media_info=media_info, asr_model_size="small")
+        legacy = job("legacy", "queued", None)
+        interrupted = job("interrupted", "transcribing", stopped)
+        running = job("running", "translating", current_worker())
+        done = job("done", "done", stopped, processed=True)
+        self.job_services.find_all.return_value = [queued, legacy, interrupted, running, done]
+
+        self.assertEqual(self.service.recover_jobs(), [queued])
+
+        self.assertEqual(queued.stage, "queued")
+        self.assertEqual(queued.worker, current_worker())
+        self.assertTrue(self.service.cancel(queued.id))
+        # queued without the inspection results (older records) cannot run again
+        self.assertEqual(legacy.stage, "failed")
+        self.assertEqual(interrupted.stage, "failed")
+        # jobs of a running process and settled jobs are left alone
+        self.assertEqual(running.stage, "translating")
+        self.assertEqual(done.stage, "done")
+        updated = [call.kwargs["value"] for call in self.job_services.update_by_field.call_args_list]
+        self.assertEqual(sorted(updated), ["interrupted", "legacy", "queued"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import threading
+import time
+import unittest
+
+from app.models.transcription_job import TranscriptionJob
+from app.services.pipeline_services.job_scheduler import JobScheduler
+
+
+def make_job(job_id: str, estimated_seconds: float) -> TranscriptionJob:
+    return TranscriptionJob(video_storage_path="", input_language="english", target_languages=["french"],
+                            job_id=job_id, estimated_seconds=estimated_seconds)
+
+
+class TestJobScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.started = []
+        self.release = threading.Event()
+        self.done = threading.Semaphore(0)
+
+    def _run(self, job):
+        self.started.append(job.id)
+        self.release.wait(5)
+        self.done.release()
+        if job.id == "job_failing":
+            raise RuntimeError("pipeline failure")
+
+    def _wait(self, count):
+        for _ in range(count):
+            self.assertTrue(self.done.acquire(timeout=5))
+
+    def test_shortest_estimate_starts_first(self):
+        scheduler = JobScheduler(run=self._run, max_workers=1, aging_factor=0.0)
+        scheduler.submit(make_job("job_blocking", 1.0))
+        while not self.started:
+            time.sleep(0.01)
+
+        for job_id, estimate in (("job_long", 600.0), ("job_short", 30.0), ("job_medium", 120.0)):
+            scheduler.submit(make_job(job_id, estimate))
+        self.assertEqual(scheduler.queue_position("job_short"), 0)
+        self.assertEqual(scheduler.queue_position("job_long"), 2)
+        self.assertIsNone(scheduler.queue_position("job_blocking"))
+        self.assertEqual(scheduler.stats()["queued"], 3)
+
+        self.release.set()
+        self._wait(4)
+        self.assertEqual(self.started, ["job_blocking", "job_short", "job_medium", "job_long"])
+        scheduler.stop(timeout=5)
+
+    def test_waiting_jobs_move_up(self):
+        scheduler = JobScheduler(run=self._run, max_workers=1, aging_factor=1000.0)
+        scheduler.submit(make_job("job_blocking", 1.0))
+        while not self.started:
+            time.sleep(0.01)
+
+        scheduler.submit(make_job("job_long", 60.0))
+        time.sleep(0.1)
+        # queued 0.1 s earlier, worth 100 estimated seconds
+        scheduler.submit(make_job("job_short", 1.0))
+
+        self.release.set()
+        self._wait(3)
+        self.assertEqual(self.started, ["job_blocking", "job_long", "job_short"])
+        scheduler.stop(timeout=5)
+
+    def test_failing_job_does_not_stop_the_worker(self):
+        scheduler = JobScheduler(run=self._run, max_workers=1)
+        self.release.set()
+        scheduler.submit(make_job("job_failing", 1.0))
+        scheduler.submit(make_job("job_next", 1.0))
+
+        self._wait(2)
+        self.assertEqual(self.started, ["job_failing", "job_next"])
+        scheduler.stop(timeout=5)
+
+        with self.assertRaises(RuntimeError):
+            scheduler.submit(make_job("job_late", 1.0))
+
+        scheduler.start()
+        scheduler.submit(make_job("job_late", 1.0))
+        self._wait(1)
+        self.assertEqual(self.started[-1], "job_late")
+        scheduler.stop(timeout=5)
+
+
+if __name__ == "__main__":
+    unittest.main()
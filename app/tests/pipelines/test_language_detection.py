@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import Mock, patch
+
+import numpy as np
+import torch
+
+from app.services.pipeline_services.audio_service import AudioUtils
+from app.services.pipeline_services.transcription_service import ASRModel
+
+
+class TestLanguageDetection(unittest.TestCase):
+
+    def setUp(self):
+        self.asr_model = ASRModel(language_detection_windows=1)
+
+        pipeline = Mock()
+        pipeline.feature_extractor.side_effect = lambda windows, sampling_rate, return_tensors: Mock(
+            input_features=torch.zeros(len(windows), 80, 3000)
+        )
+        pipeline.model.detect_language.side_effect = lambda features: torch.tensor([50265] * features.shape[0])
+        pipeline.tokenizer.convert_ids_to_tokens.side_effect = lambda ids: ["<|fr|>" for _ in ids]
+        self.pipeline = pipeline
+        self.asr_model.pipeline = pipeline
+
+    def _audio(self) -> AudioUtils:
+        # 90 s of audio where only the second 30 s window carries signal
+        array = np.zeros(90 * 16_000, dtype=np.float32)
+        array[30 * 16_000:60 * 16_000] = 0.5
+        return AudioUtils(array=array, sampling_rate=16_000, language="auto", job_id="job_x")
+
+    @patch.object(ASRModel, "load")
+    def test_detects_language_from_the_loudest_window(self, _load):
+        audio = self._audio()
+
+        language = self.asr_model.detect_language(audio=audio, model_size="tiny")
+
+        self.assertEqual(language, "french")
+        windows = self.pipeline.feature_extractor.call_args[0][0]
+        self.assertEqual(len(windows), 1)
+        self.assertTrue(np.all(windows[0] == 0.5))
+
+    @patch.object(ASRModel, "load")
+    def test_detection_is_cached_per_audio_fingerprint(self, _load):
+        self.asr_model.detect_language(audio=self._audio(), model_size="tiny")
+        self.asr_model.detect_language(audio=self._audio(), model_size="tiny")
+
+        self.assertEqual(self.pipeline.model.detect_language.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+from app.models.media_info import MediaInfo
+from app.models.transcription_job import TranscriptionJob
+from app.services.pipeline_services.manifest_service import ManifestBuilder
+
+
+class TestManifestBuilder(unittest.TestCase):
+
+    def setUp(self):
+        self.job = TranscriptionJob(
+            job_id="job_x",
+            video_storage_path="uploads/news.mp4",
+            input_language="french",
+            target_languages=["arabic", "english"],
+            processed=True,
+            media_info=MediaInfo(format_name="mp4", duration=125.4, bit_rate=2_000_000),
+            delivery_mode="sidecar"
+        )
+        self.tracks = ["french", "arabic", "english"]
+        self.builder = ManifestBuilder()
+
+    def test_manifest_lists_source_video_and_tracks(self):
+        urls = {"video": "http://h/v"}
+        urls.update({f"subtitles:{language}": f"http://h/{language}" for language in self.tracks})
+
+        manifest = self.builder.build_manifest(self.job, self.tracks, urls)
+
+        self.assertEqual(manifest["video"]["media_type"], "video/mp4")
+        self.assertEqual(manifest["video"]["delivery"], "progressive")
+        # no HLS master: without a video variant it would not be a valid one
+        self.assertNotIn("hls", manifest)
+        self.assertEqual(manifest["duration"], 125.4)
+        self.assertEqual([s["srclang"] for s in manifest["subtitles"]], ["fr", "ar", "en"])
+        # the first requested target language is the default track
+        self.assertEqual([s["language"] for s in manifest["subtitles"] if s["default"]], ["arabic"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.models.media_info import MediaInfo
+from app.services.pipeline_services.media_inspection_service import MediaInspector, UnusableMediaError
+
+
+VIDEO_PROBE = {
+    "format": {"format_name": "mov,mp4,m4a,3gp,3g2,mj2", "duration": "12.5", "size": "2048", "bit_rate": "1310"},
+    "streams": [
+        {"index": 0, "codec_type": "video", "codec_name": "h264", "width": 1280, "height": 720},
+        {"index": 1, "codec_type": "audio", "codec_name": "aac", "sample_rate": "44100", "channels": 2},
+    ],
+}
+
+COVER_ART_PROBE = {
+    "format": {"format_name": "mp3", "duration": "200.0"},
+    "streams": [
+        {"index": 0, "codec_type": "audio", "codec_name": "mp3", "sample_rate": "44100", "channels": 2},
+        {"index": 1, "codec_type": "video", "codec_name": "mjpeg", "disposition": {"attached_pic": 1}},
+    ],
+}
+
+
+class TestMediaInfo(unittest.TestCase):
+
+    def test_from_probe_keeps_layout_and_codecs(self):
+        media_info = MediaInfo.from_probe(VIDEO_PROBE)
+
+        self.assertEqual(media_info.duration, 12.5)
+        self.assertEqual(media_info.size_bytes, 2048)
+        self.assertEqual((media_info.video_codec, media_info.audio_codec), ("h264", "aac"))
+        self.assertEqual(media_info.audio_streams[0]["sample_rate"], 44100)
+        self.assertTrue(media_info.has_video)
+
+    def test_cover_art_is_not_a_video_stream(self):
+        media_info = MediaInfo.from_probe(COVER_ART_PROBE)
+
+        self.assertFalse(media_info.has_video)
+        self.assertTrue(media_info.has_audio)
+
+
+class TestMediaInspector(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".mp4")
+        os.close(handle)
+        self.inspector = MediaInspector(max_duration_seconds=60)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    @patch("app.services.pipeline_services.media_inspection_service.ffmpeg.probe", return_value=VIDEO_PROBE)
+    def test_probe_runs_once_per_file(self, probe):
+        self.inspector.inspect(self.path)
+        self.inspector.inspect(self.path)
+
+        self.assertEqual(probe.call_count, 1)
+
+    @patch("app.services.pipeline_services.media_inspection_service.ffmpeg.probe", return_value=VIDEO_PROBE)
+    def test_modified_file_is_probed_again(self, probe):
+        self.inspector.inspect(self.path)
+        with open(self.path, "wb") as f:
+            f.write(b"changed")
+        self.inspector.inspect(self.path)
+
+        self.assertEqual(probe.call_count, 2)
+
+    def test_media_without_audio_is_rejected(self):
+        silent = {"format": {"format_name": "mp4", "duration": "10"}, "streams": [{"codec_type": "video"}]}
+
+        with patch("app.services.pipeline_services.media_inspection_service.ffmpeg.probe", return_value=silent):
+            with self.assertRaises(UnusableMediaError):
+                self.inspector.inspect(self.path)
+
+    def test_zero_duration_and_too_long_media_are_rejected(self):
+        with self.assertRaises(UnusableMediaError):
+            self.inspector.validate(MediaInfo(format_name="wav", duration=0.0, streams=[{"codec_type": "audio"}]))
+        with self.assertRaises(UnusableMediaError):
+            self.inspector.validate(MediaInfo(format_name="wav", duration=61.0, streams=[{"codec_type": "audio"}]))
+
+    def test_estimate_grows_with_duration_and_model_size(self):
+        short = MediaInfo(duration=60.0)
+        long = MediaInfo(duration=600.0)
+
+        self.assertLess(
+            MediaInspector.estimate_processing_seconds(short, "small"),
+            MediaInspector.estimate_processing_seconds(long, "small")
+        )
+        self.assertLess(
+            MediaInspector.estimate_processing_seconds(long, "tiny"),
+            MediaInspector.estimate_processing_seconds(long, "large")
+        )
+        self.assertIsNone(MediaInspector.estimate_processing_seconds(None, "small"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,243 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import Mock
+
+from app.models.transcription import Transcription
+from app.models.transcription_job import TranscriptionJob
+from app.repositories.chunk_store import ChunkStore
+from app.repositories.transcription_job_repository import TranscriptionJobRepository
+from app.repositories.transcription_repository import TranscriptionRepository
+from app.services.model_services.transcription_job_services import TranscriptionJobServices
+from app.services.model_services.transcription_services import TranscriptionServices
+from app.services.pipeline_services.integration_service import IntegrationService
+from app.services.pipeline_services.job_cancellation import CancellationRegistry
+from app.services.pipeline_services.retention_service import ArtifactDirectory, RetentionService
+
+KB = 1024
+HOUR = 3600
+
+
+class TestRetentionService(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.dirs = {}
+        for name in ("uploads", "audios", "processed_videos", "transcriptions"):
+            self.dirs[name] = os.path.join(self.root, name)
+            os.makedirs(self.dirs[name])
+
+        self.job_repository = TranscriptionJobRepository(db_path=os.path.join(self.root, "db.json"))
+        self.transcription_repository = TranscriptionRepository(db_path=os.path.join(self.root, "db.json"))
+        self.job_services = TranscriptionJobServices(repository=self.job_repository)
+        self.transcription_services = TranscriptionServices(repository=self.transcription_repository)
+
+    def tearDown(self):
+        self.job_repository.close()
+        self.transcription_repository.close()
+
+    def _service(self, uploads_quota=0, transcriptions_quota=0, **kwargs) -> RetentionService:
+        return RetentionService(
+            job_services=self.job_services,
+            transcription_services=self.transcription_services,
+            directories=[
+                ArtifactDirectory("uploads", self.dirs["uploads"], uploads_quota),
+                ArtifactDirectory("audios", self.dirs["audios"]),
+                ArtifactDirectory("processed_videos", self.dirs["processed_videos"]),
+                ArtifactDirectory("transcriptions", self.dirs["transcriptions"], transcriptions_quota),
+            ],
+            **kwargs
+        )
+
+    def _file(self, directory: str, name: str, size: int, hours_ago: float = 2) -> str:
+        path = os.path.join(self.dirs[directory], name)
+        with open(path, "wb") as f:
+            f.write(b"\0" * size)
+        used = time.time() - hours_ago * HOUR
+        os.utime(path, (used, used))
+        return path
+
+    def _job(self, job_id: str, upload: str, stage: str = "done", **kwargs) -> TranscriptionJob:
+        job = TranscriptionJob(job_id=job_id, video_storage_path=upload, input_language="english",
+                               target_languages=["french"], stage=stage, **kwargs)
+        self.job_services.create(job)
+        return job
+
+    def _job_record(self, job_id: str) -> TranscriptionJob:
+        return self.job_services.find_one_by_field("job_id", job_id)
+
+    def test_dry_run_reports_without_deleting(self):
+        old = self._file("uploads", "old.mp4", 40 * KB, hours_ago=10)
+        new = self._file("uploads", "new.mp4", 40 * KB, hours_ago=2)
+        self._job("job_old", old)
+        self._job("job_new", new)
+
+        report = self._service(uploads_quota=50 * KB).run(dry_run=True)
+
+        self.assertTrue(report["dry_run"])
+        self.assertEqual([d["path"] for d in report["deletions"]], [os.path.abspath(old)])
+        self.assertEqual(report["directories"]["uploads"]["usage_bytes"], 80 * KB)
+        self.assertEqual(report["directories"]["uploads"]["usage_after_bytes"], 40 * KB)
+        self.assertTrue(os.path.exists(old))
+        self.assertEqual(self._job_record("job_old").video_storage_path, old)
+
+    def test_orphans_go_first_then_least_recently_used_jobs(self):
+        orphan = self._file("uploads", "orphan.mp4", 10 * KB, hours_ago=2)
+        oldest = self._file("uploads", "oldest.mp4", 30 * KB, hours_ago=30)
+        older = self._file("uploads", "older.mp4", 30 * KB, hours_ago=20)
+        recent = self._file("uploads", "recent.mp4", 30 * KB, hours_ago=3)
+        self._job("job_oldest", oldest)
+        self._job("job_older", older)
+        self._job("job_recent", recent)
+
+        service = self._service(uploads_quota=60 * KB)
+        report = service.run()
+
+        self.assertEqual([(d["reason"], d["job_id"]) for d in report["deletions"]],
+                         [("orphan", None), ("quota", "job_oldest")])
+        self.assertEqual(report["freed_bytes"], 40 * KB)
+        self.assertFalse(os.path.exists(orphan) or os.path.exists(oldest))
+        self.assertTrue(os.path.exists(older) and os.path.exists(recent))
+        self.assertIs(service.last_report, report)
+
+        # the record no longer points at the deleted upload
+        self.assertEqual(self._job_record("job_oldest").video_storage_path, "")
+        self.assertEqual(self._job_record("job_older").video_storage_path, older)
+
+    def test_running_jobs_and_young_files_are_kept(self):
+        running = self._file("uploads", "running.mp4", 40 * KB, hours_ago=30)
+        young = self._file("uploads", "young.mp4", 40 * KB, hours_ago=0)
+        self._job("job_running", running, stage="transcribing")
+
+        report = self._service(uploads_quota=10 * KB).run()
+
+        self.assertEqual(report["deletions"], [])
+        self.assertTrue(os.path.exists(running) and os.path.exists(young))
+
+    def test_shared_upload_is_kept_while_one_of_its_jobs_runs(self):
+        shared = self._file("uploads", "shared.mp4", 40 * KB, hours_ago=30)
+        self._job("job_done", shared)
+        self._job("job_running", shared, stage="transcribing")
+
+        report = self._service(uploads_quota=10 * KB).run()
+        self.assertEqual(report["deletions"], [])
+
+        self.job_services.update_by_field("job_id", "job_running", TranscriptionJob(
+            job_id="job_running", video_storage_path=shared, input_language="english",
+            target_languages=["french"], stage="done"
+        ))
+        report = self._service(uploads_quota=10 * KB).run()
+
+        self.assertEqual(len(report["deletions"]), 1)
+        # both records are cleared
+        self.assertEqual(self._job_record("job_done").video_storage_path, "")
+        self.assertEqual(self._job_record("job_running").video_storage_path, "")
+
+    def test_only_subtitles_of_previous_versions_are_deleted(self):
+        upload = self._file("uploads", "video.mp4", 10 * KB)
+        self._job("job_1", upload, version=2)
+        files = {}
+        for version in (1, 2):
+            files[version] = self._file("transcriptions", f"v{version}.vtt", 20 * KB, hours_ago=10)
+            self._file("transcriptions", f"v{version}.srt", 20 * KB, hours_ago=10)
+            self.transcription_services.create(Transcription(
+                original_text="hello", job_id="job_1", original_chunks=[], input_language="english",
+                target_language="french", filepath=files[version], version=version,
+                transcription_id=f"transcription_v{version}"
+            ))
+
+        report = self._service(transcriptions_quota=10 * KB).run()
+
+        self.assertEqual(sorted(os.path.basename(d["path"]) for d in report["deletions"]), ["v1.srt", "v1.vtt"])
+        self.assertTrue(os.path.exists(files[2]))
+        old = self.transcription_services.find_one_by_field("transcription_id", "transcription_v1")
+        current = self.transcription_services.find_one_by_field("transcription_id", "transcription_v2")
+        self.assertEqual(old.filepath, "")
+        self.assertEqual(current.filepath, files[2])
+
+    def test_only_unreferenced_chunk_lists_are_deleted(self):
+        chunk_store = ChunkStore(os.path.join(self.root, "chunks"))
+        self.transcription_repository.chunk_store = chunk_store
+        self._job("job_1", self._file("uploads", "clip.mp4", KB))
+        self.transcription_services.create(Transcription(
+            original_text="Hello", job_id="job_1", original_chunks=[{"timestamp": [0.0, 1.0], "text": "Hello"}],
+            input_language="english", tr_text="Bonjour", target_language="french",
+            tr_chunks=[{"timestamp": [0.0, 1.0], "text": "Bonjour"}]
+        ))
+        orphan = chunk_store.path(chunk_store.save(ChunkStore.make_ref("job_gone", 1, "english"), [{"timestamp": [0.0, 1.0], "text": "Hi"}]))
+        for path in [orphan] + [chunk_store.path(ChunkStore.make_ref("job_1", 1, language)) for language in ("english", "french")]:
+            os.utime(path, (time.time() - 2 * HOUR, time.time() - 2 * HOUR))
+
+        service = self._service(chunk_store=chunk_store)
+        service.directories["chunks"] = ArtifactDirectory("chunks", chunk_store.root_dir, 1)
+        report = service.run()
+
+        self.assertEqual([(d["path"], d["reason"]) for d in report["deletions"]], [(os.path.abspath(orphan), "orphan")])
+        found = self.transcription_services.find_one_by_field("job_id", "job_1")
+        self.assertEqual(found.translated_chunks, [{"timestamp": [0.0, 1.0], "text": "Bonjour"}])
+
+    def test_release_audio_deletes_only_extracted_audio(self):
+        upload = self._file("uploads", "video.mp4", 10 * KB)
+        audio = self._file("audios", "video.wav", 10 * KB)
+        job = self._job("job_1", upload, stage="transcribing", audio_path=audio)
+
+        self.assertTrue(self._service().release_audio(job))
+        self.assertFalse(os.path.exists(audio))
+        self.assertEqual(self._job_record("job_1").audio_path, "")
+
+        # an audio-only upload is its own audio
+        audio_only = self._job("job_2", upload, audio_path=upload, audio_only=True)
+        self.assertFalse(self._service().release_audio(audio_only))
+        self.assertTrue(os.path.exists(upload))
+
+        job = self._job("job_3", upload, audio_path=self._file("audios", "kept.wav", 10 * KB))
+        self.assertFalse(self._service(delete_audio_after_asr=False).release_audio(job))
+        self.assertTrue(os.path.exists(job.audio_path))
+
+    def test_files_of_a_job_being_reprocessed_are_kept(self):
+        upload = self._file("uploads", "video.mp4", 40 * KB, hours_ago=30)
+        audio = self._file("audios", "video.wav", 40 * KB, hours_ago=30)
+        self._job("job_1", upload, audio_path=audio)
+        service = self._service(uploads_quota=10 * KB)
+
+        reports = []
+        asr_model = Mock()
+
+        def transcribe(**kwargs):
+            # a retention run while the job's audio is being transcribed
+            reports.append(service.run())
+            return Transcription(original_text="hello", job_id="job_1", original_chunks=[],
+                                 input_language="english", target_language="english")
+        asr_model.transcribe.side_effect = transcribe
+        translator = Mock()
+        translator.retranslate_transcription.side_effect = lambda transcription, previous, target_languages: [transcription]
+        writer = Mock()
+        writer.batch_save.side_effect = lambda transcription_list, output_dir: transcription_list
+        summarization_model = Mock()
+        summarization_model.summarize.side_effect = lambda job: job
+
+        integration = IntegrationService(
+            ffmpeg=Mock(), media_inspector=Mock(), audio_utils=Mock(), asr_model=asr_model,
+            sharded_transcriber=Mock(), translator=translator, writer=writer,
+            summarization_model=summarization_model, job_services=self.job_services,
+            transcription_services=self.transcription_services,
+            app_config=Mock(TRANSCRIPTIONS_DIR=self.dirs["transcriptions"], AUDIOS_DIR=self.dirs["audios"]),
+            cancellation=CancellationRegistry(), subtitle_renderer=Mock()
+        )
+        integration._deliver = lambda job, transcriptions: job
+
+        job = integration.reprocess(job_id="job_1", asr_model_size="medium")
+
+        self.assertEqual(reports[0]["deletions"], [])
+        self.assertTrue(os.path.exists(upload) and os.path.exists(audio))
+        self.assertEqual(job.version, 2)
+        self.assertEqual(self._job_record("job_1").stage, "done")
+
+        # once settled again, the job's files are evictable
+        self.assertEqual(len(service.run()["deletions"]), 1)
+        self.assertFalse(os.path.exists(upload))
+
+
+if __name__ == "__main__":
+    unittest.main()
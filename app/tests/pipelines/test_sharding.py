@@ -0,0 +1,102 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from app.models.transcription_job import TranscriptionJob
+from app.services.pipeline_services import sharding_service
+from app.services.pipeline_services.sharding_service import ShardedTranscriber, plan_shards, stitch_shard_chunks
+
+
+class TestShardPlanning(unittest.TestCase):
+
+    def test_shards_cover_the_whole_duration_with_overlap(self):
+        shards = plan_shards(duration=3600, max_shards=4, min_shard_seconds=300, overlap_seconds=5)
+
+        self.assertEqual(len(shards), 4)
+        self.assertEqual((shards[0].start, shards[-1].end), (0, 3600))
+        for previous, current in zip(shards, shards[1:]):
+            self.assertEqual(previous.end, current.start)
+            self.assertEqual(current.extract_start, current.start - 5)
+            self.assertEqual(previous.extract_end, previous.end + 5)
+        self.assertEqual(shards[0].extract_start, 0.0)
+        self.assertEqual(shards[-1].extract_end, 3600)
+
+    def test_short_media_gets_fewer_shards(self):
+        self.assertEqual(len(plan_shards(duration=700, max_shards=8, min_shard_seconds=300, overlap_seconds=5)), 2)
+        self.assertEqual(len(plan_shards(duration=100, max_shards=8, min_shard_seconds=300, overlap_seconds=5)), 1)
+
+    def test_should_shard(self):
+        transcriber = ShardedTranscriber(max_workers=4, min_shard_seconds=300)
+
+        self.assertFalse(transcriber.should_shard(500))
+        self.assertTrue(transcriber.should_shard(7200))
+        self.assertFalse(ShardedTranscriber(max_workers=1).should_shard(7200))
+
+
+class TestShardStitching(unittest.TestCase):
+
+    def test_overlap_is_kept_once_and_timestamps_are_absolute(self):
+        shards = plan_shards(duration=20, max_shards=2, min_shard_seconds=10, overlap_seconds=2)
+        # shard 0 decodes 0-12 s, shard 1 decodes 8-20 s; both hear the words around 10 s
+        first = [
+            {"timestamp": (0.0, 4.0), "text": "one"},
+            {"timestamp": (4.0, 9.5), "text": "two"},
+            {"timestamp": (9.5, 11.8), "text": "three"},
+        ]
+        second = [
+            {"timestamp": (0.0, 1.5), "text": "two"},
+            {"timestamp": (1.5, 3.8), "text": "three"},
+            {"timestamp": (3.8, None), "text": "four"},
+        ]
+
+        merged = stitch_shard_chunks(shards, [first, second])
+
+        self.assertEqual([chunk["text"] for chunk in merged], ["one", "two", "three", "four"])
+        self.assertEqual(merged[2]["timestamp"], (9.5, 11.8))
+        self.assertEqual(merged[3]["timestamp"], (11.8, 20.0))
+
+
+class TestShardedTranscription(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(self.executor.shutdown)
+        self.transcriber = ShardedTranscriber(max_workers=2, min_shard_seconds=300, executor=self.executor)
+        self.shard_languages = []
+
+    def _transcribe_shard(self, media_path, shard, model_size, language, work_dir):
+        self.shard_languages.append(language)
+        # a music-only shard would have been identified as another language on its own
+        return "text", [{"timestamp": (0.0, 2.0), "text": f"shard {shard.index}"}], language
+
+    def test_language_is_detected_once_for_all_shards(self):
+        job = TranscriptionJob(video_storage_path="uploads/long.mp4", input_language="auto", target_languages=["french"])
+
+        with patch.object(sharding_service, "_detect_language", return_value="german") as detect, \
+                patch.object(sharding_service, "_transcribe_shard", side_effect=self._transcribe_shard):
+            transcription = self.transcriber.transcribe(job=job, duration=1200, model_size="small", media_path="/data/long.mp4")
+
+        detect.assert_called_once()
+        media_path, sample_starts = detect.call_args.args[:2]
+        self.assertEqual(media_path, "/data/long.mp4")
+        # one 30 s sample in the middle of each shard
+        self.assertEqual(sample_starts, [285.0, 885.0])
+        self.assertEqual(self.shard_languages, ["german", "german"])
+        self.assertEqual(transcription.input_language, "german")
+
+    def test_pool_is_kept_between_jobs(self):
+        job = TranscriptionJob(video_storage_path="uploads/long.mp4", input_language="english", target_languages=["french"])
+
+        with patch.object(sharding_service, "_detect_language") as detect, \
+                patch.object(sharding_service, "_transcribe_shard", side_effect=self._transcribe_shard):
+            self.transcriber.transcribe(job=job, duration=1200, model_size="small")
+            self.assertIs(self.transcriber._pool(), self.executor)
+            self.transcriber.transcribe(job=job, duration=1200, model_size="small")
+
+        detect.assert_not_called()
+        self.assertEqual(self.shard_languages, ["english"] * 4)
+        self.assertIs(self.transcriber._pool(), self.executor)
+
+
+if __name__ == "__main__":
+    unittest.main()
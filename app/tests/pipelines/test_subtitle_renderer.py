@@ -0,0 +1,106 @@
+import gzip
+import json
+import unittest
+
+from app.models.transcription import Transcription
+from app.services.pipeline_services.subtitle_renderer import SubtitleRenderer
+
+
+class TestSubtitleRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.renderer = SubtitleRenderer(max_entries=4)
+        self.transcription = Transcription(
+            job_id="job_x",
+            original_text="Bonjour. Ça va ?",
+            original_chunks=[
+                {"timestamp": [0.0, 2.5], "text": " Bonjour."},
+                {"timestamp": [2.5, None], "text": "dropped"},
+                {"timestamp": [3661.001, 3662.0], "text": "Ça va <bien> ?"},
+            ],
+            input_language="french",
+            tr_text="",
+            tr_chunks=[],
+            target_language="french"
+        )
+
+    def test_vtt(self):
+        body = self.renderer.render(self.transcription, "vtt").body.decode("utf-8")
+
+        self.assertEqual(
+            body,
+            "WEBVTT\n\n00:00:00.000 --> 00:00:02.500\nBonjour.\n\n01:01:01.001 --> 01:01:02.000\nÇa va <bien> ?\n\n"
+        )
+
+    def test_srt_is_numbered_with_comma_milliseconds(self):
+        body = self.renderer.render(self.transcription, "srt").body.decode("utf-8")
+
+        self.assertTrue(body.startswith("1\n00:00:00,000 --> 00:00:02,500\nBonjour.\n\n2\n01:01:01,001"))
+
+    def test_ttml_escapes_text(self):
+        body = self.renderer.render(self.transcription, "ttml").body.decode("utf-8")
+
+        self.assertIn('xml:lang="fr"', body)
+        self.assertIn('<p begin="01:01:01.001" end="01:01:02.000">Ça va &lt;bien&gt; ?</p>', body)
+
+    def test_json_cues(self):
+        cues = json.loads(self.renderer.render(self.transcription, "json").body)["cues"]
+
+        self.assertEqual(cues[0], {"start": 0.0, "end": 2.5, "text": "Bonjour."})
+        self.assertEqual(len(cues), 2)
+
+    def test_translated_chunks_are_used_for_translations(self):
+        self.transcription.target_language = "english"
+        self.transcription.translated_text = "Hello."
+        self.transcription.translated_chunks = [{"timestamp": [0.0, 2.5], "text": "Hello."}]
+
+        self.assertIn("Hello.", self.renderer.render(self.transcription, "vtt").body.decode("utf-8"))
+
+    def test_strong_etag_and_gzip_variant(self):
+        self.transcription.original_chunks = [
+            {"timestamp": [i, i + 1.0], "text": f"line {i}"} for i in range(100)
+        ]
+        first = self.renderer.render(self.transcription, "vtt")
+        second = self.renderer.render(self.transcription, "vtt")
+
+        self.assertEqual(first.etag, second.etag)
+        self.assertNotEqual(first.etag, first.gzip_etag)
+        self.assertEqual(gzip.decompress(first.gzip_body), first.body)
+        self.assertEqual(first.gzip_body, second.gzip_body)
+
+    def test_cache_hits_and_job_invalidation(self):
+        self.assertIsNone(self.renderer.cached("job_x", "french", 1, "vtt"))
+        rendered = self.renderer.render_cached(self.transcription, "vtt")
+
+        self.assertIs(self.renderer.cached("job_x", "french", 1, "vtt"), rendered)
+        self.assertIsNone(self.renderer.cached("job_x", "french", 1, "srt"))
+
+        self.renderer.invalidate_job("job_x")
+        self.assertIsNone(self.renderer.cached("job_x", "french", 1, "vtt"))
+        self.assertEqual(self.renderer.stats()["size_bytes"], 0)
+
+    def test_cache_is_keyed_on_the_resolved_version(self):
+        # a reprocess made by another worker does not clear this cache, the job's new version must miss
+        rendered = self.renderer.render_cached(self.transcription, "vtt")
+
+        self.assertIs(self.renderer.cached("job_x", "french", 1, "vtt"), rendered)
+        self.assertIsNone(self.renderer.cached("job_x", "french", 2, "vtt"))
+
+    def test_render_started_before_an_invalidation_is_not_cached(self):
+        generation = self.renderer.generation()
+        self.renderer.invalidate_job("job_x")
+
+        rendered = self.renderer.render_cached(self.transcription, "vtt", generation=generation)
+
+        self.assertIn(b"WEBVTT", rendered.body)
+        self.assertIsNone(self.renderer.cached("job_x", "french", 1, "vtt"))
+        self.renderer.render_cached(self.transcription, "vtt", generation=self.renderer.generation())
+        self.assertIsNotNone(self.renderer.cached("job_x", "french", 1, "vtt"))
+
+    def test_unknown_format_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.renderer.render(self.transcription, "ass")
+
+
+if __name__ == "__main__":
+    unittest.main()
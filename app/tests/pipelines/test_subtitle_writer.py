@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+import numpy as np
+
+from app.services.pipeline_services.subtitle_formatter_service import (
+    SubtitleWriter, format_timestamps, render_cues, validate_cues
+)
+
+
+class TestSubtitleWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.writer = SubtitleWriter(transcription_service=Mock(), formats=("vtt", "srt"))
+        self.chunks = [
+            {"timestamp": [0.0, 1.25], "text": " Hello. "},
+            {"timestamp": [1.25, None], "text": "no end"},
+            "not a chunk",
+            {"timestamp": [2.0], "text": "one value"},
+            {"timestamp": ["x", 3.0], "text": "not a number"},
+            {"timestamp": [4.0, 4.0], "text": "zero length"},
+            {"timestamp": [3600.5, 3601.9996], "text": "an hour in"},
+        ]
+
+    def test_validate_cues_drops_and_fixes_chunks(self):
+        times, texts = validate_cues(self.chunks)
+
+        self.assertEqual(texts, ["Hello.", "zero length", "an hour in"])
+        np.testing.assert_allclose(times[1], [4.0, 4.1])
+
+    def test_format_timestamps(self):
+        self.assertEqual(
+            format_timestamps(np.array([0.0, 61.0015, 3600 * 123 + 0.5])).tolist(),
+            ["00:00:00.000", "00:01:01.002", "123:00:00.500"]
+        )
+        self.assertEqual(format_timestamps(np.array([1.5]), ",").tolist(), ["00:00:01,500"])
+
+    def test_vtt_and_srt_in_one_pass(self):
+        paths = self.writer.save_chunks(self.chunks, os.path.join(self.output_dir, "t_english.vtt"))
+
+        self.assertEqual(set(paths), {"vtt", "srt"})
+        with open(paths["vtt"], encoding="utf-8") as f:
+            self.assertEqual(
+                f.read(),
+                "WEBVTT\n\n00:00:00.000 --> 00:00:01.250\nHello.\n\n"
+                "00:00:04.000 --> 00:00:04.100\nzero length\n\n"
+                "01:00:00.500 --> 01:00:02.000\nan hour in\n\n"
+            )
+        with open(os.path.join(self.output_dir, "t_english.srt"), encoding="utf-8") as f:
+            self.assertTrue(f.read().startswith("1\n00:00:00,000 --> 00:00:01,250\nHello.\n\n2\n00:00:04,000"))
+        # nothing but the two documents is left behind
+        self.assertEqual(sorted(os.listdir(self.output_dir)), ["t_english.srt", "t_english.vtt"])
+
+    def test_large_input(self):
+        chunks = [{"timestamp": [i * 2.0, i * 2.0 + 1.5], "text": f"cue {i}"} for i in range(100_000)]
+
+        document = render_cues(*validate_cues(chunks))["vtt"]
+
+        self.assertEqual(document.count(" --> "), 100_000)
+        self.assertTrue(document.endswith("55:33:19.500\ncue 99999\n\n"))
+
+    def test_vtt_must_come_first(self):
+        with self.assertRaises(ValueError):
+            SubtitleWriter(transcription_service=Mock(), formats=("srt",))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+from app.services.pipeline_services.transcription_cache import TranscriptionCache
+
+
+class TestTranscriptionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = TranscriptionCache(max_entries=2, max_bytes=10_000)
+        self.chunks = [{"timestamp": (0.0, 5.0), "text": "Bonjour, bienvenu."}]
+
+    def test_hit_and_miss_are_counted(self):
+        key = TranscriptionCache.make_key("abc", "small", "French", "transcribe")
+
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, "Bonjour, bienvenu.", self.chunks)
+        text, chunks = self.cache.get(key)
+
+        self.assertEqual(text, "Bonjour, bienvenu.")
+        self.assertEqual(chunks, self.chunks)
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_key_separates_model_size_and_task(self):
+        self.cache.put(TranscriptionCache.make_key("abc", "small", "french", "transcribe"), "a", self.chunks)
+
+        self.assertIsNone(self.cache.get(TranscriptionCache.make_key("abc", "medium", "french", "transcribe")))
+        self.assertIsNone(self.cache.get(TranscriptionCache.make_key("abc", "small", "french", "translate")))
+
+    def test_returned_chunks_are_copies(self):
+        key = TranscriptionCache.make_key("abc", "small", "french", "transcribe")
+        self.cache.put(key, "a", self.chunks)
+
+        _, chunks = self.cache.get(key)
+        chunks[0]["text"] = "changed"
+
+        self.assertEqual(self.cache.get(key)[1][0]["text"], "Bonjour, bienvenu.")
+
+    def test_least_recently_used_entry_is_evicted(self):
+        keys = [TranscriptionCache.make_key(str(i), "small", "french", "transcribe") for i in range(3)]
+        self.cache.put(keys[0], "a", self.chunks)
+        self.cache.put(keys[1], "b", self.chunks)
+        self.cache.get(keys[0])
+        self.cache.put(keys[2], "c", self.chunks)
+
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_size_bound_is_enforced(self):
+        cache = TranscriptionCache(max_entries=10, max_bytes=300)
+        for i in range(5):
+            cache.put(TranscriptionCache.make_key(str(i), "small", "french", "transcribe"), "x" * 100, [])
+
+        self.assertLessEqual(cache.stats()["size_bytes"], 300)
+        self.assertEqual(cache.stats()["entries"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.models.transcription import Transcription
+from app.repositories.chunk_store import ChunkStore
+from app.repositories.transcription_repository import TranscriptionRepository
+
+
+class TestChunkStore(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = ChunkStore(os.path.join(self.root, "chunks"))
+        self.repository = TranscriptionRepository(db_path=os.path.join(self.root, "db.json"), chunk_store=self.store)
+        self.source_chunks = [
+            {"timestamp": [0.0, 1.24], "text": "Hello there."},
+            {"timestamp": [1.24, None], "text": "Ça va ?"},
+            {"timestamp": [36000.02, 36001.5], "text": ""},
+        ]
+
+    def tearDown(self):
+        self.repository.close()
+
+    def _job_transcriptions(self):
+        source = Transcription(original_text="Hello there. Ça va ?", job_id="job_1", original_chunks=self.source_chunks,
+                               input_language="english", tr_text="", tr_chunks=[], target_language="english")
+        translations = [
+            Transcription(original_text=source.original_text, job_id="job_1", original_chunks=self.source_chunks,
+                          input_language="english", tr_text=f"{language} text", target_language=language,
+                          tr_chunks=[{"timestamp": [0.0, 1.24], "text": f"{language} 1"}])
+            for language in ["french", "german", "spanish"]
+        ]
+        return [source] + translations
+
+    def test_round_trip(self):
+        self.assertEqual(ChunkStore.decode(ChunkStore.encode(self.source_chunks)), self.source_chunks)
+
+    def test_long_media_keeps_millisecond_timestamps(self):
+        chunks = [{"timestamp": [36000.013, 43199.999], "text": "ten hours in"}]
+
+        self.assertEqual(ChunkStore.decode(ChunkStore.encode(chunks)), chunks)
+
+    def test_deleting_transcriptions_drops_their_chunk_files(self):
+        self.repository.create_many(self._job_transcriptions())
+        job_dir = os.path.join(self.root, "chunks", "job_1")
+        doc_ids = {t.target_language: doc.doc_id for doc in self.repository.table.all()
+                   for t in [self.repository.from_dict(doc)]}
+
+        self.repository.delete(doc_ids["german"])
+        self.assertEqual(sorted(os.listdir(job_dir)), ["v1_english.npz", "v1_french.npz", "v1_spanish.npz"])
+
+        # the source chunks stay while a translation of the job points at them
+        self.repository.delete(doc_ids["english"])
+        self.assertIn("v1_english.npz", os.listdir(job_dir))
+
+        self.repository.delete(doc_ids["french"])
+        self.repository.delete(doc_ids["spanish"])
+        self.assertFalse(os.path.exists(job_dir))
+
+    def test_source_chunks_are_stored_once_per_job(self):
+        self.repository.create_many(self._job_transcriptions())
+
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.root, "chunks", "job_1"))),
+            ["v1_english.npz", "v1_french.npz", "v1_german.npz", "v1_spanish.npz"]
+        )
+        with open(self.repository.db_path) as f:
+            records = list(json.load(f)["transcriptions"].values())
+        self.assertEqual({json.dumps(r["original_chunks"]) for r in records}, {'{"$chunks": "job_1/v1_english.npz"}'})
+        self.assertEqual(records[0]["translated_chunks"], [])
+
+    def test_chunks_load_lazily(self):
+        transcriptions = self._job_transcriptions()
+        self.repository.create_many(transcriptions)
+
+        with patch.object(ChunkStore, "load", wraps=self.store.load) as load:
+            found = self.repository.find_one_by_field("transcription_id", transcriptions[1].id)
+            found.filepath = "/subs/french.vtt"
+            # an untouched list is written back as the same reference, without loading it
+            self.repository.update_by_field("transcription_id", found.id, found)
+            self.assertEqual(load.call_count, 0)
+
+            self.assertEqual(found.translated_chunks, [{"timestamp": [0.0, 1.24], "text": "french 1"}])
+            self.assertEqual(found.original_chunks, self.source_chunks)
+            self.assertEqual(load.call_count, 2)
+
+    def test_other_shapes_stay_inline(self):
+        transcription = Transcription(original_text="Hello world", job_id="job_2", original_chunks={"0": "Hello world"},
+                                      input_language="en")
+        self.repository.create(transcription)
+
+        self.assertEqual(self.repository.get_all()[0].original_chunks, {"0": "Hello world"})
+        self.assertFalse(os.path.exists(os.path.join(self.root, "chunks", "job_2")))
+
+
+if __name__ == "__main__":
+    unittest.main()
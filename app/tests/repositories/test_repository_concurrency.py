@@ -0,0 +1,160 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import logging
+
+from app.models.transcription_job import TranscriptionJob
+from app.repositories.locking import fcntl
+from app.repositories.transcription_job_repository import TranscriptionJobRepository
+from app.repositories.wal_storage import WALOptions
+
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+JOBS_PER_WORKER = 25
+
+
+def _job(worker: str, i: int) -> TranscriptionJob:
+    return TranscriptionJob(
+        job_id=f"{worker}_{i}", video_storage_path=f"/videos/{worker}_{i}.mp4",
+        input_language="english", target_languages=["french"]
+    )
+
+
+def _hammer(db_path: str, worker: str, wal_options=None):
+    """Create JOBS_PER_WORKER jobs, mark each processed and read it back, through one repository"""
+    repository = TranscriptionJobRepository(db_path=db_path, wal_options=wal_options)
+    for i in range(JOBS_PER_WORKER):
+        job = _job(worker, i)
+        repository.create(job)
+        job.processed = True
+        if not repository.update_by_field("job_id", job.id, job):
+            raise AssertionError(f"{job.id} was not found right after being created")
+        if repository.find_one_by_field("job_id", job.id) is None:
+            raise AssertionError(f"{job.id} cannot be read back")
+    repository.close()
+
+
+def _hammer_in_process(db_path: str, worker: str, failures, wal_options=None):
+    try:
+        _hammer(db_path, worker, wal_options)
+    except BaseException as e:
+        failures.put(f"{worker}: {e!r}")
+
+
+class TestRepositoryConcurrency(unittest.TestCase):
+
+    def setUp(self):
+        self.db_path = os.path.join(tempfile.mkdtemp(), "db.json")
+
+    def _run_threads(self, target, workers):
+        failures = []
+
+        def run(worker):
+            try:
+                target(worker)
+            except BaseException as e:
+                failures.append(f"{worker}: {e!r}")
+
+        threads = [threading.Thread(target=run, args=(worker,)) for worker in workers]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=120)
+        self.assertEqual(failures, [])
+        return time.perf_counter() - started
+
+    def _assert_all_jobs_stored(self, workers, wal_options=None):
+        repository = TranscriptionJobRepository(db_path=self.db_path, wal_options=wal_options)
+        jobs = repository.get_all()
+        ids = [job.id for job in jobs]
+        expected = {f"{worker}_{i}" for worker in workers for i in range(JOBS_PER_WORKER)}
+
+        self.assertEqual(len(ids), len(expected))
+        self.assertEqual(set(ids), expected)
+        self.assertTrue(all(job.processed for job in jobs))
+        # the indexes notice the writes of the other repositories and processes
+        self.assertEqual(repository.find_one_by_field("job_id", sorted(expected)[-1]).id, sorted(expected)[-1])
+        repository.close()
+
+    def test_threads_sharing_one_repository(self):
+        repository = TranscriptionJobRepository(db_path=self.db_path)
+        workers = [f"thread{n}" for n in range(8)]
+
+        def hammer(worker):
+            for i in range(JOBS_PER_WORKER):
+                job = _job(worker, i)
+                repository.create(job)
+                job.processed = True
+                repository.update_by_field("job_id", job.id, job)
+                self.assertIsNotNone(repository.find_one_by_field("job_id", job.id))
+
+        elapsed = self._run_threads(hammer, workers)
+        repository.close()
+        logger.info(f"{len(workers) * JOBS_PER_WORKER * 3 / elapsed:.0f} ops/s from {len(workers)} threads")
+
+        self._assert_all_jobs_stored(workers)
+        with open(self.db_path) as f:
+            self.assertEqual(len(json.load(f)["jobs"]), len(workers) * JOBS_PER_WORKER)
+
+    def test_threads_with_their_own_repositories(self):
+        workers = [f"thread{n}" for n in range(8)]
+        self._run_threads(lambda worker: _hammer(self.db_path, worker), workers)
+        self._assert_all_jobs_stored(workers)
+
+    @unittest.skipIf(fcntl is None, "inter-process locking needs fcntl")
+    def test_processes_and_threads(self):
+        context = multiprocessing.get_context("fork")
+        failures = context.Queue()
+        processes = [
+            context.Process(target=_hammer_in_process, args=(self.db_path, f"process{n}", failures))
+            for n in range(4)
+        ]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        threads = [f"thread{n}" for n in range(4)]
+        self._run_threads(lambda worker: _hammer(self.db_path, worker), threads)
+        for process in processes:
+            process.join(timeout=120)
+        elapsed = time.perf_counter() - started
+
+        self.assertTrue(failures.empty(), failures.get() if not failures.empty() else "")
+        self.assertEqual([process.exitcode for process in processes], [0] * len(processes))
+        workers = threads + [f"process{n}" for n in range(4)]
+        logger.info(f"{len(workers) * JOBS_PER_WORKER * 3 / elapsed:.0f} ops/s from 4 processes and 4 threads")
+        self._assert_all_jobs_stored(workers)
+
+    def test_wal_threads(self):
+        options = WALOptions(fsync="never")
+        workers = [f"thread{n}" for n in range(8)]
+        self._run_threads(lambda worker: _hammer(self.db_path, worker, options), workers)
+        # every repository was closed: the database was compacted, and reopening replays nothing
+        self._assert_all_jobs_stored(workers, options)
+
+    @unittest.skipIf(fcntl is None, "detecting a second WAL process needs fcntl")
+    def test_wal_database_refuses_a_second_process(self):
+        options = WALOptions()
+        repository = TranscriptionJobRepository(db_path=self.db_path, wal_options=options)
+        repository.create(_job("parent", 0))
+
+        context = multiprocessing.get_context("fork")
+        failures = context.Queue()
+        process = context.Process(target=_hammer_in_process, args=(self.db_path, "child", failures, options))
+        process.start()
+        process.join(timeout=60)
+        repository.close()
+
+        self.assertFalse(failures.empty())
+        self.assertIn("already open in WAL mode", failures.get())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from tinydb.table import Table
+
+from app.models.transcription import Transcription
+from app.models.transcription_job import TranscriptionJob
+from app.repositories.transcription_job_repository import TranscriptionJobRepository
+from app.repositories.transcription_repository import TranscriptionRepository
+from app.repositories.wal_storage import WALOptions
+
+
+class TestRepositoryIndexes(unittest.TestCase):
+
+    def setUp(self):
+        self.db_path = os.path.join(tempfile.mkdtemp(), "db.json")
+        self.repository = TranscriptionRepository(db_path=self.db_path)
+        self.transcriptions = [
+            Transcription(original_text="Hello", job_id=job_id, original_chunks=[], input_language="english", target_language=language)
+            for job_id in ["job_1", "job_2"] for language in ["english", "french"]
+        ]
+        self.repository.create_many(self.transcriptions)
+
+    def tearDown(self):
+        self.repository.close()
+
+    def _languages(self, job_id):
+        return sorted(t.target_language for t in self.repository.find_by_field("job_id", job_id))
+
+    def test_lookups_do_not_scan_the_table(self):
+        with patch.object(Table, "search", side_effect=AssertionError("table scan")):
+            self.assertEqual(self._languages("job_1"), ["english", "french"])
+            found = self.repository.find_one_by_field("transcription_id", self.transcriptions[3].id)
+            self.assertEqual((found.job_id, found.target_language), ("job_2", "french"))
+            self.assertIsNone(self.repository.find_one_by_field("transcription_id", "missing"))
+
+    def test_indexes_follow_updates_and_deletes(self):
+        self._languages("job_1")
+        moved = self.transcriptions[0]
+        moved.job_id = "job_2"
+        self.repository.update_by_field("transcription_id", moved.id, moved)
+        self.repository.create(Transcription(original_text="Hallo", job_id="job_1", original_chunks=[],
+                                             input_language="english", target_language="german"))
+        self.repository.delete(self.repository.table.get(doc_id=2).doc_id)
+
+        self.assertEqual(self._languages("job_1"), ["german"])
+        self.assertEqual(self._languages("job_2"), ["english", "english", "french"])
+
+    def test_outside_writes_trigger_a_rebuild(self):
+        self._languages("job_1")
+        other = TranscriptionRepository(db_path=self.db_path)
+        other.create(Transcription(original_text="Hola", job_id="job_1", original_chunks=[],
+                                   input_language="english", target_language="spanish"))
+        other.close()
+
+        self.assertEqual(self._languages("job_1"), ["english", "french", "spanish"])
+
+    def _write_a_job(self, **kwargs):
+        jobs = TranscriptionJobRepository(db_path=self.repository.db_path, **kwargs)
+        job = TranscriptionJob(job_id="job_1", video_storage_path="/videos/1.mp4", input_language="english",
+                               target_languages=["french"])
+        jobs.create(job)
+        job.stage = "transcribing"
+        jobs.update_by_field("job_id", "job_1", job)
+        jobs.close()
+
+    def test_writes_to_other_tables_keep_the_indexes(self):
+        self._languages("job_1")
+        self._write_a_job()
+
+        with patch.object(TranscriptionRepository, "_rebuild_indexes", side_effect=AssertionError("rebuilt")):
+            self.assertEqual(self._languages("job_1"), ["english", "french"])
+            self.repository.create(Transcription(original_text="Hallo", job_id="job_1", original_chunks=[],
+                                                 input_language="english", target_language="german"))
+            self.assertEqual(self._languages("job_1"), ["english", "french", "german"])
+
+    def test_wal_writes_to_other_tables_keep_the_indexes(self):
+        self.repository.close()
+        self.repository = TranscriptionRepository(db_path=os.path.join(os.path.dirname(self.db_path), "wal.json"),
+                                                  wal_options=WALOptions(fsync="never"))
+        self.repository.create_many(self.transcriptions)
+        self._languages("job_1")
+        self._write_a_job(wal_options=WALOptions(fsync="never"))
+
+        with patch.object(TranscriptionRepository, "_rebuild_indexes", side_effect=AssertionError("rebuilt")):
+            self.assertEqual(self._languages("job_1"), ["english", "french"])
+
+    def test_wal_storage(self):
+        repository = TranscriptionRepository(db_path=os.path.join(os.path.dirname(self.db_path), "wal.json"),
+                                             wal_options=WALOptions(fsync="never"))
+        repository.create_many(self.transcriptions)
+        repository.update_many("transcription_id", self.transcriptions[:1])
+
+        self.assertEqual(len(repository.find_by_field("target_language", "french")), 2)
+        repository.close()
+
+
+class TestJobPages(unittest.TestCase):
+
+    def setUp(self):
+        self.repository = TranscriptionJobRepository(db_path=os.path.join(tempfile.mkdtemp(), "db.json"))
+        start = datetime(2024, 1, 1)
+        # job_0 oldest ... job_9 newest, every third one processed, odd ones in french
+        self.repository.create_many([
+            TranscriptionJob(job_id=f"job_{i}", video_storage_path=f"/videos/{i}.mp4",
+                             input_language="french" if i % 2 else "english", target_languages=["german"],
+                             processed=i % 3 == 0, upload_date=start + timedelta(hours=i))
+            for i in range(10)
+        ])
+
+    def tearDown(self):
+        self.repository.close()
+
+    def _all_pages(self, limit, **kwargs):
+        pages, after = [], None
+        while True:
+            rows, after = self.repository.page("upload_date", limit, after=after, fields=["job_id"], **kwargs)
+            pages.append([row["job_id"] for row in rows])
+            if after is None:
+                return pages
+
+    def test_pages_follow_upload_date(self):
+        self.assertEqual(self._all_pages(4), [
+            ["job_9", "job_8", "job_7", "job_6"], ["job_5", "job_4", "job_3", "job_2"], ["job_1", "job_0"]
+        ])
+        self.assertEqual(self._all_pages(5, descending=False)[0], ["job_0", "job_1", "job_2", "job_3", "job_4"])
+
+    def test_filters(self):
+        self.assertEqual(self._all_pages(2, filters={"processed": True}), [["job_9", "job_6"], ["job_3", "job_0"]])
+        self.assertEqual(
+            self._all_pages(10, filters={"processed": False, "input_language": "french"}), [["job_7", "job_5", "job_1"]]
+        )
+        self.assertEqual(self._all_pages(10, filters={"input_language": "spanish"}), [[]])
+
+    def test_cursor_survives_new_jobs_and_does_not_scan(self):
+        self.repository.page("upload_date", 1)
+        rows, after = self.repository.page("upload_date", 3, fields=["job_id"])
+        self.repository.create(TranscriptionJob(job_id="job_new", video_storage_path="/videos/new.mp4",
+                                                input_language="english", target_languages=["german"]))
+
+        with patch.object(Table, "search", side_effect=AssertionError("table scan")), \
+                patch.object(Table, "all", side_effect=AssertionError("table scan")):
+            rows, _ = self.repository.page("upload_date", 3, after=after, fields=["job_id", "processed"])
+
+        self.assertEqual(rows, [{"job_id": "job_6", "processed": True}, {"job_id": "job_5", "processed": False},
+                                {"job_id": "job_4", "processed": False}])
+
+    def test_unindexed_order_or_filter(self):
+        with self.assertRaises(ValueError):
+            self.repository.page("job_id", 10)
+        with self.assertRaises(ValueError):
+            self.repository.page("upload_date", 10, filters={"stage": "done"})
+
+
+if __name__ == "__main__":
+    unittest.main()
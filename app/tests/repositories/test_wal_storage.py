@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+import unittest
+
+from tinydb import TinyDB
+
+from app.models.transcription import Transcription
+from app.models.transcription_job import TranscriptionJob
+from app.repositories.transcription_job_repository import TranscriptionJobRepository
+from app.repositories.transcription_repository import TranscriptionRepository
+from app.repositories.wal_storage import WALOptions, WALStorage, WALTinyDB
+
+
+class TestWALStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.db_path = os.path.join(tempfile.mkdtemp(), "db.json")
+        self.options = WALOptions(fsync="always")
+        self.repository = TranscriptionRepository(db_path=self.db_path, wal_options=self.options)
+
+    def tearDown(self):
+        self.repository.close()
+
+    def _transcription(self, language: str) -> Transcription:
+        return Transcription(
+            original_text="Hello world", job_id="job_1", original_chunks=[{"timestamp": [0.0, 1.0], "text": "Hello world"}],
+            input_language="english", target_language=language
+        )
+
+    def _reopen(self) -> TinyDB:
+        # what a restarted process sees, without closing (compacting) the current database
+        return WALTinyDB(self.db_path, storage=WALStorage, options=self.options)
+
+    def test_mutations_are_logged_per_record(self):
+        transcriptions = [self._transcription(language) for language in ["english", "french", "german"]]
+        self.repository.create_many(transcriptions)
+        transcriptions[1].filepath = "/subs/french.vtt"
+        self.repository.update_by_field(field_name="transcription_id", value=transcriptions[1].id, entity=transcriptions[1])
+
+        with open(self.db_path + ".wal", "rb") as f:
+            records = [json.loads(line) for line in f]
+
+        self.assertEqual(len(records), 2)
+        self.assertEqual(len(records[0]["u"]), 3)
+        # the update only carries the document it changed
+        self.assertEqual([doc["filepath"] for doc in records[1]["u"].values()], ["/subs/french.vtt"])
+
+    def test_reopen_replays_the_log(self):
+        transcription = self._transcription("french")
+        self.repository.create(transcription)
+        self.repository.delete(self.repository.create(self._transcription("german")))
+
+        db = self._reopen()
+        documents = db.table("transcriptions").all()
+        db.close()
+
+        self.assertEqual([doc["transcription_id"] for doc in documents], [transcription.id])
+
+    def test_torn_record_is_dropped(self):
+        transcription = self._transcription("french")
+        self.repository.create(transcription)
+        with open(self.db_path + ".wal", "ab") as f:
+            f.write(b'{"t": "transcriptions", "u": {"9": {"transcrip')
+
+        db = self._reopen()
+        documents = db.table("transcriptions").all()
+        db.close()
+
+        self.assertEqual([doc["transcription_id"] for doc in documents], [transcription.id])
+        self.assertEqual(os.path.getsize(self.db_path + ".wal"), 0)
+
+    def test_compaction_writes_a_plain_tinydb_snapshot(self):
+        repository = TranscriptionRepository(
+            db_path=os.path.join(os.path.dirname(self.db_path), "small.json"),
+            wal_options=WALOptions(fsync="never", compact_bytes=1)
+        )
+        repository.create(self._transcription("french"))
+
+        self.assertEqual(os.path.getsize(repository.db_path + ".wal"), 0)
+        with TinyDB(repository.db_path) as db:
+            self.assertEqual(len(db.table("transcriptions")), 1)
+        repository.close()
+
+    def test_repositories_of_one_file_share_the_database(self):
+        jobs = TranscriptionJobRepository(db_path=self.db_path, wal_options=self.options)
+        jobs.create(TranscriptionJob(job_id="job_1", video_storage_path="/videos/a.mp4", input_language="english", target_languages=["french"]))
+        self.repository.create(self._transcription("french"))
+
+        self.assertIs(jobs.db, self.repository.db)
+        self.assertEqual(set(self.repository.db.tables()), {"jobs", "transcriptions"})
+        jobs.close()
+        # still open for the other repository
+        self.assertEqual(self.repository.count(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
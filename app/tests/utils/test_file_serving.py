@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+from email.utils import formatdate
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.utils.file_serving import FileServer
+
+
+class TestFileServer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "video_subtitled_job_x.mkv")
+        self.content = bytes(range(256)) * 40  # 10240 bytes
+        with open(self.path, "wb") as f:
+            f.write(self.content)
+
+        self.server = FileServer(mode="app", chunk_size=1000)
+        self.client = self._client(self.server)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _client(self, server: FileServer) -> TestClient:
+        app = FastAPI()
+
+        @app.api_route("/video", methods=["GET", "HEAD"])
+        async def video(request: Request):
+            return server.serve(request=request, path=self.path, media_type="video/x-matroska")
+
+        return TestClient(app)
+
+    def test_full_download_has_validators(self):
+        response = self.client.get("/video")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.content)
+        self.assertEqual(response.headers["accept-ranges"], "bytes")
+        self.assertIn("etag", response.headers)
+        self.assertIn("last-modified", response.headers)
+
+    def test_range_request_returns_partial_content(self):
+        response = self.client.get("/video", headers={"Range": "bytes=1000-2499"})
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, self.content[1000:2500])
+        self.assertEqual(response.headers["content-range"], f"bytes 1000-2499/{len(self.content)}")
+        self.assertEqual(response.headers["content-length"], "1500")
+
+    def test_open_and_suffix_ranges(self):
+        self.assertEqual(self.client.get("/video", headers={"Range": "bytes=10000-"}).content, self.content[10000:])
+        self.assertEqual(self.client.get("/video", headers={"Range": "bytes=-100"}).content, self.content[-100:])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get("/video", headers={"Range": "bytes=20000-"})
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response.headers["content-range"], f"bytes */{len(self.content)}")
+
+    def test_stale_if_range_sends_the_whole_file(self):
+        response = self.client.get("/video", headers={"Range": "bytes=0-99", "If-Range": '"stale"'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.content), len(self.content))
+
+        etag = self.client.head("/video").headers["etag"]
+        response = self.client.get("/video", headers={"Range": "bytes=0-99", "If-Range": etag})
+        self.assertEqual(response.status_code, 206)
+
+    def test_revalidation_returns_not_modified(self):
+        etag = self.client.get("/video").headers["etag"]
+
+        self.assertEqual(self.client.get("/video", headers={"If-None-Match": etag}).status_code, 304)
+        self.assertEqual(self.client.get("/video", headers={"If-None-Match": '"other"'}).status_code, 200)
+
+        future = formatdate(os.stat(self.path).st_mtime + 60, usegmt=True)
+        self.assertEqual(self.client.get("/video", headers={"If-Modified-Since": future}).status_code, 304)
+
+    def test_head_has_no_body(self):
+        response = self.client.head("/video")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-length"], str(len(self.content)))
+        self.assertEqual(response.content, b"")
+
+    def test_accel_modes_hand_the_file_to_the_proxy(self):
+        accel = self._client(FileServer(mode="x-accel", accel_prefix="/protected/", accel_root=self.tmp_dir.name))
+        response = accel.get("/video")
+        self.assertEqual(response.headers["x-accel-redirect"], "/protected/video_subtitled_job_x.mkv")
+        self.assertEqual(response.content, b"")
+
+        sendfile = self._client(FileServer(mode="x-sendfile"))
+        self.assertEqual(sendfile.get("/video").headers["x-sendfile"], os.path.abspath(self.path))
+
+    def test_accel_falls_back_outside_its_root(self):
+        accel = self._client(FileServer(mode="x-accel", accel_root=os.path.join(self.tmp_dir.name, "elsewhere")))
+        response = accel.get("/video")
+
+        self.assertNotIn("x-accel-redirect", response.headers)
+        self.assertEqual(response.content, self.content)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from app.services.pipeline_services.artifact_store import ArtifactStore, LocalFileBackend
+from app.utils.upload_ingestion import UploadRejectedError, ingest_upload, sniff_container
+
+MP4_HEADER = b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom"
+BOUNDARY = "testboundary"
+
+
+def multipart_chunks(file_chunks, filename="clip.mp4", fields=(("input_language", "english"),)):
+    """A multipart/form-data body as a generator, the file sent in the given chunks"""
+    for name, value in fields:
+        yield (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n{value}\r\n").encode()
+    yield (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"video\"; filename=\"{filename}\"\r\n"
+           f"Content-Type: application/octet-stream\r\n\r\n").encode()
+    yield from file_chunks
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+class TestUploadIngestion(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.upload_dir = os.path.join(self.tmp_dir.name, "uploads")
+        self.store = ArtifactStore(backend=LocalFileBackend({"uploads": self.upload_dir}))
+
+        app = FastAPI()
+
+        @app.post("/upload")
+        async def upload(request: Request):
+            try:
+                upload = await ingest_upload(request, self.store, max_bytes=64 * 1024)
+            except UploadRejectedError as e:
+                raise HTTPException(status_code=e.status_code, detail=str(e))
+            return {"key": upload.key, "size_bytes": upload.size_bytes, "container": upload.container,
+                    "fields": upload.fields, "language": upload.field("input_language")}
+
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _post(self, body, **headers):
+        headers.setdefault("Content-Type", f"multipart/form-data; boundary={BOUNDARY}")
+        return self.client.post("/upload", content=body, headers=headers)
+
+    def _staged(self):
+        return os.listdir(os.path.join(self.upload_dir, ".staging"))
+
+    def test_upload_is_stored_under_its_digest(self):
+        content = MP4_HEADER + b"\x00" * 20000
+        response = self.client.post(
+            "/upload",
+            files={"video": ("My Clip.MP4", content, "video/mp4")},
+            data={"input_language": "english", "target_languages": ["french", "german"]}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        digest = hashlib.sha256(content).hexdigest()
+        body = response.json()
+        self.assertEqual(body["key"], f"uploads/{digest[:2]}/{digest}.mp4")
+        self.assertEqual(body["size_bytes"], len(content))
+        self.assertEqual(body["container"], "mp4")
+        self.assertEqual(body["language"], "english")
+        self.assertEqual(body["fields"]["target_languages"], ["french", "german"])
+        with open(self.store.local_path(body["key"]), "rb") as f:
+            self.assertEqual(f.read(), content)
+        self.assertEqual(self._staged(), [])
+
+    def test_missing_extension_follows_the_container(self):
+        content = b"\x1a\x45\xdf\xa3" + b"\x00" * 1000
+        response = self._post(b"".join(multipart_chunks([content], filename="recording")))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["key"].endswith(".mkv"))
+
+    def test_too_large_upload_is_rejected_from_content_length(self):
+        response = self._post(b"--x--", **{"Content-Length": str(10 * 1024 * 1024)})
+
+        self.assertEqual(response.status_code, 413)
+
+    def test_too_large_upload_is_rejected_while_streaming(self):
+        def file_chunks():
+            yield MP4_HEADER + b"\x00" * 1000
+            for _ in range(64):
+                yield b"\x00" * 4096
+
+        # a generator body has no Content-Length, the limit is enforced on the bytes read
+        response = self._post(multipart_chunks(file_chunks()))
+
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self._staged(), [])
+        self.assertEqual(os.listdir(self.upload_dir), [".staging"])
+
+    def test_unknown_container_is_rejected_on_its_first_bytes(self):
+        response = self._post(b"".join(multipart_chunks([b"%PDF-1.7\n" + b"x" * 4096], filename="clip.mp4")))
+
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(self._staged(), [])
+
+    def test_malformed_requests(self):
+        self.assertEqual(self.client.post("/upload", json={"video": "x"}).status_code, 415)
+        missing = f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"input_language\"\r\n\r\nenglish\r\n--{BOUNDARY}--\r\n"
+        self.assertEqual(self._post(missing.encode()).status_code, 422)
+        two_files = b"".join(multipart_chunks([MP4_HEADER * 40])).replace(f"--{BOUNDARY}--".encode(), b"") + \
+            b"".join(multipart_chunks([MP4_HEADER * 40], fields=()))
+        self.assertEqual(self._post(two_files).status_code, 400)
+
+    def test_sniff_container(self):
+        self.assertEqual(sniff_container(MP4_HEADER), "mp4")
+        self.assertEqual(sniff_container(b"\x00\x00\x00\x08moov"), "mp4")
+        self.assertEqual(sniff_container(b"RIFF\x00\x00\x00\x00WAVEfmt "), "wav")
+        self.assertEqual(sniff_container(b"RIFF\x00\x00\x00\x00AVI LIST"), "avi")
+        self.assertEqual(sniff_container(b"ID3\x04\x00"), "mp3")
+        self.assertEqual(sniff_container(b"\xff\xfb\x90\x00"), "mp3")
+        self.assertEqual(sniff_container(b"fLaC\x00"), "flac")
+        self.assertEqual(sniff_container(b"OggS\x00"), "ogg")
+        self.assertEqual(sniff_container(b"\x47" + b"\x00" * 187 + b"\x47"), "mpegts")
+        self.assertIsNone(sniff_container(b"RIFF\x00\x00\x00\x00WEBPVP8 "))
+        self.assertIsNone(sniff_container(b"<html><body>"))
+        self.assertIsNone(sniff_container(b""))
+
+
+if __name__ == "__main__":
+    unittest.main()
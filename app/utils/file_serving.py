@@ -0,0 +1,182 @@
+import mimetypes
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Iterator, Optional
+from urllib.parse import quote
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+import logging
+
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+# how the bytes of a file reach the client
+SERVING_MODES = ("app", "x-accel", "x-sendfile")
+
+
+class FileServer:
+    """
+    Serves large files with HTTP validators and byte ranges:
+    ETag/Last-Modified with 304 revalidation, single `Range` requests (206/416) honoured
+    only while `If-Range` still matches, and an offload mode where the API worker just
+    answers with X-Accel-Redirect (nginx) or X-Sendfile (Apache/lighttpd) headers and the
+    front proxy sends the file itself with sendfile.
+    """
+
+    def __init__(self, mode: str = "app", accel_prefix: str = "/protected", accel_root: Optional[str] = None,
+                 chunk_size: int = 1024 * 1024):
+        if mode not in SERVING_MODES:
+            raise ValueError(f"File serving mode must be one of {SERVING_MODES}, got: {mode}")
+        self.mode = mode
+        self.accel_prefix = accel_prefix.rstrip("/")
+        self.accel_root = os.path.abspath(accel_root) if accel_root else None
+        self.chunk_size = chunk_size
+
+    def serve(self, request: Request, path: str, media_type: Optional[str] = None,
+              filename: Optional[str] = None) -> Response:
+        stat = os.stat(path)
+        media_type = media_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+        etag = self.make_etag(stat)
+        headers = {
+            "ETag": etag,
+            "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+            "Accept-Ranges": "bytes",
+            "Content-Disposition": self._content_disposition(filename or os.path.basename(path)),
+        }
+
+        if self._not_modified(request, etag, stat.st_mtime):
+            return Response(status_code=304, headers=headers)
+
+        accel_headers = self._accel_headers(path)
+        if accel_headers is not None:
+            # the proxy handles ranges itself, the worker is free immediately
+            headers.update(accel_headers)
+            return Response(status_code=200, headers=headers, media_type=media_type)
+
+        size = stat.st_size
+        byte_range = None
+        range_header = request.headers.get("range")
+        if range_header and self._if_range_matches(request, etag, stat.st_mtime):
+            byte_range = self.parse_range(range_header, size)
+            if byte_range == "unsatisfiable":
+                headers["Content-Range"] = f"bytes */{size}"
+                return Response(status_code=416, headers=headers)
+
+        if byte_range is None:
+            start, end, status = 0, size - 1, 200
+        else:
+            (start, end), status = byte_range, 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+        length = max(0, end - start + 1)
+        headers["Content-Length"] = str(length)
+
+        if request.method == "HEAD":
+            return Response(status_code=status, headers=headers, media_type=media_type)
+
+        return StreamingResponse(
+            self._iter_file(path, start, length),
+            status_code=status,
+            headers=headers,
+            media_type=media_type
+        )
+
+    @staticmethod
+    def make_etag(stat: os.stat_result) -> str:
+        # strong validator: a file is only ever replaced as a whole, never edited in place
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    @staticmethod
+    def parse_range(range_header: str, size: int):
+        """
+        (start, end) inclusive for a single satisfiable range, None when the header should be
+        ignored (malformed or multiple ranges: the full file is sent), "unsatisfiable" for 416.
+        """
+        unit, _, ranges = range_header.partition("=")
+        if unit.strip().lower() != "bytes" or not ranges or "," in ranges:
+            return None
+
+        first, _, last = ranges.strip().partition("-")
+        try:
+            if first == "":
+                # suffix range: the last N bytes
+                suffix = int(last)
+                if suffix <= 0:
+                    return "unsatisfiable"
+                return (max(0, size - suffix), size - 1)
+
+            start = int(first)
+            end = int(last) if last else size - 1
+        except ValueError:
+            return None
+
+        if start >= size:
+            return "unsatisfiable"
+        if start > end:
+            return None
+        return (start, min(end, size - 1))
+
+    def _not_modified(self, request: Request, etag: str, mtime: float) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            candidates = [tag.strip() for tag in if_none_match.split(",")]
+            # weak comparison, as RFC 9110 requires for If-None-Match
+            return "*" in candidates or etag in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+
+        if_modified_since = self._parse_http_date(request.headers.get("if-modified-since"))
+        return if_modified_since is not None and int(mtime) <= if_modified_since
+
+    def _if_range_matches(self, request: Request, etag: str, mtime: float) -> bool:
+        if_range = request.headers.get("if-range")
+        if if_range is None:
+            return True
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            # strong comparison only
+            return if_range == etag
+        date = self._parse_http_date(if_range)
+        return date is not None and int(mtime) <= date
+
+    def _accel_headers(self, path: str) -> Optional[dict]:
+        if self.mode == "app":
+            return None
+
+        absolute = os.path.abspath(path)
+        if self.mode == "x-sendfile":
+            return {"X-Sendfile": absolute}
+
+        if self.accel_root is None or os.path.commonpath([absolute, self.accel_root]) != self.accel_root:
+            logger.warning(f"{absolute} is outside X_ACCEL_ROOT, serving it from the application")
+            return None
+        relative = os.path.relpath(absolute, self.accel_root).replace(os.sep, "/")
+        return {"X-Accel-Redirect": f"{self.accel_prefix}/{quote(relative)}"}
+
+    def _iter_file(self, path: str, start: int, length: int) -> Iterator[bytes]:
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    @staticmethod
+    def _parse_http_date(value: Optional[str]) -> Optional[int]:
+        if not value:
+            return None
+        try:
+            return int(parsedate_to_datetime(value).timestamp())
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _content_disposition(filename: str) -> str:
+        quoted = quote(filename)
+        if quoted == filename:
+            return f'attachment; filename="{filename}"'
+        return f"attachment; filename*=utf-8''{quoted}"
@@ -0,0 +1,299 @@
+import hashlib
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+
+import logging
+
+from app.services.pipeline_services.artifact_store import ArtifactStore
+
+try:
+    from python_multipart.exceptions import MultipartParseError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart before 0.0.13
+    from multipart.exceptions import MultipartParseError
+    from multipart.multipart import MultipartParser, parse_options_header
+
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+# file bytes gathered before one write (and hash update) off the event loop
+WRITE_BUFFER_BYTES = 4 * 1024 * 1024
+
+# file bytes the container is recognized from (MPEG-TS needs two 188-byte packets)
+HEADER_SNIFF_BYTES = 512
+
+# a form field value (language, model size, ...) is never larger than this
+MAX_FIELD_BYTES = 64 * 1024
+
+# multipart boundaries and form fields on top of the file, when checking Content-Length up front
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+# container -> extension given to uploads whose filename has none
+CONTAINER_EXTENSIONS = {
+    "mp4": ".mp4",
+    "matroska": ".mkv",
+    "avi": ".avi",
+    "wav": ".wav",
+    "mp3": ".mp3",
+    "flac": ".flac",
+    "ogg": ".ogg",
+    "mpegts": ".ts",
+}
+
+
+class UploadRejectedError(ValueError):
+    """The upload cannot be taken, answered with status_code before the rest of the body is read."""
+
+    status_code = 400
+
+
+class UploadTooLargeError(UploadRejectedError):
+    status_code = 413
+
+
+class UnsupportedMediaTypeError(UploadRejectedError):
+    status_code = 415
+
+
+class MissingFieldError(UploadRejectedError):
+    status_code = 422
+
+
+def sniff_container(header: bytes) -> Optional[str]:
+    """The container of a media file from its first bytes, None when it is not one the pipeline takes."""
+    if len(header) >= 12 and header[4:8] == b"ftyp":
+        return "mp4"  # also MOV and M4A (ISO base media)
+    if len(header) >= 8 and header[4:8] in (b"moov", b"mdat", b"wide", b"free", b"skip"):
+        return "mp4"  # QuickTime without an ftyp box
+    if header[:4] == b"\x1a\x45\xdf\xa3":
+        return "matroska"  # also WebM
+    if len(header) >= 12 and header[:4] == b"RIFF":
+        return {b"AVI ": "avi", b"WAVE": "wav"}.get(header[8:12])
+    if header[:3] == b"ID3" or (len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0):
+        return "mp3"  # MPEG audio frame sync (also ADTS AAC)
+    if header[:4] == b"fLaC":
+        return "flac"
+    if header[:4] == b"OggS":
+        return "ogg"
+    if len(header) >= 189 and header[0] == 0x47 and header[188] == 0x47:
+        return "mpegts"
+    return None
+
+
+class IngestedUpload:
+    """The stored file of a multipart upload and the form fields sent with it."""
+
+    def __init__(self, key: str, filename: str, size_bytes: int, digest: str, container: str,
+                 fields: Dict[str, List[str]]):
+        self.key = key
+        self.filename = filename
+        self.size_bytes = size_bytes
+        self.digest = digest
+        self.container = container
+        self.fields = fields
+
+    def field(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        values = self.fields.get(name)
+        return values[-1] if values else default
+
+    def field_list(self, name: str) -> List[str]:
+        return list(self.fields.get(name, []))
+
+
+class _FileSink:
+    """
+    The file part of the body, written to its staging path as it arrives: the bytes are gathered
+    in a large buffer and written and hashed in one go off the event loop, so the upload is written
+    to disk once and never read back. Size and container are checked on the first bytes.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.container: Optional[str] = None
+        self._buffer = bytearray()
+        self._hash = hashlib.sha256()
+        self._file = None
+
+    def feed(self, data: bytes):
+        self.size_bytes += len(data)
+        if self.max_bytes and self.size_bytes > self.max_bytes:
+            raise UploadTooLargeError(f"The upload is larger than {self.max_bytes} bytes")
+        self._buffer += data
+        if self.container is None and self.size_bytes >= HEADER_SNIFF_BYTES:
+            self._check_header()
+
+    def _check_header(self):
+        self.container = sniff_container(bytes(self._buffer[:HEADER_SNIFF_BYTES]))
+        if self.container is None:
+            raise UnsupportedMediaTypeError("The upload is not an audio or video container the pipeline can read")
+
+    async def flush(self, force: bool = False):
+        if self._buffer and (force or len(self._buffer) >= WRITE_BUFFER_BYTES):
+            data = bytes(self._buffer)
+            self._buffer.clear()
+            await run_in_threadpool(self._write, data)
+
+    def _write(self, data: bytes):
+        if self._file is None:
+            # unbuffered: the writes are already large
+            self._file = open(self.path, "wb", buffering=0)
+        self._file.write(data)
+        self._hash.update(data)
+
+    async def finish(self):
+        if self.container is None:
+            self._check_header()
+        await self.flush(force=True)
+        await run_in_threadpool(self._close)
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        self._close()
+        Path(self.path).unlink(missing_ok=True)
+
+    @property
+    def digest(self) -> str:
+        return self._hash.hexdigest()
+
+
+class _FormState:
+    """What the parser callbacks collect, one part at a time."""
+
+    def __init__(self, file_field: str, open_sink: Callable[[str], _FileSink]):
+        self.file_field = file_field
+        self.open_sink = open_sink
+        self.fields: Dict[str, List[str]] = {}
+        self.sink: Optional[_FileSink] = None
+        self.filename: Optional[str] = None
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._name: Optional[str] = None
+        self._in_file = False
+        self._value = bytearray()
+
+    def callbacks(self) -> Dict[str, Callable]:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+        self._name = None
+        self._in_file = False
+        self._value = bytearray()
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[bytes(self._header_field).lower()] = bytes(self._header_value)
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        filename = options.get(b"filename")
+        if filename is None:
+            return
+        if self._name != self.file_field or self.sink is not None:
+            raise UploadRejectedError(f"Unexpected file in form field '{self._name}', only one '{self.file_field}' file is taken")
+        self.filename = filename.decode("utf-8", errors="replace")
+        self.sink = self.open_sink(self.filename)
+        self._in_file = True
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self.sink.feed(data[start:end])
+            return
+        self._value += data[start:end]
+        if len(self._value) > MAX_FIELD_BYTES:
+            raise UploadTooLargeError(f"Form field '{self._name}' is larger than {MAX_FIELD_BYTES} bytes")
+
+    def on_part_end(self):
+        if not self._in_file and self._name:
+            self.fields.setdefault(self._name, []).append(self._value.decode("utf-8", errors="replace"))
+
+
+def _suffix(filename: str) -> str:
+    return Path(filename or "").suffix.lower()
+
+
+async def ingest_upload(request: Request, store: ArtifactStore, file_field: str = "video",
+                        max_bytes: int = 0) -> IngestedUpload:
+    """
+    Read a multipart/form-data body as it arrives and store its `file_field` file by content.
+    The file is written once, to a staging path next to the uploads, and hashed on the way; the
+    key follows from the hash. Too large (max_bytes, 0 = no limit) or unrecognized uploads are
+    rejected as soon as that is known, without reading the rest of the body.
+    The stored key is pinned: the caller unpins it once a record points at it (or it is given up).
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data":
+        raise UnsupportedMediaTypeError("Expected a multipart/form-data body")
+    boundary = options.get(b"boundary")
+    if not boundary:
+        raise UploadRejectedError("The multipart body has no boundary")
+
+    content_length = request.headers.get("content-length")
+    if max_bytes and content_length and content_length.isdigit() and int(content_length) > max_bytes + FORM_OVERHEAD_BYTES:
+        raise UploadTooLargeError(f"The upload is larger than {max_bytes} bytes")
+
+    state = _FormState(
+        file_field=file_field,
+        open_sink=lambda filename: _FileSink(store.staging_path("uploads", _suffix(filename)), max_bytes)
+    )
+    parser = MultipartParser(boundary, state.callbacks())
+
+    try:
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                if state.sink is not None:
+                    await state.sink.flush()
+            parser.finalize()
+        except MultipartParseError as e:
+            raise UploadRejectedError(f"Malformed multipart body: {e}")
+
+        sink = state.sink
+        if sink is None:
+            raise MissingFieldError(f"The '{file_field}' file is missing")
+        await sink.finish()
+
+        suffix = _suffix(state.filename) or CONTAINER_EXTENSIONS[sink.container]
+        key = await run_in_threadpool(store.put_file, sink.path, kind="uploads", suffix=suffix, digest=sink.digest, pin=True)
+    except BaseException:
+        if state.sink is not None:
+            await run_in_threadpool(state.sink.discard)
+        raise
+
+    logger.info(f"Stored upload {state.filename} ({sink.size_bytes} bytes, {sink.container}) as {key}")
+    return IngestedUpload(
+        key=key,
+        filename=state.filename,
+        size_bytes=sink.size_bytes,
+        digest=sink.digest,
+        container=sink.container,
+        fields=state.fields
+    )